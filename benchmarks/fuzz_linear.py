@@ -0,0 +1,136 @@
+import re
+import sys
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCHMARKS_DIR.parent
+for module_dir in (ROOT_DIR / 'src' / 'db_obj_list', ROOT_DIR / 'src' / 'code_mapper',
+                   ROOT_DIR / 'src' / 'code_mapper' / 'old_code'):
+    if str(module_dir) not in sys.path:
+        sys.path.insert(0, str(module_dir))
+
+from sql_lexer import object_references
+from string_scanner import find_quoted_strings, heredoc_body_lines
+from db_code_map import find_java_strings, find_js_strings, find_php_strings
+from extract_table_simple import table_usages
+from plsql_mapper import ScriptStatement, classify_edges, split_script
+from query_fingerprint import normalize
+
+MAX_SLOPE = 1.3  # log-log slope of time against size above which a target is super-linear (1.0 is linear)
+REPEATS = 3
+
+# the patterns the scanners replaced, checked with --legacy to show the harness catches them
+LEGACY_JS_PATTERN = re.compile(r"('(?:\\.|[^\\'])*')|(\"(?:\\.|[^\\\"])*\")|(`(?:\\.|[^\\`])*`)")
+LEGACY_READ_PATTERN = re.compile(r'SELECT\s.*?\sFROM\s+(\w+)', re.IGNORECASE | re.DOTALL)
+TABLES = [f"TB_{index}" for index in range(200)]
+
+
+def legacy_table_usages(text: str, tables: List[str]) -> None:
+    for table_name in tables:
+        re.search(fr'(?i)SELECT.*?FROM.*?\b{table_name}\b', text, re.DOTALL)
+        re.search(fr'(?i)(INSERT INTO|UPDATE|DELETE FROM)\b.*?\b{table_name}\b', text, re.DOTALL)
+
+
+@dataclass
+class Target:
+    name: str
+    run: Callable[[str], object]
+    fragments: List[str]  # the random inputs are drawn from these, the worst cases repeat a single one
+    legacy: bool = False
+
+
+TARGETS = [
+    Target('find_quoted_strings', lambda text: find_quoted_strings(text, '\'"`'),
+           ["'", '"', '`', '\\', "\\'", '\\"', 'a', ' ', "'a'"]),
+    Target('find_js_strings', find_js_strings, ["'", '"', '`', '\\', "\\'", 'x = ', ';']),
+    Target('find_php_strings', find_php_strings, ["'", '"', '\\', "\\'", '$x', '<<<', 'SQL']),
+    Target('find_java_strings', find_java_strings, ['"', '\\"', 'a', ' ', '+']),
+    Target('heredoc_body_lines', heredoc_body_lines, ['<<<SQL\n', '<<<"ID"\n', 'SQL;\n', 'ID\n', 'x\n', 'SQ', '\n']),
+    Target('sql_lexer', lambda text: sum(1 for _ in object_references(text)),
+           ['SELECT ', 'FROM ', 'TB_A ', '(', ')', "'", "''", '"', '--', '/*', '*/', '\n', 'UPDATE ', 'INTO ',
+            'A.B ', 'A."', ',', ';', 'MERGE ', 'WITH ', '#{', ':p', '/* a ', "q'[", "]'", "q'#", "n'"]),
+    Target('split_script', lambda text: sum(1 for _ in split_script(text)),
+           ['BEGIN ', 'END', ';', "'", "''", "q'[", "]'", '/*', '*/', '--', '\n/\n', '/', 'CREATE PROCEDURE p IS ',
+            'x ', '\n', 'CASE ', 'END IF']),
+    Target('classify_edges', lambda text: classify_edges(ScriptStatement(text, 1)),
+           ['FROM ', 'tb ', 'a.', '(', ',', ' ', "'", '"', 'INTO ', 'JOIN ', 'f(', '--', '\n', '/*', 'UPDATE ']),
+    Target('normalize', normalize, [' ', '\n', '--', ':p', '?', '#{', '}', '"', 'a', '\t']),
+    Target('table_usages', lambda text: table_usages(text, TABLES),
+           ['SELECT ', 'FROM ', 'TB_1 ', 'UPDATE ', 'INSERT INTO ', 'x ', '\n']),
+    Target('legacy_js_pattern', LEGACY_JS_PATTERN.findall, ["'", '"', '\\', "\\'", 'a'], legacy=True),
+    Target('legacy_read_pattern', LEGACY_READ_PATTERN.findall, ['SELECT ', 'a ', 'FROM', '\n'], legacy=True),
+    Target('legacy_table_usages', lambda text: legacy_table_usages(text, TABLES[:2]), ['SELECT ', 'x ', 'FROM '],
+           legacy=True),
+]
+
+
+def inputs(target: Target, rng: random.Random, size: int) -> Dict[str, str]:
+    """a random mix of the fragments and each fragment repeated, the shapes that make a backtracking matcher rescan"""
+    cases = {'random': ''.join(rng.choice(target.fragments) for _ in range(size // 3))[:size]}
+    for fragment in target.fragments:
+        cases[f"repeat {fragment!r}"] = (fragment * (size // len(fragment) + 1))[:size]
+    cases["open quote then escapes"] = ("'" + "\\'" * size)[:size]
+    return cases
+
+
+def timed(run: Callable[[str], object], text: str) -> float:
+    best = math.inf
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def slope(sizes: List[int], seconds: List[float]) -> float:
+    """the least squares slope of log(time) against log(size): ~1 for linear, ~2 for quadratic"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(second, 1e-7)) for second in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def fuzz(targets: List[Target], base_size: int, steps: int, seed: int) -> List[str]:
+    """the targets with a super-linear case, printing the slope of the worst case of each"""
+    sizes = [base_size * 2 ** step for step in range(steps)]
+    failures = []
+    print(f"{'target':<24}{'worst case':<32}{'seconds':>9}{'slope':>7}")
+    for target in targets:
+        worst_case, worst_slope, worst_seconds = '', -math.inf, 0.0
+        case_inputs = [inputs(target, random.Random(seed), size) for size in sizes]
+        for case in case_inputs[0]:
+            seconds = [timed(target.run, texts[case]) for texts in case_inputs]
+            if seconds[-1] < 1e-3:  # too fast to tell a slope from noise
+                continue
+            if (case_slope := slope(sizes, seconds)) > worst_slope:
+                worst_case, worst_slope, worst_seconds = case, case_slope, seconds[-1]
+        if not worst_case:
+            print(f"{target.name:<24}every case under a millisecond, use a larger --size")
+            continue
+        super_linear = worst_slope > MAX_SLOPE
+        if super_linear:
+            failures.append(target.name)
+        print(f"{target.name:<24}{worst_case[:30]:<32}{worst_seconds:>9.4f}{worst_slope:>7.2f}"
+              f"{'  SUPER-LINEAR' if super_linear else ''}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that the string and sql scanners run in linear time")
+    parser.add_argument('--size', type=int, default=10000, help='Characters of the smallest input')
+    parser.add_argument('--steps', type=int, default=4, help='Sizes tried, each doubling the previous one')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--legacy', action='store_true',
+                        help='Also run the replaced patterns, which must fail (quadratic, keep --size small)')
+    args = parser.parse_args()
+
+    selected = [target for target in TARGETS if args.legacy or not target.legacy]
+    super_linear_targets = fuzz(selected, args.size, args.steps, args.seed)
+    unexpected = [name for name in super_linear_targets if not name.startswith('legacy_')]
+    sys.exit(1 if unexpected else 0)
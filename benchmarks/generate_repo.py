@@ -0,0 +1,165 @@
+import csv
+import random
+import argparse
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+OWNERS = ['A_RAIABD', 'NFE', 'SISBF', 'MSAF_DFE', 'USR_MS_ESTOQ', 'USR_MS_PEDIDO', 'USR_MS_PRECO', 'PRODUCAO',
+          'CONSULTA', 'USR_MAG', 'PUBLIC', 'SYS']
+OBJECT_TYPES = {'TABLE': 40, 'VIEW': 10, 'SYNONYM': 25, 'INDEX': 10, 'PACKAGE': 4, 'PACKAGE BODY': 4, 'PROCEDURE': 3,
+                'FUNCTION': 2, 'TRIGGER': 1, 'SEQUENCE': 1}
+WORDS = ['NF', 'ITEM', 'FILIAL', 'PRODUTO', 'CLIENTE', 'ESTOQUE', 'PEDIDO', 'FATURA', 'CONTRATO', 'PRECO', 'LOJA',
+         'ENDERECO', 'GERAL', 'TRANSF', 'COMPRA', 'VENDA', 'LOTE', 'CAIXA', 'ROTA', 'ENTREGA', 'FISCAL', 'CFOP']
+COLUMNS = ['ID', 'CD_FILIAL', 'CD_PRODUTO', 'DT_EMISSAO', 'VL_TOTAL', 'QT_ITEM', 'NM_CLIENTE', 'SG_ESTADO', 'FL_ATIVO']
+LANGUAGES = {'java': 0.55, 'js': 0.2, 'php': 0.15, 'sql': 0.1}
+ENCODINGS = {'utf-8': 0.8, 'windows-1252': 0.2}
+NOISE = ['int total = 0;', 'total += item.getQuantidade();', 'if (lista == null) { return; }',
+         'log.info("processando registro " + id);', 'for (Item item : itens) { valores.add(item); }',
+         '// Descrição: cálculo do preço médio', 'resultado.put("chave", valor);']
+
+
+@dataclass
+class RepoSpec:
+    files: int = 200
+    lines_per_file: int = 150
+    sql_density: float = 0.2  # fraction of the generated lines that carry a sql string
+    languages: Dict[str, float] = field(default_factory=lambda: dict(LANGUAGES))
+    encodings: Dict[str, float] = field(default_factory=lambda: dict(ENCODINGS))
+    seed: int = 42
+
+
+def generate_catalog(csv_path: Path, objects: int = 75000, seed: int = 42) -> List[str]:
+    """write a catalog in the r102_objects.csv layout and return the names of its tables and views"""
+    rng = random.Random(seed)
+    types, weights = list(OBJECT_TYPES), list(OBJECT_TYPES.values())
+    names = set()
+    relations = []
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+        writer.writerow(['OWNER', 'OBJECT_NAME', 'OBJECT_TYPE'])
+        while len(names) < objects:
+            object_type = rng.choices(types, weights)[0]
+            prefix = {'TABLE': 'TB', 'VIEW': 'VW', 'INDEX': 'IX', 'PACKAGE': 'PKG', 'PACKAGE BODY': 'PKG',
+                      'SEQUENCE': 'SQ'}.get(object_type, object_type[:2])
+            name = f"{prefix}_{'_'.join(rng.sample(WORDS, rng.randint(1, 3)))}_{rng.randint(1, 999)}"
+            if name in names:
+                continue
+            names.add(name)
+            writer.writerow([rng.choice(OWNERS), name, object_type])
+            if object_type in ('TABLE', 'VIEW'):
+                relations.append(name)
+    return relations
+
+
+def sql_statement(rng: random.Random, relations: List[str]) -> str:
+    table, other = rng.choice(relations), rng.choice(relations)
+    columns = ', '.join(rng.sample(COLUMNS, 3))
+    match rng.randint(0, 5):
+        case 0 | 1 | 2:
+            return (f"SELECT {columns} FROM {table} A INNER JOIN {other} B ON (A.ID = B.ID) "
+                    f"WHERE A.{rng.choice(COLUMNS)} = ?")
+        case 3:
+            return f"INSERT INTO {table} ({columns}) VALUES (?, ?, ?)"
+        case 4:
+            return f"UPDATE {table} SET {rng.choice(COLUMNS)} = ? WHERE ID IN (SELECT ID FROM {other})"
+        case _:
+            return f"DELETE FROM {table} WHERE {rng.choice(COLUMNS)} = :valor"
+
+
+def java_file(rng: random.Random, spec: RepoSpec, relations: List[str], index: int) -> str:
+    class_name = f"Generated{index}DAO"
+    lines = [f"package br.com.bench.dao{index % 20};", "", "import java.util.List;",
+             "import javax.persistence.Query;", "", f"public class {class_name} {{", ""]
+    lines.append(f'    private static final String SQL_BASE = "{sql_statement(rng, relations)}"')
+    lines.append(f'        + " AND ROWNUM <= 100";')
+    method = 0
+    while len(lines) < spec.lines_per_file:
+        method += 1
+        lines.append(f"    public List<Object> metodo{method}(Long id) {{")
+        lines.append("        StringBuilder sql = new StringBuilder();")
+        for _ in range(rng.randint(3, 15)):
+            if rng.random() < spec.sql_density:
+                for fragment in sql_statement(rng, relations).split(' WHERE '):
+                    lines.append(f'        sql.append(" {fragment} ");')
+            else:
+                lines.append(f"        {rng.choice(NOISE)}")
+        lines.append("        Query query = em.createNativeQuery(sql.toString());")
+        lines.append("        return query.getResultList();")
+        lines.append("    }")
+        lines.append("")
+    lines.append("}")
+    return '\n'.join(lines) + '\n'
+
+
+def js_file(rng: random.Random, spec: RepoSpec, relations: List[str], index: int) -> str:
+    lines = [f"// modulo {index}", "const db = require('./db');", ""]
+    while len(lines) < spec.lines_per_file:
+        if rng.random() < spec.sql_density:
+            quote = rng.choice(["'", '"', '`'])
+            lines.append(f"const sql{len(lines)} = {quote}{sql_statement(rng, relations)}{quote};")
+        else:
+            lines.append(f"let valor{len(lines)} = calcula({rng.randint(0, 100)}); // preço")
+    return '\n'.join(lines) + '\n'
+
+
+def php_file(rng: random.Random, spec: RepoSpec, relations: List[str], index: int) -> str:
+    lines = ["<?php", f"// pagina {index}", ""]
+    while len(lines) < spec.lines_per_file:
+        if rng.random() < spec.sql_density:
+            quote = rng.choice(["'", '"'])
+            lines.append(f"$sql = {quote}{sql_statement(rng, relations)}{quote};")
+        else:
+            lines.append(f"$total = $total + {rng.randint(0, 100)}; // média")
+    lines.append("?>")
+    return '\n'.join(lines) + '\n'
+
+
+def sql_file(rng: random.Random, spec: RepoSpec, relations: List[str], index: int) -> str:
+    lines = [f"-- script {index}"]
+    while len(lines) < spec.lines_per_file:
+        lines.append(sql_statement(rng, relations).replace('?', "'X'").replace(':valor', '1') + ';')
+        if rng.random() < 0.1:
+            lines.append('/')
+    return '\n'.join(lines) + '\n'
+
+
+GENERATORS = {'java': java_file, 'js': js_file, 'php': php_file, 'sql': sql_file}
+
+
+def generate_repo(root_directory: Path, relations: List[str], spec: RepoSpec = RepoSpec()) -> List[Path]:
+    """write a synthetic repository; the same spec and relations always produce byte-identical files"""
+    rng = random.Random(spec.seed)
+    languages, language_weights = list(spec.languages), list(spec.languages.values())
+    encodings, encoding_weights = list(spec.encodings), list(spec.encodings.values())
+    written = []
+    for index in range(spec.files):
+        language = rng.choices(languages, language_weights)[0]
+        encoding = rng.choices(encodings, encoding_weights)[0]
+        file_path = root_directory / f"module{index % 10}" / language / f"File{index}.{language}"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        content = GENERATORS[language](rng, spec, relations, index)
+        file_path.write_bytes(content.encode(encoding, errors='replace'))
+        written.append(file_path)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository and catalog")
+    parser.add_argument('--output', type=Path, default=Path(__file__).parent / 'data')
+    parser.add_argument('--files', type=int, default=RepoSpec.files)
+    parser.add_argument('--lines_per_file', type=int, default=RepoSpec.lines_per_file)
+    parser.add_argument('--sql_density', type=float, default=RepoSpec.sql_density)
+    parser.add_argument('--cp1252_ratio', type=float, default=ENCODINGS['windows-1252'],
+                        help='Fraction of the files written as windows-1252 instead of utf-8')
+    parser.add_argument('--catalog_objects', type=int, default=75000)
+    parser.add_argument('--seed', type=int, default=RepoSpec.seed)
+    args = parser.parse_args()
+
+    catalog_relations = generate_catalog(args.output / 'catalog.csv', args.catalog_objects, args.seed)
+    repo_spec = RepoSpec(files=args.files, lines_per_file=args.lines_per_file, sql_density=args.sql_density,
+                         encodings={'utf-8': 1 - args.cp1252_ratio, 'windows-1252': args.cp1252_ratio},
+                         seed=args.seed)
+    generated = generate_repo(args.output / 'repo', catalog_relations, repo_spec)
+    print(f"{len(generated)} files written to {args.output / 'repo'}, catalog at {args.output / 'catalog.csv'}")
@@ -0,0 +1,314 @@
+import re
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timezone
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCHMARKS_DIR.parent
+for module_dir in (ROOT_DIR / 'src' / 'db_obj_list', ROOT_DIR / 'src' / 'code_mapper', ROOT_DIR / 'scripts',
+                   BENCHMARKS_DIR):
+    if str(module_dir) not in sys.path:
+        sys.path.insert(0, str(module_dir))
+
+from generate_repo import OWNERS, RepoSpec, generate_catalog, generate_repo
+
+HISTORY_FILE = BENCHMARKS_DIR / 'history.json'
+REGRESSION_THRESHOLD = 0.10  # report slowdowns above 10% against the previous run of the same spec
+
+
+@dataclass
+class BenchmarkData:
+    repo: Path
+    catalog: Path
+
+
+@dataclass
+class ScenarioResult:
+    files: int = 0
+    bytes: int = 0
+    hits: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+    @property
+    def hits_per_second(self) -> float:
+        return self.hits / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {'files_per_second': self.files_per_second, 'mb_per_second': self.mb_per_second,
+                               'hits_per_second': self.hits_per_second}
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[object], ScenarioResult]
+    setup: Callable[[BenchmarkData], object] = lambda data: data
+
+
+def repo_files(repo: Path, suffixes: set) -> List[Path]:
+    return sorted(path for path in repo.glob('**/*') if path.suffix.lower() in suffixes)
+
+
+def code_db_mapper(data: BenchmarkData) -> ScenarioResult:
+    from db_code_map import CodeDbMapper
+    files = repo_files(data.repo, {'.java', '.sql', '.php', '.js'})
+    mapper = CodeDbMapper(owners=set(OWNERS))
+    mapper.load_db_objects_csv(data.catalog)
+    mapper.find_tokens(data.repo)
+    return ScenarioResult(files=len(files), bytes=sum(path.stat().st_size for path in files), hits=len(mapper.mapped))
+
+
+def setup_db_object_map(data: BenchmarkData):
+    from metadata import Origin, OriginType
+    from db_object_read import get_oracle_objects_from_csv
+    origin = Origin(name="BENCH", description="synthetic catalog", type=OriginType.ORACLE_DB)
+    db_object_dict = {}
+    for db_object in get_oracle_objects_from_csv(origin=origin, csv_filepath=str(data.catalog)):
+        db_object_dict.setdefault(db_object.namespace, {}).setdefault(db_object.type.value, {})[db_object.name] = \
+            db_object
+    return data, db_object_dict
+
+
+def db_object_map_find_tokens(state) -> ScenarioResult:
+    import db_object_map
+    data, db_object_dict = state
+    files = repo_files(data.repo, {'.java', '.sql', '.php', '.js'})
+    results = db_object_map.find_tokens(data.repo, db_object_dict)
+    return ScenarioResult(files=len(files), bytes=sum(path.stat().st_size for path in files), hits=len(results))
+
+
+def run_java_parser(data: BenchmarkData, parse: Callable[[Path], object]) -> ScenarioResult:
+    result = ScenarioResult()
+    for file_path in repo_files(data.repo, {'.java'}):
+        result.files += 1
+        result.bytes += file_path.stat().st_size
+        try:
+            parse(file_path)
+        except Exception:
+            result.errors += 1
+    return result
+
+
+def antlr_parser(data: BenchmarkData) -> ScenarioResult:
+    from java_code_parser_ex import parse_java_file
+    return run_java_parser(data, parse_java_file)
+
+
+def treesitter_parser(data: BenchmarkData) -> ScenarioResult:
+    from ts_java_parser import parse_java_file
+    return run_java_parser(data, parse_java_file)
+
+
+def javalang_parser(data: BenchmarkData) -> ScenarioResult:
+    from string_ext_javalang import parse_java_file
+    from db_code_map import CodeDbMapper
+    return run_java_parser(data, lambda path: parse_java_file(CodeDbMapper.read_file_with_fallback_encoding(path)))
+
+
+# the approaches sql_lexer replaced: the keyword seen last on a token split and the DOTALL patterns of analyze_code
+TOKEN_SPLIT_PATTERN = re.compile(r'[,;:\s]\s*')
+REGEX_READ_PATTERNS = [re.compile(r'SELECT\s.*?\sFROM\s+(\w+)', re.IGNORECASE | re.DOTALL),
+                       re.compile(r'JOIN\s+(\w+)\s', re.IGNORECASE | re.DOTALL)]
+REGEX_MODIFY_PATTERNS = [re.compile(r'(INSERT INTO|UPDATE|DELETE FROM)\s+(\w+)', re.IGNORECASE)]
+
+
+def setup_sql_texts(data: BenchmarkData) -> List[str]:
+    """the string literals of every file joined into one text per file, as the query texts of a file are lexed"""
+    from db_code_map import CodeDbMapper, find_java_strings, find_sql_strings, find_php_strings, find_js_strings
+    finders = {'.java': find_java_strings, '.sql': find_sql_strings, '.php': find_php_strings, '.js': find_js_strings}
+    texts = []
+    for file_path in repo_files(data.repo, set(finders)):
+        content = CodeDbMapper.read_file_with_fallback_encoding(file_path)
+        texts.append(';\n'.join(finders[file_path.suffix.lower()](content)))
+    return texts
+
+
+def sql_result(texts: List[str], references: int) -> ScenarioResult:
+    return ScenarioResult(files=len(texts), bytes=sum(len(text.encode()) for text in texts), hits=references)
+
+
+def sql_lexer(texts: List[str]) -> ScenarioResult:
+    from sql_lexer import object_references
+    return sql_result(texts, sum(1 for text in texts for reference in object_references(text) if reference.operation))
+
+
+def sql_token_split(texts: List[str]) -> ScenarioResult:
+    references = 0
+    for text in texts:
+        operation = ''
+        for token in TOKEN_SPLIT_PATTERN.split(text):
+            token = token.upper()
+            if token in ('FROM', 'JOIN'):
+                operation = 'R'
+            elif token in ('INSERT', 'UPDATE', 'DELETE', 'MERGE'):
+                operation = 'M'
+            elif operation:
+                references += 1
+    return sql_result(texts, references)
+
+
+def sql_regex_patterns(texts: List[str]) -> ScenarioResult:
+    return sql_result(texts, sum(1 for text in texts for pattern in REGEX_READ_PATTERNS + REGEX_MODIFY_PATTERNS
+                                 for _ in pattern.finditer(text)))
+
+
+def setup_upsert_csv(data: BenchmarkData):
+    """map the repo once and write the hits as a TB_MAP csv and an empty sqlite database for the upsert to load"""
+    from sqlalchemy import create_engine
+    from db_code_map import CodeDbMapper
+    from model import Base
+    from upsert_csv import CSVFileInfo, ColumnMapping
+
+    work_dir = data.repo.parent / 'upsert'
+    work_dir.mkdir(exist_ok=True)
+    database = work_dir / 'bench.db'
+    database.unlink(missing_ok=True)
+    engine = create_engine(f'sqlite:///{database}')
+    Base.metadata.create_all(engine)
+
+    mapper = CodeDbMapper(owners=set(OWNERS))
+    mapper.load_db_objects_csv(data.catalog)
+    mapper.find_tokens(data.repo)
+    csv_file = work_dir / 'TB_MAP.csv'
+    columns = ['code', 'from', 'to', 'map_type', 'db_operation', 'line_number', 'file_path', 'file_name']
+    with open(csv_file, 'w', encoding='utf-8') as output:
+        output.write(';'.join(columns) + '\n')
+        for index, token_info in enumerate(mapper.mapped):
+            output.write(';'.join([str(index), token_info.repo_name, f'{token_info.owner}.{token_info.object_name}',
+                                   'db_access', token_info.operation, str(token_info.line_number),
+                                   token_info.file_path.replace(';', '_'), token_info.file_name]) + '\n')
+    csv_file_info = CSVFileInfo(csv_file=csv_file, separator=';', has_header=True, table_name='TB_MAP',
+                                column_mapping={'from': ColumnMapping(name='from_code'),
+                                                'to': ColumnMapping(name='to_code')})
+    return engine, csv_file_info, len(mapper.mapped)
+
+
+def upsert_csv(state) -> ScenarioResult:
+    from upsert_csv import bulk_upsert
+    engine, csv_file_info, rows = state
+    bulk_upsert(csv_file_info, engine)
+    return ScenarioResult(files=1, bytes=csv_file_info.csv_file.stat().st_size, hits=rows)
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in [
+    Scenario('code_db_mapper', code_db_mapper),
+    Scenario('db_object_map_find_tokens', db_object_map_find_tokens, setup_db_object_map),
+    Scenario('antlr_parser', antlr_parser),
+    Scenario('javalang_parser', javalang_parser),
+    Scenario('treesitter_parser', treesitter_parser),
+    Scenario('upsert_csv', upsert_csv, setup_upsert_csv),
+    Scenario('sql_lexer', sql_lexer, setup_sql_texts),
+    Scenario('sql_token_split', sql_token_split, setup_sql_texts),
+    Scenario('sql_regex_patterns', sql_regex_patterns, setup_sql_texts),
+]}
+
+
+def run_scenario(name: str, data: BenchmarkData) -> dict:
+    """executed in a fresh process, so that the peak RSS belongs to this scenario alone"""
+    scenario = SCENARIOS[name]
+    state = scenario.setup(data)
+    start = time.perf_counter()
+    result = scenario.run(state)
+    result.seconds = time.perf_counter() - start
+    result.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result.to_dict()
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_file: Path = HISTORY_FILE) -> List[dict]:
+    if not history_file.exists():
+        return []
+    with open(history_file, encoding='utf-8') as history:
+        return json.load(history)
+
+
+def previous_run(history: List[dict], spec: dict, scenario: str) -> dict | None:
+    for run in reversed(history):
+        if run['spec'] == spec and scenario in run['results'] and 'error' not in run['results'][scenario]:
+            return run['results'][scenario]
+    return None
+
+
+def run_benchmarks(scenario_names: List[str], spec: RepoSpec, catalog_objects: int, data_dir: Path,
+                   history_file: Path = HISTORY_FILE) -> dict:
+    relations = generate_catalog(data_dir / 'catalog.csv', catalog_objects, spec.seed)
+    generate_repo(data_dir / 'repo', relations, spec)
+    data = BenchmarkData(repo=data_dir / 'repo', catalog=data_dir / 'catalog.csv')
+
+    history = load_history(history_file)
+    run = {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': current_commit(),
+           'spec': asdict(spec) | {'catalog_objects': catalog_objects}, 'results': {}}
+
+    spawn = multiprocessing.get_context('spawn')
+    print(f"{'scenario':<28}{'seconds':>9}{'files/s':>10}{'MB/s':>8}{'hits/s':>11}{'peak MB':>9}  vs previous")
+    for name in scenario_names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            try:
+                result = executor.submit(run_scenario, name, data).result()
+            except Exception as e:
+                run['results'][name] = {'error': repr(e)}
+                print(f"{name:<28} failed: {e!r}")
+                continue
+        run['results'][name] = result
+
+        comparison = ''
+        if previous := previous_run(history, run['spec'], name):
+            change = (previous['seconds'] - result['seconds']) / previous['seconds'] if previous['seconds'] else 0.0
+            comparison = f"{change:+.1%}" + ('  REGRESSION' if change < -REGRESSION_THRESHOLD else '')
+        print(f"{name:<28}{result['seconds']:>9.3f}{result['files_per_second']:>10.1f}"
+              f"{result['mb_per_second']:>8.2f}{result['hits_per_second']:>11.0f}{result['peak_rss_mb']:>9.1f}"
+              f"  {comparison}")
+
+    history.append(run)
+    with open(history_file, 'w', encoding='utf-8') as output:
+        json.dump(history, output, indent=2)
+    return run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the mapping benchmarks on a synthetic repository")
+    parser.add_argument('--scenarios', type=str, default=','.join(SCENARIOS),
+                        help=f"Scenarios separated by comma, from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--files', type=int, default=RepoSpec.files)
+    parser.add_argument('--lines_per_file', type=int, default=RepoSpec.lines_per_file)
+    parser.add_argument('--sql_density', type=float, default=RepoSpec.sql_density)
+    parser.add_argument('--cp1252_ratio', type=float, default=0.2)
+    parser.add_argument('--catalog_objects', type=int, default=75000)
+    parser.add_argument('--seed', type=int, default=RepoSpec.seed)
+    parser.add_argument('--data_dir', type=Path, default=BENCHMARKS_DIR / 'data')
+    parser.add_argument('--history', type=Path, default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    names = args.scenarios.split(',')
+    if unknown := [name for name in names if name not in SCENARIOS]:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    repo_spec = RepoSpec(files=args.files, lines_per_file=args.lines_per_file, sql_density=args.sql_density,
+                         encodings={'utf-8': 1 - args.cp1252_ratio, 'windows-1252': args.cp1252_ratio},
+                         seed=args.seed)
+    run_benchmarks(names, repo_spec, args.catalog_objects, args.data_dir, args.history)
@@ -0,0 +1,73 @@
+-- regression corpus of db_obj_list/sql_lexer.py: python sql_lexer.py --corpus ../../examples/sql_lexer_corpus.sql
+-- each case lists, in order, the references it expects with their operation (R read, M modify, - no statement)
+-- expect: TB_NF=R TB_ITEM=R
+SELECT A.ID, B.QT_ITEM FROM TB_NF A JOIN TB_ITEM B ON B.ID_NF = A.ID
+-- expect: TB_NF=R TB_ITEM=R
+select * from tb_nf a, tb_item b where a.id = b.id_nf
+-- expect: TB_NF=M
+INSERT INTO TB_NF (ID, DT_EMISSAO) VALUES (:id, SYSDATE)
+-- expect: TB_NF_HIST=M TB_NF=R TB_ITEM=R
+INSERT INTO TB_NF_HIST (ID, VL_TOTAL) SELECT N.ID, SUM(I.VL) FROM TB_NF N JOIN TB_ITEM I ON I.ID_NF = N.ID
+-- expect: TB_A=M TB_B=M TB_C=R
+INSERT ALL INTO TB_A (ID) VALUES (ID) INTO TB_B (ID) VALUES (ID) SELECT ID FROM TB_C
+-- expect: TB_NF=M TB_ITEM=R
+UPDATE TB_NF SET VL_TOTAL = (SELECT SUM(VL) FROM TB_ITEM WHERE ID_NF = TB_NF.ID) WHERE ID = ?
+-- expect: TB_NF=M TB_BLOQUEIO=R
+DELETE FROM TB_NF WHERE EXISTS (SELECT 1 FROM TB_BLOQUEIO B WHERE B.ID_NF = TB_NF.ID)
+-- expect: TB_NF=M
+DELETE TB_NF WHERE ID = :id
+-- expect: TB_ESTOQUE=M TB_MOVIMENTO=R
+MERGE INTO TB_ESTOQUE E USING (SELECT CD_PRODUTO, SUM(QT) QT FROM TB_MOVIMENTO GROUP BY CD_PRODUTO) M
+ON (E.CD_PRODUTO = M.CD_PRODUTO)
+WHEN MATCHED THEN UPDATE SET E.QT = E.QT + M.QT
+WHEN NOT MATCHED THEN INSERT (CD_PRODUTO, QT) VALUES (M.CD_PRODUTO, M.QT)
+-- expect: TB_PRECO=M TB_PRECO_NOVO=R
+MERGE INTO TB_PRECO P USING TB_PRECO_NOVO N ON (P.ID = N.ID) WHEN MATCHED THEN UPDATE SET P.VL = N.VL DELETE WHERE P.VL = 0
+-- expect: TB_NF=R
+SELECT * FROM TB_NF WHERE ID = ? FOR UPDATE NOWAIT
+-- expect: TB_NF=R
+SELECT * FROM TB_NF FOR UPDATE OF VL_TOTAL
+-- expect: TB_ITEM=R TB_NF=R
+WITH ITENS AS (SELECT ID_NF, COUNT(*) QT FROM TB_ITEM GROUP BY ID_NF) SELECT * FROM TB_NF N JOIN ITENS I ON I.ID_NF = N.ID
+-- expect: NFE.TB_NF=M NFE.TB_ITEM=R
+UPDATE NFE.TB_NF N SET N.FL_ATIVO = 0 WHERE N.ID IN (SELECT ID_NF FROM NFE.TB_ITEM)
+-- expect: NFE.TB_NF=R
+SELECT * FROM "NFE"."TB_NF"
+-- expect: Tb_Misto=M
+DELETE FROM "Tb_Misto" WHERE ID = 1
+-- expect: TB_REMOTO=R
+SELECT * FROM TB_REMOTO@DBLINK_MTZ
+-- expect: TB_LOG=M TB_NF=R
+INSERT INTO TB_LOG (MSG) VALUES ('DELETE FROM TB_NF'); SELECT * FROM TB_NF
+-- expect: TB_NF=M TB_ITEM=M
+DELETE FROM TB_NF WHERE ID = 1; DELETE FROM TB_ITEM WHERE ID_NF = 1
+-- expect: TB_TEMP=M
+TRUNCATE TABLE TB_TEMP
+-- expect: TB_NF=R
+SELECT /* FROM TB_IGNORADA */ ID FROM TB_NF -- , TB_COMENTADA
+-- expect: PKG_FATURA.CALCULAR=-
+{call PKG_FATURA.CALCULAR(?, ?)}
+-- expect: TB_NF=-
+TB_NF
+-- expect: TB_NF=R TB_ITEM=R
+SELECT TRIM(BOTH ' ' FROM NM) FROM TB_NF WHERE ID IN (SELECT ID_NF FROM TB_ITEM)
+-- expect: TB_NF=R
+SELECT * FROM TB_NF WHERE NM = 'it''s FROM TB_X' AND ID = #{id} AND CD = ${cd}
+-- expect: TB_NF=R
+ FROM TB_NF N 
+-- expect: TB_FILIAL=R
+ INNER JOIN TB_FILIAL F ON F.CD_FILIAL = N.CD_FILIAL 
+-- expect: TB_NF=R TB_ITEM=R
+ FROM TB_NF N, TB_ITEM I WHERE I.ID_NF = N.ID 
+-- expect: TB_ESTOQUE=R
+ USING TB_ESTOQUE E ON (E.ID = M.ID) 
+-- expect: TB_NF_HIST=M
+ INTO TB_NF_HIST (ID, VL_TOTAL) 
+-- expect: TB_NF=M
+ UPDATE TB_NF SET VL_TOTAL = ? 
+-- expect: TB_NF=M
+ DELETE FROM TB_NF 
+-- expect: CD_FILIAL=-
+ WHERE CD_FILIAL = ? 
+-- expect: TB_PEDIDO=R TB_CACHE=M
+CREATE TRIGGER TRG_PEDIDO BEFORE INSERT ON TB_PEDIDO FOR EACH ROW BEGIN DELETE FROM TB_CACHE WHERE ID = :NEW.ID; END
@@ -1,4 +1,6 @@
 import csv
+import sys
+import time
 import yaml
 from pydantic import BaseModel, field_validator
 from sqlalchemy import create_engine, MetaData, Table
@@ -6,6 +8,12 @@ from sqlalchemy.dialects.sqlite import insert
 from pathlib import Path
 import argparse
 
+DB_OBJ_LIST_DIR = Path(__file__).resolve().parent.parent / 'src' / 'db_obj_list'
+if str(DB_OBJ_LIST_DIR) not in sys.path:
+    sys.path.insert(0, str(DB_OBJ_LIST_DIR))
+
+from instrumentation import instrumentation
+
 
 # Pydantic classes
 class ColumnMapping(BaseModel):
@@ -48,7 +56,7 @@ def bulk_upsert(csv_file_info: CSVFileInfo, engine, batch_size: int = 1000):
                 reader = (dict(zip(column_order_lower, row)) for row in reader)
 
         batch_data = []
-        for row in reader:
+        for row in instrumentation.timed(reader, 'csv_read'):
             row_data = {}
             for col in row:
                 col_lower = col.lower()
@@ -76,8 +84,9 @@ def execute_batch_upsert(batch_data, table, keys, engine):
     update_dict = {c.name: c for c in stmt.excluded if not c.primary_key}
     upsert_stmt = stmt.on_conflict_do_update(index_elements=keys, set_=update_dict).values(batch_data)
 
-    with engine.begin() as conn:
+    with instrumentation.phase('db_upsert'), engine.begin() as conn:
         conn.execute(upsert_stmt)
+    instrumentation.count(f'rows_{table.name}', len(batch_data))
 
 
 def main(config_path: Path):
@@ -88,7 +97,11 @@ def main(config_path: Path):
     engine = create_engine(config.database_uri)
 
     for csv_file_info in config.csv_files_info:
+        start = time.perf_counter()
         bulk_upsert(csv_file_info, engine)
+        if instrumentation.enabled:
+            instrumentation.record_file(csv_file_info.csv_file, 'csv', csv_file_info.csv_file.stat().st_size,
+                                        time.perf_counter() - start)
 
     print("Data uploaded successfully.")
 
@@ -96,5 +109,11 @@ def main(config_path: Path):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bulk Upsert CSV data into a Database")
     parser.add_argument("config", type=Path, help="Path to the YAML configuration file")
+    parser.add_argument("--profile_report", type=Path, help="Write a json report of the time spent per phase")
+    parser.add_argument("--pstats", type=Path, help="Also run cProfile and dump its stats to this file")
     args = parser.parse_args()
+    if args.profile_report or args.pstats:
+        instrumentation.enable(profile=bool(args.pstats))
     main(args.config)
+    if instrumentation.enabled:
+        instrumentation.write_report(args.profile_report, args.pstats)
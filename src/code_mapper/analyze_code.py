@@ -1,15 +1,6 @@
-import re
 from metadata import *
 from db_object_read import *
-
-
-READ_PATTERNS = [
-    re.compile(r'SELECT\s.*?\sFROM\s+(\w+)', re.IGNORECASE | re.DOTALL),
-    re.compile(r'JOIN\s+(\w+)\s', re.IGNORECASE | re.DOTALL)
-]
-MODIFY_PATTERNS = [
-    re.compile(r'(INSERT INTO|UPDATE|DELETE FROM)\s+(\w+)', re.IGNORECASE)
-]
+from sql_lexer import object_references
 
 
 def identify_db_objects_in_string_var(identifier: Identifier, variable_str: str, db_owner: str,
@@ -35,21 +26,14 @@ def identify_db_objects_in_string_var(identifier: Identifier, variable_str: str,
 
     db_object_usages = []
 
-    for pattern in READ_PATTERNS:
-        for match in pattern.finditer(variable_str):
-            db_object_name = match.group(1).upper()
-            db_object, object_type = get_db_object_and_type(db_object_name, db_owner, db_objects)
-            if object_type:
-                db_object_usages.append(
-                    DBObjectMapping(identifier=identifier, db_object=db_object, operation=DBOperation.READ))
-
-    for pattern in MODIFY_PATTERNS:
-        for match in pattern.finditer(variable_str):
-            db_object_name = match.group(2).upper()
-            db_object, object_type = get_db_object_and_type(db_object_name, db_owner, db_objects)
-            if object_type:
-                db_object_usages.append(
-                    DBObjectMapping(identifier=identifier, db_object=db_object, operation=DBOperation.MODIFY))
+    for reference in object_references(variable_str):
+        # names outside of a statement and the columns of alias.column are not object usages
+        if not reference.operation or reference.qualifier not in (None, db_owner):
+            continue
+        db_object, object_type = get_db_object_and_type(reference.name, db_owner, db_objects)
+        if object_type:
+            operation = DBOperation.MODIFY if reference.operation == 'M' else DBOperation.READ
+            db_object_usages.append(DBObjectMapping(identifier=identifier, db_object=db_object, operation=operation))
 
     return db_object_usages
 
@@ -0,0 +1,147 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set
+from java_code_parser_metadata import JavaFileInfo, ObjectType, ReferenceTypeInfo
+from query_text import unquote
+
+# the tokens of a constant initializer as getText() returns it: string literals, (qualified) names, + and parentheses
+initializer_token_pattern = re.compile(r'\s*(?:("""[\s\S]*?"""|"(?:\\.|[^"\\])*")|([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)|([+()]))')
+
+
+@dataclass
+class TypeContext:
+    """what a name used inside a type can refer to"""
+    qualified_name: str
+    package_name: str
+    imports: List[str] = field(default_factory=list)
+    supertypes: List[str] = field(default_factory=list)  # simple or qualified names, as written in the code
+
+
+@dataclass
+class ConstantInfo:
+    qualified_name: str  # package.Type.NAME
+    initializer: str
+    line_number: int
+    context: TypeContext
+
+
+def type_context(java_file_info: JavaFileInfo, reference_type: ReferenceTypeInfo) -> TypeContext:
+    package_name = java_file_info.package_name or ''
+    return TypeContext(
+        qualified_name=f"{package_name}.{reference_type.name}" if package_name else reference_type.name,
+        package_name=package_name,
+        imports=java_file_info.imports,
+        supertypes=[inheritance.name for inheritance in (reference_type.extends or []) if inheritance.name])
+
+
+class ConstantTable:
+    """
+    The String fields of a whole repository, indexed by qualified name. Initializers are folded on demand, each one
+    once (memoized): references to other constants are resolved through the package, imports and supertypes of the
+    declaring type, and a constant whose value depends on itself is reported in cycles and left unresolved.
+    """
+
+    def __init__(self) -> None:
+        self.constants: Dict[str, ConstantInfo] = {}
+        self.types_by_simple_name: Dict[str, Set[str]] = {}
+        self.contexts: Dict[str, TypeContext] = {}
+        self.cycles: List[str] = []
+        self._folded: Dict[str, str | None] = {}
+        self._folding: Set[str] = set()
+
+    @classmethod
+    def from_files(cls, java_file_infos: Iterable[JavaFileInfo]) -> 'ConstantTable':
+        table = cls()
+        for java_file_info in java_file_infos:
+            table.add_file(java_file_info)
+        return table
+
+    def add_file(self, java_file_info: JavaFileInfo) -> None:
+        for reference_type in java_file_info.reference_types:
+            context = type_context(java_file_info, reference_type)
+            self.contexts[context.qualified_name] = context
+            self.types_by_simple_name.setdefault(reference_type.name, set()).add(context.qualified_name)
+            for field_info in reference_type.fields:
+                if field_info.type == ObjectType.STRING.value and field_info.value:
+                    qualified_name = f"{context.qualified_name}.{field_info.name}"
+                    self.constants[qualified_name] = ConstantInfo(qualified_name, field_info.value,
+                                                                  field_info.line_number, context)
+        self._folded.clear()  # new files can resolve names that were unresolved before
+
+    def qualified_types(self, type_name: str, context: TypeContext) -> List[str]:
+        """the candidate qualified names of a type name used inside context, the most specific first"""
+        candidates = [f"{context.qualified_name}.{type_name}"]  # nested type
+        candidates += [imported for imported in context.imports if imported.endswith(f".{type_name}")]
+        candidates.append(f"{context.package_name}.{type_name}" if context.package_name else type_name)
+        candidates += [f"{imported}.{type_name}" for imported in context.imports]  # on demand imports
+        candidates.append(type_name)  # already qualified
+        # a type declared once in the repository, referenced without an import the parser could see
+        if len(known := self.types_by_simple_name.get(type_name, ())) == 1:
+            candidates.extend(known)
+        return candidates
+
+    def candidates(self, name: str, context: TypeContext) -> List[str]:
+        """the qualified constant names a (possibly qualified) name used inside context can refer to"""
+        type_name, _, constant_name = name.rpartition('.')
+        if type_name:
+            return [f"{qualified_type}.{constant_name}" for qualified_type in self.qualified_types(type_name, context)]
+        candidates = [f"{context.qualified_name}.{name}"]
+        for supertype in context.supertypes:
+            candidates += [f"{qualified_type}.{name}" for qualified_type in self.qualified_types(supertype, context)]
+        candidates += [imported for imported in context.imports if imported.endswith(f".{name}")]  # static import
+        candidates += [f"{imported}.{name}" for imported in context.imports]  # static on demand import
+        return candidates
+
+    def resolve(self, name: str, context: TypeContext) -> str | None:
+        """the folded value of the constant a name refers to, None when it is not a known, foldable constant"""
+        for qualified_name in self.candidates(name, context):
+            if qualified_name in self.constants:
+                return self.value(qualified_name)
+        return None
+
+    def value(self, qualified_name: str) -> str | None:
+        if qualified_name in self._folded:
+            return self._folded[qualified_name]
+        if qualified_name in self._folding:
+            self.cycles.append(qualified_name)
+            return None
+        constant = self.constants[qualified_name]
+        self._folding.add(qualified_name)
+        try:
+            value = self.fold(constant.initializer, constant.context)
+        finally:
+            self._folding.discard(qualified_name)
+        self._folded[qualified_name] = value
+        return value
+
+    def fold(self, initializer: str, context: TypeContext) -> str | None:
+        """
+        Evaluate a concatenation of literals and constants. Anything else (method calls, other operators, non-String
+        values) makes the whole initializer unresolved, since a partial value would hide part of the query.
+        """
+        initializer = initializer.strip()
+        parts = []
+        position = 0
+        previous_name = False
+        while position < len(initializer):
+            match = initializer_token_pattern.match(initializer, position)
+            if not match:
+                return None
+            literal, name, symbol = match.groups()
+            if literal:
+                parts.append(unquote(literal))
+            elif name:
+                value = self.resolve(name, context)
+                if value is None:
+                    return None
+                parts.append(value)
+            elif symbol == '(' and previous_name:
+                return None  # a method call
+            previous_name = name is not None
+            position = match.end()
+        return ''.join(parts) if parts else None
+
+    def folded_fields(self) -> Dict[str, str]:
+        """every constant that folds to a value"""
+        return {qualified_name: value for qualified_name in self.constants
+                if (value := self.value(qualified_name)) is not None}
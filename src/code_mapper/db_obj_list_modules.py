@@ -0,0 +1,52 @@
+"""
+The modules of src/db_obj_list the java parsers and mappers use when that directory is on the path, and stand-ins
+otherwise, so that parsing, --file and --compare run from src/code_mapper alone: an instrumentation that stays
+disabled and a walk that lists every file of the languages, without the .gitignore files and the excludes.
+"""
+import os
+from pathlib import Path
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, NamedTuple
+
+try:
+    from instrumentation import instrumentation
+except ImportError:
+    class DisabledInstrumentation:
+        enabled = False
+
+        def phase(self, name: str):
+            return nullcontext()
+
+        def timed(self, iterable: Iterable, name: str) -> Iterable:
+            return iterable
+
+        def count(self, name: str, amount: int = 1) -> None:
+            pass
+
+        def record_file(self, file_path: str, language: str, size: int, seconds: float) -> None:
+            pass
+
+        def enable(self, *args, **kwargs) -> None:
+            raise ImportError('--profile_report and --pstats need src/db_obj_list (instrumentation.py) on PYTHONPATH')
+
+    instrumentation = DisabledInstrumentation()
+
+try:
+    from file_walker import walk
+except ImportError:
+    class WalkedFile(NamedTuple):
+        path: Path
+        size: int
+        language: str
+
+    def walk(root_directory: Path, languages: Dict[str, str], max_size: int | None = None,
+             **options) -> Iterator[WalkedFile]:
+        for directory, directories, files in os.walk(root_directory):
+            directories.sort()
+            for name in sorted(files):
+                language = languages.get(os.path.splitext(name)[1].lower())
+                if language is None:
+                    continue
+                size = os.path.getsize(os.path.join(directory, name))
+                if max_size is None or size <= max_size:
+                    yield WalkedFile(Path(directory, name), size, language)
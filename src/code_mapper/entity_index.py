@@ -0,0 +1,272 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from java_code_parser_metadata import (AnnotationInfo, JavaFileInfo, MethodInfo, ReferenceType, ReferenceTypeInfo,
+                                       MODIFY_DATA_METHODS, QUERY_DATA_METHODS)
+from constant_table import ConstantTable, TypeContext, type_context
+from spring_data import RepositoryQueries
+from query_text import unquote
+
+# the Spring Data interfaces whose first generic parameter is the entity of the repository
+REPOSITORY_INTERFACES = {'Repository', 'CrudRepository', 'ListCrudRepository', 'PagingAndSortingRepository',
+                         'ListPagingAndSortingRepository', 'JpaRepository', 'JpaRepositoryImplementation',
+                         'RevisionRepository'}
+# fields that do not hold a column of the entity table
+NON_COLUMN_ANNOTATIONS = {'Transient', 'OneToMany', 'ManyToMany', 'Embedded', 'EmbeddedId', 'ElementCollection'}
+JOIN_ANNOTATIONS = {'ManyToOne', 'OneToOne'}
+
+camel_case_pattern = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+
+
+def spring_physical_name(name: str) -> str:
+    """the name Spring Boot's default naming strategy gives to an entity or a property, upper case as Oracle keeps it"""
+    return camel_case_pattern.sub('_', name).replace('.', '_').upper()
+
+
+def simple_name(name: str) -> str:
+    return name.rpartition('.')[2]
+
+
+def annotation(annotations: Iterable[AnnotationInfo], name: str) -> AnnotationInfo | None:
+    """the annotation of that simple name, written qualified (@javax.persistence.Table) or not"""
+    return next((a for a in annotations if simple_name(a.name) == name), None)
+
+
+@dataclass
+class EntityInfo:
+    qualified_name: str
+    name: str  # the entity name used by JPQL, @Entity(name=...) or the class name
+    table: str | None  # None for a @MappedSuperclass, whose columns belong to the tables of its subclasses
+    schema: str | None
+    columns: Dict[str, str]  # property -> column, without the inherited ones
+    superclass: str | None  # as written in the code
+    context: TypeContext
+    property_types: Dict[str, str] = field(default_factory=dict)  # property -> declared type, for association joins
+    file_path: str | None = None
+    line_number: int = 0
+
+    @property
+    def qualified_table(self) -> str | None:
+        return f"{self.schema}.{self.table}" if self.schema and self.table else self.table
+
+
+class EntityIndex:
+    """
+    The JPA entities of a repository, built in one pass over the parsed files and kept up to date file by file
+    (add_file replaces whatever the file declared before). Entities are found by qualified name, simple name or entity
+    name with a dictionary lookup; the columns of a @MappedSuperclass are added to the ones of its subclasses.
+    """
+
+    def __init__(self, constants: ConstantTable | None = None,
+                 naming: Callable[[str], str] = spring_physical_name) -> None:
+        self.constants = constants or ConstantTable()
+        self.naming = naming
+        self.entities: Dict[str, EntityInfo] = {}
+        self.by_simple_name: Dict[str, Set[str]] = {}
+        self.by_entity_name: Dict[str, str] = {}
+        self.by_file: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_files(cls, java_file_infos: Iterable[JavaFileInfo], constants: ConstantTable | None = None,
+                   naming: Callable[[str], str] = spring_physical_name) -> 'EntityIndex':
+        index = cls(constants, naming)
+        for java_file_info in java_file_infos:
+            index.add_file(java_file_info)
+        return index
+
+    def file_key(self, java_file_info: JavaFileInfo) -> str:
+        return f"{java_file_info.file_path}/{java_file_info.file_name}"
+
+    def remove_file(self, file_key: str) -> None:
+        for qualified_name in self.by_file.pop(file_key, []):
+            entity = self.entities.pop(qualified_name)
+            self.by_simple_name.get(simple_name(qualified_name), set()).discard(qualified_name)
+            if self.by_entity_name.get(entity.name) == qualified_name:
+                del self.by_entity_name[entity.name]
+
+    def add_file(self, java_file_info: JavaFileInfo) -> None:
+        file_key = self.file_key(java_file_info)
+        self.remove_file(file_key)
+        for reference_type in java_file_info.reference_types:
+            if reference_type.type != ReferenceType.CLASS:
+                continue
+            entity = self.entity_info(java_file_info, reference_type)
+            if entity is None:
+                continue
+            self.entities[entity.qualified_name] = entity
+            self.by_simple_name.setdefault(reference_type.name, set()).add(entity.qualified_name)
+            self.by_entity_name[entity.name] = entity.qualified_name
+            self.by_file.setdefault(file_key, []).append(entity.qualified_name)
+
+    def value(self, parameter: str | None, context: TypeContext) -> str | None:
+        """an annotation parameter: a literal or a String constant"""
+        if not parameter:
+            return None
+        if parameter.startswith('"'):
+            return unquote(parameter)
+        return self.constants.resolve(parameter, context)
+
+    def entity_info(self, java_file_info: JavaFileInfo, reference_type: ReferenceTypeInfo) -> EntityInfo | None:
+        entity_annotation = annotation(reference_type.annotations, 'Entity')
+        mapped_superclass = annotation(reference_type.annotations, 'MappedSuperclass')
+        if entity_annotation is None and mapped_superclass is None:
+            return None
+        context = type_context(java_file_info, reference_type)
+        entity_name = (self.value(entity_annotation.parameters.get('name'), context) if entity_annotation else None) \
+            or reference_type.name
+        table, schema = None, None
+        if entity_annotation is not None:
+            table_annotation = annotation(reference_type.annotations, 'Table')
+            parameters = table_annotation.parameters if table_annotation else {}
+            table = self.value(parameters.get('name') or parameters.get('value'), context) or self.naming(entity_name)
+            schema = self.value(parameters.get('schema'), context)
+            if schema is None and '.' in table:
+                schema, _, table = table.rpartition('.')
+        columns = {}
+        for field_info in reference_type.fields:
+            if field_info.name == 'serialVersionUID' or \
+                    any(simple_name(a.name) in NON_COLUMN_ANNOTATIONS for a in field_info.annotations):
+                continue
+            if column_annotation := annotation(field_info.annotations, 'Column'):
+                column = self.value(column_annotation.parameters.get('name'), context)
+            elif join_annotation := annotation(field_info.annotations, 'JoinColumn'):
+                column = self.value(join_annotation.parameters.get('name'), context)
+            elif any(simple_name(a.name) in JOIN_ANNOTATIONS for a in field_info.annotations):
+                column = self.naming(field_info.name) + '_ID'
+            else:
+                column = None
+            columns[field_info.name] = column or self.naming(field_info.name)
+        extends = reference_type.extends or []
+        return EntityInfo(qualified_name=context.qualified_name, name=entity_name, table=table, schema=schema,
+                          columns=columns, superclass=extends[0].name if extends else None, context=context,
+                          property_types={field_info.name: field_info.type for field_info in reference_type.fields},
+                          file_path=java_file_info.file_path, line_number=reference_type.line_number)
+
+    def get(self, name: str, context: TypeContext | None = None) -> EntityInfo | None:
+        """the entity a qualified, simple or entity name refers to, the imports of context breaking ties"""
+        if entity := self.entities.get(name):
+            return entity
+        candidates = self.by_simple_name.get(simple_name(name), set())
+        if len(candidates) == 1:
+            return self.entities[next(iter(candidates))]
+        if context is not None:
+            for qualified_name in self.constants.qualified_types(name, context):
+                if qualified_name in candidates:
+                    return self.entities[qualified_name]
+        if qualified_name := self.by_entity_name.get(name):
+            return self.entities[qualified_name]
+        return None
+
+    def columns(self, entity: EntityInfo) -> Dict[str, str]:
+        """the columns of an entity with the ones of its mapped superclasses"""
+        columns, visited = {}, set()
+        while entity is not None and entity.qualified_name not in visited:
+            visited.add(entity.qualified_name)
+            columns = entity.columns | columns
+            entity = self.get(entity.superclass, entity.context) if entity.superclass else None
+        return columns
+
+    def table_of(self, entity: EntityInfo) -> EntityInfo | None:
+        """the entity holding the table, walking up a single table hierarchy for subclasses without @Table"""
+        visited = set()
+        while entity is not None and entity.qualified_name not in visited:
+            if entity.table is not None:
+                return entity
+            visited.add(entity.qualified_name)
+            entity = self.get(entity.superclass, entity.context) if entity.superclass else None
+        return None
+
+
+@dataclass
+class RepositoryAccess:
+    """a call to a Spring Data repository method, attributed to the table of its entity"""
+    repository: str
+    method: str
+    entity: EntityInfo
+    operation: str
+    columns: List[str] = field(default_factory=list)
+
+
+class RepositoryResolver:
+    """
+    Attributes repository methods to database objects: the entity of a repository interface is the first generic
+    parameter of the Spring Data interface it extends (directly or through another repository interface of the
+    code base), and derived query names are decoded into the columns they filter and sort on.
+    """
+
+    def __init__(self, java_file_infos: Iterable[JavaFileInfo], index: EntityIndex) -> None:
+        self.index = index
+        self.queries = RepositoryQueries()
+        self.interfaces: Dict[str, Tuple[ReferenceTypeInfo, TypeContext]] = {}
+        self._entities: Dict[str, EntityInfo | None] = {}
+        for java_file_info in java_file_infos:
+            self.add_file(java_file_info)
+
+    def add_file(self, java_file_info: JavaFileInfo) -> None:
+        for reference_type in java_file_info.reference_types:
+            if reference_type.type == ReferenceType.INTERFACE:
+                context = type_context(java_file_info, reference_type)
+                self.interfaces[context.qualified_name] = (reference_type, context)
+                self.queries.invalidate(context.qualified_name)
+        self._entities.clear()  # a changed interface can change the entity of the ones extending it
+
+    def interface(self, type_name: str, context: TypeContext) -> str | None:
+        for qualified_name in self.index.constants.qualified_types(type_name.split('<', 1)[0], context):
+            if qualified_name in self.interfaces:
+                return qualified_name
+        return None
+
+    def entity(self, qualified_name: str) -> EntityInfo | None:
+        """the entity managed by a repository interface, None when it is not a repository of a known entity"""
+        if qualified_name in self._entities:
+            return self._entities[qualified_name]
+        self._entities[qualified_name] = None  # guards against interfaces extending each other
+        reference_type, context = self.interfaces[qualified_name]
+        entity = None
+        for inheritance in reference_type.extends or []:
+            if simple_name(inheritance.name) in REPOSITORY_INTERFACES and inheritance.generic_parameters:
+                entity = self.index.get(inheritance.generic_parameters[0], context)
+            elif parent := self.interface(inheritance.name, context):
+                entity = self.entity(parent)
+            if entity is not None:
+                break
+        self._entities[qualified_name] = entity
+        return entity
+
+    def method_access(self, qualified_name: str, method_name: str) -> RepositoryAccess | None:
+        entity = self.entity(qualified_name)
+        if entity is None:
+            return None
+        if method_name in MODIFY_DATA_METHODS:
+            return RepositoryAccess(qualified_name, method_name, entity, 'M')
+        if method_name in QUERY_DATA_METHODS:
+            return RepositoryAccess(qualified_name, method_name, entity, 'R')
+        reference_type, _ = self.interfaces[qualified_name]
+        methods: List[MethodInfo] = reference_type.methods
+        query = self.queries.methods(qualified_name, [method.name for method in methods]).get(method_name)
+        if query is None:
+            return None
+        columns = self.index.columns(entity)
+        paths = query.property_paths(columns)
+        return RepositoryAccess(qualified_name, method_name, entity, query.operation,
+                                [columns[path.split('.')[0]] for path in paths.values() if path])
+
+    def calls(self, java_file_info: JavaFileInfo) -> List[Tuple[int, RepositoryAccess]]:
+        """(line, access) of every repository method called through a field of a repository type"""
+        accesses = []
+        for reference_type in java_file_info.reference_types:
+            context = type_context(java_file_info, reference_type)
+            repositories = {}
+            for field_info in reference_type.fields:
+                if qualified_name := self.interface(field_info.type, context):
+                    repositories[field_info.name] = qualified_name
+            if not repositories:
+                continue
+            for method in reference_type.methods:
+                for call in method.calls:
+                    receiver = (call.receiver or '').removeprefix('this.')
+                    if receiver in repositories and \
+                            (access := self.method_access(repositories[receiver], call.name)):
+                        accesses.append((call.line_number, access))
+        return accesses
+
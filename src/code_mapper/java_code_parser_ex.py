@@ -4,7 +4,10 @@ from antlr.JavaParser import JavaParser
 from antlr.JavaParserVisitor import JavaParserVisitor
 from java_code_parser_metadata import *
 from pathlib import Path
+from typing import List
+from db_obj_list_modules import instrumentation
 import re
+import time
 
 STRING_TYPE = 'String'
 FILE_ENCODING = 'windows-1252'
@@ -14,6 +17,71 @@ object_pattern = re.compile(r'^(\w+)')
 method_pattern = re.compile(r'(\.\w+\(.*?\))')
 
 
+def string_literals(tree) -> List[Part]:
+    """the string literal tokens under a parse tree, with their line numbers, in source order"""
+    if tree is None:
+        return []
+    if isinstance(tree, TerminalNode):
+        return [Part(tree.getText(), tree.symbol.line)] if tree.symbol.type == JavaLexer.STRING_LITERAL else []
+    return [literal for child in tree.getChildren() for literal in string_literals(child)]
+
+
+def is_name(ctx: JavaParser.ExpressionContext) -> bool:
+    """a simple or qualified name (SQL, Queries.SQL), which may refer to a constant"""
+    if ctx.primary():
+        return ctx.primary().identifier() is not None
+    return ctx.bop is not None and ctx.bop.text == '.' and ctx.identifier() is not None and is_name(ctx.expression(0))
+
+
+def call_arguments(ctx: JavaParser.MethodCallContext) -> List[JavaParser.ExpressionContext]:
+    expression_list = ctx.arguments().expressionList()
+    return expression_list.expression() if expression_list else []
+
+
+def parameter_names(ctx: JavaParser.FormalParametersContext) -> List[str]:
+    if not (parameter_list := ctx.formalParameterList()):
+        return []
+    parameters = parameter_list.formalParameter()
+    if parameter_list.lastFormalParameter():
+        parameters.append(parameter_list.lastFormalParameter())
+    return [parameter.variableDeclaratorId().identifier().getText() for parameter in parameters]
+
+
+def string_parts(tree) -> List[Part]:
+    """the literals, names and calls concatenated by an expression, e.g. "SELECT " + Queries.FROM_PRODUTO"""
+    if isinstance(tree, JavaParser.VariableInitializerContext) and tree.expression():
+        tree = tree.expression()
+    if isinstance(tree, JavaParser.ExpressionContext):
+        if tree.bop and tree.bop.type == JavaParser.ADD:
+            return string_parts(tree.expression(0)) + string_parts(tree.expression(1))
+        if is_name(tree):
+            return [Part(tree.getText(), tree.start.line, reference=True)]
+        if tree.primary() and tree.primary().expression():
+            return string_parts(tree.primary().expression())
+        if (method_call := tree.methodCall()) and method_call.identifier():
+            if method_call.identifier().getText() == 'toString' and tree.expression(0) and \
+                    tree.expression(0).methodCall():
+                # getSql().toString() is the value of the builder getSql returns
+                return string_parts(tree.expression(0))
+            receiver = f"{tree.expression(0).getText()}." if tree.expression(0) else ''
+            return [Part(receiver + method_call.identifier().getText(), tree.start.line, call=True,
+                         arguments=tuple(tuple(string_parts(argument)) for argument in call_arguments(method_call)))]
+    return string_literals(tree)
+
+
+def inheritance_info(type_type_ctx: JavaParser.TypeTypeContext) -> InheritanceInfo:
+    type_ctx = type_type_ctx.classOrInterfaceType()
+    if type_ctx is None:
+        return InheritanceInfo(type_type_ctx.getText(), [])
+    # a.b.Type<X>: the qualifiers are identifiers, the generic parameters the type arguments that close the type
+    name = '.'.join([identifier.getText() for identifier in type_ctx.identifier()] +
+                    [type_ctx.typeIdentifier().getText()])
+    last_child = type_ctx.getChild(type_ctx.getChildCount() - 1)
+    generic_parameters = [argument.getText() for argument in last_child.typeArgument()] \
+        if isinstance(last_child, JavaParser.TypeArgumentsContext) else []
+    return InheritanceInfo(name, generic_parameters)
+
+
 class JavaParseTreeVisitor(JavaParserVisitor):
     def __init__(self):
         self.current_package = None
@@ -87,24 +155,22 @@ class JavaParseTreeVisitor(JavaParserVisitor):
         implements = []
         extends = []
 
-        # handling extensions inheritances
-        extends_ctx = ctx.EXTENDS()
-        if extends_ctx:
-            extend_types_ctx = ctx.typeList()
-            for extend_type_ctx in extend_types_ctx:
-                if type_ctx := extend_type_ctx.typeType()[0].classOrInterfaceType():
-                    extend_name = type_ctx.typeIdentifier().getText()
-                    generic_parameters = []
-                    for parameter in type_ctx.typeArguments()[0].typeArgument():
-                        generic_parameters.append(parameter.getText())
-                    extends.append(InheritanceInfo(extend_name, generic_parameters))
+        # handling extensions inheritances: a class extends one type, an interface a list of them
+        if hasattr(ctx, "EXTENDS") and ctx.EXTENDS():
+            if isinstance(ctx, JavaParser.ClassDeclarationContext):
+                extends.append(inheritance_info(ctx.typeType()))
+            else:
+                extends = [inheritance_info(type_type_ctx) for type_type_ctx in ctx.typeList(0).typeType()]
 
         # handling implementation inheritances - valid only for classes
         if hasattr(ctx, "IMPLEMENTS"):
             implements_ctx = ctx.IMPLEMENTS()
 
             if implements_ctx:
-                implements = [type_ctx.getText() for type_ctx in ctx.typeList().typeType()]
+                # classes also have the typeList of permits, records and enums a single one
+                type_list_ctx = ctx.typeList(0) if isinstance(ctx, JavaParser.ClassDeclarationContext) \
+                    else ctx.typeList()
+                implements = [type_ctx.getText() for type_ctx in type_list_ctx.typeType()]
 
         return ReferenceTypeInfo(
             name=name,
@@ -137,16 +203,29 @@ class JavaParseTreeVisitor(JavaParserVisitor):
         self.visitChildren(ctx)
 
     def visitFieldDeclaration(self, ctx: JavaParser.FieldDeclarationContext) -> None:
-        field_value = None
-        if value := ctx.variableDeclarators().variableDeclarator()[0].variableInitializer():
-            field_value = value.getText()
-        self.current_type.fields.append(FieldInfo(
-            name=ctx.variableDeclarators().variableDeclarator()[0].variableDeclaratorId().getText(),
-            line_number=ctx.start.line,
-            type=ctx.typeType().getText(),
-            value=field_value,
-            annotations=self.current_annotations
-        ))
+        # one field per declarator of `String A = "..", B = "..";`
+        for declarator_ctx in ctx.variableDeclarators().variableDeclarator():
+            value = declarator_ctx.variableInitializer()
+            self.current_type.fields.append(FieldInfo(
+                name=declarator_ctx.variableDeclaratorId().getText(),
+                line_number=ctx.start.line,
+                type=ctx.typeType().getText(),
+                value=value.getText() if value else None,
+                annotations=self.current_annotations
+            ))
+        self.current_annotations = []  # reset the annotations
+        self.visitChildren(ctx)
+
+    def visitConstDeclaration(self, ctx: JavaParser.ConstDeclarationContext) -> None:
+        # interface constants, recorded as fields like the ones of classes
+        for declarator_ctx in ctx.constantDeclarator():
+            self.current_type.fields.append(FieldInfo(
+                name=declarator_ctx.identifier().getText(),
+                line_number=ctx.start.line,
+                type=ctx.typeType().getText(),
+                value=declarator_ctx.variableInitializer().getText(),
+                annotations=self.current_annotations
+            ))
         self.current_annotations = []  # reset the annotations
         self.visitChildren(ctx)
 
@@ -155,7 +234,8 @@ class JavaParseTreeVisitor(JavaParserVisitor):
             name=ctx.interfaceCommonBodyDeclaration().identifier().getText(),
             line_number=ctx.start.line,
             return_type=ctx.interfaceCommonBodyDeclaration().typeTypeOrVoid().getText(),
-            annotations=self.current_annotations
+            annotations=self.current_annotations,
+            parameters=parameter_names(ctx.interfaceCommonBodyDeclaration().formalParameters())
         ))
         self.current_annotations = []  # reset the annotations
         self.visitChildren(ctx)
@@ -163,11 +243,13 @@ class JavaParseTreeVisitor(JavaParserVisitor):
     def process_method_declaration(self,
                                    ctx: JavaParser.MethodDeclarationContext | JavaParser.ConstructorDeclarationContext,
                                    isConstructor: bool = False):
+        enclosing_method = self.current_method  # methods of anonymous classes are declared inside other methods
         self.current_method = MethodInfo(
             name=ctx.identifier().getText(),
             line_number=ctx.start.line,
             return_type='' if isConstructor else ctx.typeTypeOrVoid().getText(),
-            annotations=self.current_annotations
+            annotations=self.current_annotations,
+            parameters=parameter_names(ctx.formalParameters())
         )
         self.current_annotations = []  # reset the annotations
         self.visitChildren(ctx)
@@ -176,6 +258,7 @@ class JavaParseTreeVisitor(JavaParserVisitor):
         if self.current_method.scope.is_empty():
             self.current_method.scope = None
         self.current_type.methods.append(self.current_method)
+        self.current_method = enclosing_method
 
     def visitConstructorDeclaration(self, ctx: JavaParser.ConstructorDeclarationContext) -> None:
         self.process_method_declaration(ctx, True)
@@ -208,15 +291,23 @@ class JavaParseTreeVisitor(JavaParserVisitor):
                     expression_type=ExpressionType.OBJECT_CREATION,
                     content=''
                 )
+                initializer_ctx = declarator_ctx.variableInitializer()
                 match obj_type:
                     case ObjectType.STRING:
-                        new_expression_info.content = declarator_ctx.variableInitializer().getText()
-                        pass
+                        new_expression_info.content = initializer_ctx.getText() if initializer_ctx else ''
                     case ObjectType.STRING_BUILDER:
                         pass
+                new_expression_info.query = QueryText()
+                new_expression_info.query.extend(string_parts(initializer_ctx))
 
-                self.current_scope.expressions.append({obj_name: new_expression_info})
-                self.visitChildren(ctx)
+                self.current_scope.declare(new_expression_info)
+        # the initializers of every declaration hold calls, e.g. Query query = em.createNativeQuery(sql)
+        self.visitChildren(ctx)
+
+    def visitStatement(self, ctx: JavaParser.StatementContext) -> None:
+        if ctx.RETURN() and ctx.expression() and self.current_method:
+            self.current_method.returns.append(string_parts(ctx.expression(0)))
+        self.visitChildren(ctx)
 
     def visitExpression(self, ctx: JavaParser.ExpressionContext) -> None:
         # get the variable assignment to a new object of interest
@@ -234,46 +325,92 @@ class JavaParseTreeVisitor(JavaParserVisitor):
                     line_number=line_number,
                     type=obj_type,
                     expression_type=ExpressionType.OBJECT_CREATION,
-                    content=''
+                    content='',
+                    query=QueryText()
                 )
-
-                self.current_scope.expressions.append({obj_name: new_expression_info})
+                new_expression_info.query.extend(string_parts(ctx.expression(1)))
+
+                self.current_scope.declare(new_expression_info)
+        elif ctx.bop and ctx.bop.type == JavaParser.ADD_ASSIGN:
+            # sql += "..." keeps building the text of a string of interest
+            expression = self.current_scope.lookup(ctx.expression(0).getText())
+            if expression and expression.query is not None:
+                expression.query.extend(string_parts(ctx.expression(1)))
         self.visitChildren(ctx)
 
 
+    def record_call(self, expression: ExpressionInfo, ctx: JavaParser.MethodCallContext) -> None:
+        method_name = ctx.identifier().getText()
+        expression.method_calls.append(ExpressionInfo(
+            name=method_name,
+            line_number=ctx.start.line,
+            type=expression.type,
+            expression_type=ExpressionType.METHOD_CALL,
+            content=ctx.arguments().getText()
+        ))
+        if expression.query is None or not ctx.arguments().expressionList():
+            return
+        arguments = ctx.arguments().expressionList().expression()
+        match method_name:
+            case 'append':
+                expression.query.extend(string_parts(arguments[0]))
+            case 'insert' if len(arguments) == 2 and arguments[0].getText().isdigit():
+                expression.query.insert_literals(int(arguments[0].getText()), string_literals(arguments[1]))
+
+    @staticmethod
+    def chained_call(ctx: JavaParser.MethodCallContext) -> JavaParser.MethodCallContext | None:
+        """the call made on the value returned by ctx, as the second append of sb.append(a).append(b)"""
+        outer = ctx.parentCtx.parentCtx
+        if isinstance(outer, JavaParser.ExpressionContext) and outer.expression(0) is ctx.parentCtx:
+            return outer.methodCall()
+        return None
+
     def visitMethodCall(self, ctx: JavaParser.MethodCallContext):
         # get the method name
-        method_name = ctx.identifier().getText()
-        if method_name in METHODS_OF_INTEREST:
+        method_name = ctx.identifier().getText() if ctx.identifier() else None
+        if method_name and self.current_method:
+            object_ctx = ctx.parentCtx.expression(0) \
+                if isinstance(ctx.parentCtx, JavaParser.ExpressionContext) else None
+            self.current_method.calls.append(CallInfo(
+                name=method_name,
+                receiver=object_ctx.getText() if object_ctx else None,
+                line_number=ctx.start.line,
+                arguments=[string_parts(argument) for argument in call_arguments(ctx)]
+            ))
+        if is_method_of_interest(method_name) and isinstance(ctx.parentCtx, JavaParser.ExpressionContext):
             # get object from parent context
-            object_name = ctx.parentCtx.expression(0).getText()
+            object_ctx = ctx.parentCtx.expression(0)
             # check if the object name is within the scope
-            scope = self.current_scope.get_object_scope(object_name)
-            if scope:
-                parameter_values = ctx.arguments().getText()
-                expression = scope.get_expression_by_name(object_name)
-
-                expression.method_calls.append(ExpressionInfo(
-                    name=method_name,
-                    line_number=ctx.start.line,
-                    type=expression.type,
-                    expression_type=ExpressionType.METHOD_CALL,
-                    content=parameter_values
-                ))
+            expression = self.current_scope.lookup(object_ctx.getText()) if object_ctx else None
+            call_ctx = ctx
+            while expression and call_ctx and call_ctx.identifier():
+                if not is_method_of_interest(call_ctx.identifier().getText()):
+                    break
+                self.record_call(expression, call_ctx)
+                if call_ctx.identifier().getText() not in BUILDER_METHODS:
+                    break
+                # the builder methods return the builder, the outer calls of a chain act on the same object
+                call_ctx = self.chained_call(call_ctx)
         self.visitChildren(ctx)
 
 
-def main(file_path: Path):
-    input_stream = FileStream(file_path, encoding='windows-1252')
-    lexer = JavaLexer(input_stream)
-    stream = CommonTokenStream(lexer)
-    parser = JavaParser(stream)
-    tree = parser.compilationUnit()
+def parse_java_file(file_path: Path) -> JavaFileInfo:
+    start = time.perf_counter()
+    with instrumentation.phase('decode'):
+        input_stream = FileStream(file_path, encoding=FILE_ENCODING)
+    with instrumentation.phase('antlr_parse'):
+        lexer = JavaLexer(input_stream)
+        stream = CommonTokenStream(lexer)
+        parser = JavaParser(stream)
+        tree = parser.compilationUnit()
 
     visitor = JavaParseTreeVisitor()
-    visitor.visit(tree)
+    with instrumentation.phase('antlr_visit'):
+        visitor.visit(tree)
+    if instrumentation.enabled:
+        instrumentation.record_file(file_path, 'java', file_path.stat().st_size, time.perf_counter() - start)
 
-    java_file_info = JavaFileInfo(
+    return JavaFileInfo(
         file_path=str(file_path.parent),
         file_name=file_path.name,
         package_name=visitor.current_package,
@@ -281,7 +418,9 @@ def main(file_path: Path):
         reference_types=visitor.reference_types
     )
 
-    java_file_info.print_human_readable()
+
+def main(file_path: Path):
+    parse_java_file(file_path).print_human_readable()
 
 
 if __name__ == '__main__':
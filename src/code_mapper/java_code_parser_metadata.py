@@ -1,43 +1,33 @@
+import re
 from dataclasses import dataclass, field
 from enum import Enum, StrEnum
 from typing import List, Dict, Optional, Union
+from query_text import Part, QueryText, BUILDER_METHODS
+from spring_data import parse_method_name
 
-MODIFY_DATA_METHODS = {'save', 'saveAll', 'flush'
-                                          'delete', 'deleteByIs', 'deleteAllByIs',
-                       'deleteAllByIsIn', 'deleteAllByIsNotIn',
-                       'deleteInBatch', 'deleteInAllBatch'}
-
-QUERY_DATA_METHODS = {'findById', 'findByIds', 'findByIdIn', 'findByIdNotIn',
-                      'findAll', 'findAllById', 'findAllByIdIn', 'findAllByIdNotIn',
-                      'findAllByIs', 'findAllByIsIn', 'findAllByIsNotIn',
-                      'findAllByIsOrderBy', 'findAllByIsInOrderBy', 'findAllByIsNotInOrderBy',
-                      'findAllByIsOrderByDesc', 'findAllByIsInOrderByDesc', 'findAllByIsNotInOrderByDesc',
-                      'findAllByIsOrderByAsc', 'findAllByIsInOrderByAsc', 'findAllByIsNotInOrderByAsc',
-                      'findAllByIsNot', 'findAllByIsNotIn',
-                      'findAllByIsNotOrderBy', 'findAllByIsNotInOrderBy',
-                      'findAllByIsNotOrderByDesc', 'findAllByIsNotInOrderByDesc',
-                      'findAllByIsNotOrderByAsc', 'findAllByIsNotInOrderByAsc',
-                      'findAllByIsNotAndIsNot', 'findAllByIsNotInAndIsNotIn',
-                      'findAllByIsNotAndIsNotOrderBy', 'findAllByIsNotInAndIsNotInOrderBy',
-                      'findAllByIsNotAndIsNotOrderByDesc', 'findAllByIsNotInAndIsNotInOrderByDesc',
-                      'findAllByIsNotAndIsNotOrderByAsc', 'findAllByIsNotInAndIsNotInOrderByAsc',
-                      'findAllByIsNotAndIsNotAndIsNot', 'findAllByIsNotInAndIsNotInAndIsNotIn',
-                      'findAllByIsNotAndIsNotAndIsNotOrderBy', 'findAllByIsNotInAndIsNotInAndIsNotInOrderBy',
-                      'findAllByIsNotAndIsNotAndIsNotOrderByDesc', 'findAllByIsNotInAndIsNotInAndIsNotInOrderByDesc',
-                      'findAllByIsNotAndIsNotAndIsNotOrderByAsc', 'findAllByIsNotInAndIsNotInAndIsNotInOrderByAsc',
-                      'findAllByIsNotAndIsNotAndIsNotAndIsNot', 'findAllByIsNotInAndIsNotInAndIsNotInAndIsNotIn',
-                      'findAllByIsNotAndIsNotAndIsNotAndIsNotOrderBy',
-                      'findAllByIsNotInAndIsNotInAndIsNotInAndIsNotInOrderBy',
-                      'findAllByIsNotAndIsNotAndIsNotAndIsNotOrderByDesc',
-                      'findAllByIsNotInAndIsNotInAndIsNotInAndIsNot',
-                      'existsById', 'existsByIdIn', 'existsByIdNotIn',
-                      'count', 'countById', 'countByIdIn', 'countByIdNotIn',
-                      'countByIs', 'countByIsIn', 'countByIsNotIn',
-                      'countByIsNot', 'countByIsNotIn',
-                      'existsById', 'existsByIdIn', 'existsByIdNotIn',
-                      'existsByIs', 'existsByIsIn', 'existsByIsNotIn'}
-
-METHODS_OF_INTEREST = {'append'} | MODIFY_DATA_METHODS | QUERY_DATA_METHODS
+# the methods CrudRepository/JpaRepository declare, the derived ones (findByNameAndAge...) are decoded by spring_data
+MODIFY_DATA_METHODS = {'save', 'saveAll', 'saveAndFlush', 'saveAllAndFlush', 'flush',
+                       'delete', 'deleteAll', 'deleteById', 'deleteAllById', 'deleteInBatch', 'deleteAllInBatch',
+                       'deleteAllByIdInBatch'}
+
+QUERY_DATA_METHODS = {'findById', 'findAll', 'findAllById', 'existsById', 'count',
+                      'getById', 'getOne', 'getReferenceById', 'findOne', 'findBy', 'exists'}
+
+METHODS_OF_INTEREST = BUILDER_METHODS | MODIFY_DATA_METHODS | QUERY_DATA_METHODS
+
+
+def is_method_of_interest(method_name: str | None) -> bool:
+    return bool(method_name) and (method_name in METHODS_OF_INTEREST or parse_method_name(method_name) is not None)
+
+
+# calls that execute the query text passed as their first argument
+SINK_METHODS = {'prepareStatement', 'prepareCall', 'createQuery', 'createNativeQuery', 'createSQLQuery',
+                'execute', 'executeQuery', 'executeUpdate', 'addBatch'}
+# sink names common enough outside of jdbc (an executor, a command) that a call to one is only a sink when the
+# repository does not declare the method called and the value passed to it starts like a sql statement
+AMBIGUOUS_SINK_METHODS = {'execute'}
+sql_statement_pattern = re.compile(r'\s*[({]?\s*(?:SELECT|INSERT|UPDATE|DELETE|MERGE|WITH|CALL|BEGIN|DECLARE|TRUNCATE|'
+                                   r'CREATE|ALTER|DROP|LOCK)\b', re.IGNORECASE)
 
 QUERY_ANNOTATIONS = {'@Query', '@NamedQuery', '@NamedNativeQuery'}
 CALL_ANNOTATIONS = {'@Procedure', '@Function', '@NamedStoredProcedureQuery', '@NamedStoredProcedureQueries'}
@@ -86,6 +76,7 @@ class ExpressionInfo:
     type: ObjectType
     expression_type: ExpressionType | None
     method_calls: List['ExpressionInfo'] = field(default_factory=list)
+    query: QueryText | None = None  # the text of a String/StringBuilder object creation, rebuilt from its literals
 
     def __str__(self):
         ret = ''
@@ -93,6 +84,8 @@ class ExpressionInfo:
             ret += f"Object creation: {self.name} type: {self.type.value} content: {self.content}\n"
             for call in self.method_calls:
                 ret += str(call)
+            if self.query:
+                ret += f"Query: {self.query.text}\n"
         if self.expression_type == ExpressionType.METHOD_CALL:
             return f"Method call: {self.name} type: {self.type.value} content: {self.content}\n"
         return ret
@@ -101,9 +94,17 @@ class ExpressionInfo:
 
 @dataclass
 class Scope:
-    expressions: List[Dict[str, ExpressionInfo]] = field(default_factory=list)
+    """
+    A block of code and the objects of interest created in it. expressions maps each name to its current binding in
+    this scope, declarations keeps every object creation in source order (a reassigned name keeps its earlier ones).
+    """
+    expressions: Dict[str, ExpressionInfo] = field(default_factory=dict)
+    declarations: List[ExpressionInfo] = field(default_factory=list)
     parent: Optional['Scope'] = field(default=None)
     children: List['Scope'] = field(default_factory=list)
+    # names already resolved from this scope; only the innermost open scope gets new declarations, so an entry
+    # can only go stale through a declaration in this same scope, which overwrites it
+    _resolved: Dict[str, ExpressionInfo] = field(default_factory=dict, repr=False, compare=False)
 
     def __str__(self):
         r = ''
@@ -111,17 +112,34 @@ class Scope:
             r += child.__str__()
             return r
         else:
-            for expression_dict in self.expressions:
-                for expression_name, expression_info in expression_dict.items():
-                    r += f"{expression_name}: {expression_info}\n"
+            for expression_info in self.declarations:
+                r += f"{expression_info.name}: {expression_info}\n"
             return r
 
+    def declare(self, expression: ExpressionInfo) -> None:
+        # a declaration in an inner scope shadows the outer one, a reassignment in the same scope replaces it
+        self.expressions[expression.name] = expression
+        self.declarations.append(expression)
+        self._resolved[expression.name] = expression
+
+    def lookup(self, object_name: str) -> Union[ExpressionInfo, None]:
+        """the binding of object_name visible from this scope, searching the enclosing scopes outwards"""
+        expression = self._resolved.get(object_name)
+        if expression is None:
+            scope = self
+            while scope is not None and object_name not in scope.expressions:
+                scope = scope.parent
+            if scope is None:
+                return None
+            expression = self._resolved[object_name] = scope.expressions[object_name]
+        return expression
+
     def get_object_scope(self, object_name: str) -> Union['Scope', None]:
-        for expression_dict in self.expressions:
-            if object_name in expression_dict:
-                return self
-        if self.parent:
-            return self.parent.get_object_scope(object_name)
+        scope = self
+        while scope is not None:
+            if object_name in scope.expressions:
+                return scope
+            scope = scope.parent
         return None
 
     def is_empty(self):
@@ -133,10 +151,21 @@ class Scope:
         return True
 
     def get_expression_by_name(self, expression_name: str) -> Union[ExpressionInfo, None]:
-        for expression_dict in self.expressions:
-            if expression_name in expression_dict:
-                return expression_dict[expression_name]
-        return None
+        return self.expressions.get(expression_name)
+
+    def all_declarations(self):
+        """the declarations of this scope and of every scope nested in it"""
+        yield from self.declarations
+        for child in self.children:
+            yield from child.all_declarations()
+
+
+@dataclass
+class CallInfo:
+    name: str
+    receiver: str | None  # the object the method is called on as written, None for unqualified calls
+    line_number: int
+    arguments: List[List[Part]] = field(default_factory=list)
 
 
 @dataclass
@@ -146,6 +175,9 @@ class MethodInfo:
     return_type: str
     annotations: List[AnnotationInfo] = field(default_factory=list)
     scope: Scope = field(default_factory=Scope)
+    parameters: List[str] = field(default_factory=list)
+    returns: List[List[Part]] = field(default_factory=list)  # the parts of every returned expression
+    calls: List[CallInfo] = field(default_factory=list)
 
 
 @dataclass
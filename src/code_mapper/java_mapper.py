@@ -0,0 +1,344 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, List, Set, Tuple
+from java_code_parser_metadata import *
+from constant_table import ConstantTable, type_context
+from method_summaries import CallGraph, MethodSummaries, render
+from entity_index import EntityIndex, RepositoryResolver
+from jpql import annotation_queries, parse_jpql, resolve_entities
+from db_obj_list_modules import instrumentation, walk
+
+BACKENDS = ('antlr', 'treesitter')
+JAVA_FILES = {'.java': 'java'}
+
+
+def get_backend(name: str) -> Callable[[Path], JavaFileInfo]:
+    # the backends are imported lazily so that each one only needs its own runtime installed
+    match name:
+        case 'antlr':
+            from java_code_parser_ex import parse_java_file
+        case 'treesitter':
+            from ts_java_parser import parse_java_file
+        case _:
+            raise ValueError(f"Unknown backend: {name}. Expected one of {', '.join(BACKENDS)}")
+    return parse_java_file
+
+
+def flatten_scope(scope: Scope | None) -> List[Tuple]:
+    if scope is None:
+        return []
+    flat = []
+    for expression in scope.declarations:
+        flat.append((expression.name, expression.type, expression.content,
+                     tuple(call.content for call in expression.method_calls)))
+    for child in scope.children:
+        flat.extend(flatten_scope(child))
+    return flat
+
+
+def object_creations(scope: Scope | None):
+    if scope is None:
+        return
+    yield from scope.declarations
+    for child in scope.children:
+        yield from object_creations(child)
+
+
+def map_queries(java_file_info: JavaFileInfo, mapper, constants: ConstantTable | None = None,
+                repo_name: str | None = None, summaries: MethodSummaries | None = None) -> List:
+    """
+    Run the database object matcher (a db_code_map.CodeDbMapper) over the String constants of the file and every
+    query text its methods assemble, with the constants they reference and the values of the methods they call folded
+    in, plus the queries that reach an execute/createQuery call through another method. Without repository-wide
+    constants and summaries only the constants and methods of the file itself are known.
+    """
+    if constants is None:
+        constants = ConstantTable.from_files([java_file_info])
+    if summaries is None:
+        summaries = MethodSummaries(CallGraph([java_file_info], constants))
+    file_info = {'file_path': java_file_info.file_path, 'file_name': java_file_info.file_name,
+                 'repo_name': repo_name or Path(java_file_info.file_path or '').name}
+    results = []
+    for reference_type in java_file_info.reference_types:
+        context = type_context(java_file_info, reference_type)
+        for field_info in reference_type.fields:
+            qualified_name = f"{context.qualified_name}.{field_info.name}"
+            if qualified_name in constants.constants and (value := constants.value(qualified_name)):
+                query = QueryText()
+                query.append(value, field_info.line_number)
+                results.extend(mapper.process_query_text(query, file_info))
+        for method in reference_type.methods:
+            node = summaries.graph.node(method)
+
+            def resolve(part: Part) -> str | None:
+                if part.call:
+                    return summaries.value(node, part) if node else None
+                return constants.resolve(part.text, context)
+
+            for expression in object_creations(method.scope):
+                if expression.query is None:
+                    continue
+                if expression.query.references:
+                    expression.query.fold(resolve)
+                if expression.query:
+                    results.extend(mapper.process_query_text(expression.query, file_info))
+            if node is None:
+                continue
+            # the values built by other methods and the literals and constants passed to a sink as they are, the ones
+            # built here were mapped with the local they were built in
+            for flow in summaries.summary(node).flows:
+                if flow.through or not flow.local:
+                    query = QueryText()
+                    query.append(render(flow.template), flow.line_number)
+                    results.extend(mapper.process_query_text(query, file_info))
+    return results
+
+
+def map_repository_calls(java_file_info: JavaFileInfo, mapper, repositories: RepositoryResolver,
+                         repo_name: str | None = None) -> List:
+    """map the Spring Data repository calls of the file to the tables of the entities the repositories manage"""
+    file_info = {'file_path': java_file_info.file_path, 'file_name': java_file_info.file_name,
+                 'repo_name': repo_name or Path(java_file_info.file_path or '').name}
+    results = []
+    for line_number, access in repositories.calls(java_file_info):
+        table_entity = repositories.index.table_of(access.entity)
+        if table_entity is None:
+            continue
+        line = f"{access.repository.rpartition('.')[2]}.{access.method} {table_entity.qualified_table}"
+        if access.columns:
+            line += f" ({', '.join(access.columns)})"
+        results.extend(mapper.process_object_reference(table_entity.table, access.operation, line, line_number,
+                                                       file_info, table_entity.schema))
+    return results
+
+
+def map_annotation_queries(java_file_info: JavaFileInfo, mapper, index: EntityIndex,
+                           repo_name: str | None = None) -> List:
+    """
+    Map the @Query/@NamedQuery values of the file: native queries as sql texts, JPQL ones through the tables of the
+    entities and associations they name
+    """
+    file_info = {'file_path': java_file_info.file_path, 'file_name': java_file_info.file_name,
+                 'repo_name': repo_name or Path(java_file_info.file_path or '').name}
+    results = []
+    for annotation_query in annotation_queries(java_file_info, index.constants):
+        if annotation_query.native:
+            query = QueryText()
+            query.append(annotation_query.text, annotation_query.line_number)
+            results.extend(mapper.process_query_text(query, file_info))
+            continue
+        jpql_query = parse_jpql(annotation_query.text)
+        mapped = set()
+        for _, entity in resolve_entities(jpql_query, index, annotation_query.context):
+            table_entity = index.table_of(entity)
+            if table_entity is None or table_entity.qualified_name in mapped:
+                continue
+            mapped.add(table_entity.qualified_name)
+            results.extend(mapper.process_object_reference(table_entity.table, jpql_query.operation, jpql_query.text,
+                                                           annotation_query.line_number, file_info,
+                                                           table_entity.schema))
+    return results
+
+
+def map_repository(root_directory: Path, backend: str, mapper) -> List:
+    """
+    Parse every java file once, build the repository constant table and the method summaries from them and map all
+    of their queries
+    """
+    parse = get_backend(backend)
+    java_file_infos = []
+    for file_path, _, _ in walk(root_directory, JAVA_FILES):
+        try:
+            java_file_infos.append(parse(file_path))
+        except Exception as e:
+            print(f"{file_path}: {e}", file=sys.stderr)
+    constants = ConstantTable.from_files(java_file_infos)
+    summaries = MethodSummaries(CallGraph(java_file_infos, constants))
+    entities = EntityIndex.from_files(java_file_infos, constants)
+    repositories = RepositoryResolver(java_file_infos, entities)
+    results = []
+    for java_file_info in java_file_infos:
+        results.extend(map_queries(java_file_info, mapper, constants, root_directory.name, summaries))
+        results.extend(map_repository_calls(java_file_info, mapper, repositories, root_directory.name))
+        results.extend(map_annotation_queries(java_file_info, mapper, entities, root_directory.name))
+    if constants.cycles:
+        print(f"Constants defined in terms of themselves: {', '.join(sorted(set(constants.cycles)))}",
+              file=sys.stderr)
+    if summaries.recursive:
+        print(f"Recursive methods, summarized without their own values: {', '.join(sorted(set(summaries.recursive)))}",
+              file=sys.stderr)
+    return results
+
+
+def diff_java_file_info(expected: JavaFileInfo, actual: JavaFileInfo) -> List[str]:
+    """list the differences between two parse results of the same file, in a human-readable form"""
+    differences = []
+
+    def compare(label, left, right):
+        if left != right:
+            differences.append(f"{label}: {left!r} != {right!r}")
+
+    compare('package', expected.package_name, actual.package_name)
+    compare('imports', expected.imports, actual.imports)
+    compare('types', [t.name for t in expected.reference_types], [t.name for t in actual.reference_types])
+    for expected_type, actual_type in zip(expected.reference_types, actual.reference_types):
+        prefix = expected_type.name
+        compare(f'{prefix} kind', expected_type.type, actual_type.type)
+        compare(f'{prefix} extends', expected_type.extends or [], actual_type.extends or [])
+        compare(f'{prefix} implements', expected_type.implements, actual_type.implements)
+        compare(f'{prefix} annotations',
+                [(a.name, a.parameters) for a in expected_type.annotations],
+                [(a.name, a.parameters) for a in actual_type.annotations])
+        compare(f'{prefix} fields',
+                [(f.name, f.type, f.value, [(a.name, a.parameters) for a in f.annotations])
+                 for f in expected_type.fields],
+                [(f.name, f.type, f.value, [(a.name, a.parameters) for a in f.annotations])
+                 for f in actual_type.fields])
+        compare(f'{prefix} methods',
+                [(m.name, m.return_type) for m in expected_type.methods],
+                [(m.name, m.return_type) for m in actual_type.methods])
+        for expected_method, actual_method in zip(expected_type.methods, actual_type.methods):
+            method_prefix = f'{prefix}.{expected_method.name}'
+            compare(f'{method_prefix} annotations',
+                    [(a.name, a.parameters) for a in expected_method.annotations],
+                    [(a.name, a.parameters) for a in actual_method.annotations])
+            compare(f'{method_prefix} scope', flatten_scope(expected_method.scope), flatten_scope(actual_method.scope))
+            compare(f'{method_prefix} parameters', expected_method.parameters, actual_method.parameters)
+            compare(f'{method_prefix} returns', expected_method.returns, actual_method.returns)
+            compare(f'{method_prefix} calls',
+                    [(c.name, c.receiver, c.line_number, c.arguments) for c in expected_method.calls],
+                    [(c.name, c.receiver, c.line_number, c.arguments) for c in actual_method.calls])
+    return differences
+
+
+def compare_backends(root_directory: Path, reference: str = 'antlr', candidate: str = 'treesitter') -> bool:
+    """
+    Parse every java file under root_directory with both backends, report the parity differences and the throughput
+    of each backend. Returns True when both backends produced the same model for every file.
+    """
+    parsers = {reference: get_backend(reference), candidate: get_backend(candidate)}
+    elapsed = {reference: 0.0, candidate: 0.0}
+    total_bytes, total_files, mismatched_files = 0, 0, 0
+
+    for file_path, file_size, _ in walk(root_directory, JAVA_FILES, max_size=None, skip_generated=False):
+        results = {}
+        for name, parse in parsers.items():
+            start = time.perf_counter()
+            try:
+                results[name] = parse(file_path)
+            except Exception as e:
+                results[name] = e
+            elapsed[name] += time.perf_counter() - start
+
+        total_files += 1
+        total_bytes += file_size
+        errors = [f"{name} failed: {result}" for name, result in results.items() if isinstance(result, Exception)]
+        differences = errors or diff_java_file_info(results[reference], results[candidate])
+        if differences:
+            mismatched_files += 1
+            print(f"{file_path}:")
+            for difference in differences:
+                print(f"  {difference}")
+
+    print(f"{total_files} files, {total_bytes / 1024 / 1024:.2f} MB, {mismatched_files} with differences")
+    for name, seconds in elapsed.items():
+        if seconds:
+            print(f"{name:>12}: {seconds:.3f}s  {total_files / seconds:.1f} files/s  "
+                  f"{total_bytes / 1024 / 1024 / seconds:.2f} MB/s")
+    return mismatched_files == 0
+
+
+def main(file_path: Path, backend: str, db_objects_csv: Path | None = None, owners: Set[str] | None = None) -> None:
+    java_file_info = get_backend(backend)(file_path)
+    java_file_info.print_human_readable()
+    if db_objects_csv:
+        from db_code_map import CodeDbMapper
+
+        mapper = CodeDbMapper(owners=owners)
+        mapper.load_db_objects_csv(db_objects_csv)
+        print("Database objects:")
+        for token_info in map_queries(java_file_info, mapper):
+            print(f"  {token_info.line_number}: {token_info.owner}.{token_info.object_name} {token_info.object_type} "
+                  f"{token_info.operation}")
+
+
+def map_repository_to_csv(root_directory: Path, backend: str, db_objects_csv: Path, owners: Set[str],
+                          output_file: Path, query_report: Path | None = None) -> None:
+    from db_code_map import CodeDbMapper, write_csv_from_token_info
+    from query_fingerprint import write_query_report
+
+    mapper = CodeDbMapper(owners=owners)
+    mapper.load_db_objects_csv(db_objects_csv)
+    results = map_repository(root_directory, backend, mapper)
+    write_csv_from_token_info(results, str(output_file))
+    print(f"{len(results)} rows written to {output_file}")
+    if query_report:
+        write_query_report(mapper.query_cache, query_report)
+        print(f"{len(mapper.query_cache.occurrences)} distinct queries written to {query_report}")
+
+
+def watch(root_directory: Path, db_objects_csv: Path, owners: Set[str]) -> None:
+    from db_code_map import CodeDbMapper
+    from ts_watch import JavaWatcher
+
+    mapper = CodeDbMapper(owners=owners)
+    mapper.load_db_objects_csv(db_objects_csv)
+    JavaWatcher(root_directory, mapper).watch()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Java Mapper CLI\n\nParses java files into the code mapper model.",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--backend', choices=BACKENDS, default='antlr', help='Parser backend to be used')
+    parser.add_argument('--file', type=str, help='Java file to be parsed and printed')
+    parser.add_argument('--compare', type=str,
+                        help='Root directory to run both backends on, reporting differences and throughput')
+    parser.add_argument('--map', type=str,
+                        help='Root directory whose java queries are mapped to --db_objects_csv, folding the String '
+                             'constants of the whole repository, written to --output')
+    parser.add_argument('--output', type=str, help='Csv file written by --map, defaults to <root directory name>.csv')
+    parser.add_argument('--query_report', type=str,
+                        help='Csv file --map writes the distinct queries that hit the catalog to, with their count')
+    parser.add_argument('--watch', type=str,
+                        help='Root directory to keep mapped, reparsing java files incrementally as they are saved')
+    parser.add_argument('--db_objects_csv', type=str, help='Path to the csv file containing the database objects')
+    parser.add_argument('--owners', type=str, help='Owners to be considered, separated by comma')
+    parser.add_argument('--profile_report', type=str, help='Write a json report of the time spent per phase')
+    parser.add_argument('--pstats', type=str, help='Also run cProfile and dump its stats to this file')
+    args = parser.parse_args()
+
+    if args.profile_report or args.pstats:
+        instrumentation.enable(profile=bool(args.pstats))
+    if args.compare:
+        identical = compare_backends(Path(args.compare))
+        if instrumentation.enabled:
+            instrumentation.write_report(args.profile_report and Path(args.profile_report),
+                                         args.pstats and Path(args.pstats))
+        sys.exit(0 if identical else 1)
+    if args.map:
+        if not args.db_objects_csv or not args.owners:
+            parser.error('--map requires --db_objects_csv and --owners')
+        map_repository_to_csv(Path(args.map), args.backend, Path(args.db_objects_csv), set(args.owners.split(',')),
+                              Path(args.output or Path(args.map).name + '.csv'),
+                              args.query_report and Path(args.query_report))
+        if instrumentation.enabled:
+            instrumentation.write_report(args.profile_report and Path(args.profile_report),
+                                         args.pstats and Path(args.pstats))
+        sys.exit(0)
+    if args.watch:
+        if not args.db_objects_csv or not args.owners:
+            parser.error('--watch requires --db_objects_csv and --owners')
+        watch(Path(args.watch), Path(args.db_objects_csv), set(args.owners.split(',')))
+        sys.exit(0)
+    if not args.file:
+        parser.print_help()
+        sys.exit(1)
+    if args.db_objects_csv and not args.owners:
+        parser.error('--db_objects_csv requires --owners')
+    main(Path(args.file), args.backend, args.db_objects_csv and Path(args.db_objects_csv),
+         args.owners and set(args.owners.split(',')))
+    if instrumentation.enabled:
+        instrumentation.write_report(args.profile_report and Path(args.profile_report),
+                                     args.pstats and Path(args.pstats))
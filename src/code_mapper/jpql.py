@@ -0,0 +1,253 @@
+import re
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+from java_code_parser_metadata import AnnotationInfo, JavaFileInfo
+from entity_index import EntityIndex, EntityInfo, simple_name
+from constant_table import ConstantTable, TypeContext, type_context
+
+token_pattern = re.compile(r"""
+    (?P<string>'(?:[^']|'')*')
+  | (?P<parameter>:[A-Za-z_]\w*|\?\d*)
+  | (?P<name>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)
+  | (?P<number>\d+(?:\.\d+)?[LlFfDd]?)
+  | (?P<symbol><>|<=|>=|!=|\|\||[(),=<>+\-*/{}])
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.VERBOSE)
+
+# the reserved identifiers of JPQL/HQL that can follow an entity where an alias would otherwise be
+KEYWORDS = {'SELECT', 'FROM', 'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'FULL', 'CROSS', 'FETCH', 'ON',
+            'WITH', 'AS', 'GROUP', 'ORDER', 'BY', 'HAVING', 'UNION', 'INTERSECT', 'EXCEPT', 'SET', 'AND', 'OR',
+            'NOT', 'IN', 'UPDATE', 'DELETE', 'INSERT', 'INTO', 'VALUES', 'LIMIT', 'OFFSET', 'DISTINCT', 'NEW',
+            'WHEN', 'THEN', 'ELSE', 'END', 'CASE', 'IS', 'NULL', 'BETWEEN', 'LIKE', 'MEMBER', 'OF', 'EXISTS'}
+MODIFY_STATEMENTS = {'UPDATE', 'DELETE', 'INSERT'}
+QUERY_ANNOTATION_NAMES = {'Query', 'NamedQuery', 'NamedNativeQuery'}
+# a query annotation nested in the text of a @NamedQueries/@NamedNativeQueries value
+java_string_pattern = re.compile(r'"""[\s\S]*?"""|"(?:\\.|[^"\\])*"')
+nested_annotation_pattern = re.compile(r'@(?:[\w$]+\.)*(NamedQuery|NamedNativeQuery)\(')
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    text: str
+    offset: int
+
+
+@dataclass(frozen=True)
+class EntityReference:
+    name: str  # the entity name, simple or qualified, as written
+    alias: str | None
+    offset: int  # in the normalized query text
+
+
+@dataclass(frozen=True)
+class JoinReference:
+    path: str  # alias.association
+    alias: str | None
+    offset: int
+
+
+@dataclass(frozen=True)
+class JpqlQuery:
+    text: str  # normalized
+    operation: str  # R(ead) or M(odify), as db_code_map reports it
+    entities: Tuple[EntityReference, ...] = ()
+    joins: Tuple[JoinReference, ...] = ()
+    parameters: Tuple[str, ...] = ()
+
+    @property
+    def aliases(self) -> Dict[str, str]:
+        """alias -> entity name or association path"""
+        aliases = {entity.alias: entity.name for entity in self.entities if entity.alias}
+        aliases.update({join.alias: join.path for join in self.joins if join.alias})
+        return aliases
+
+
+def tokenize(text: str) -> List[Token]:
+    return [Token(match.lastgroup, match.group(), match.start()) for match in token_pattern.finditer(text)
+            if match.lastgroup != 'space']
+
+
+def normalize(text: str) -> str:
+    """the query with its whitespace collapsed, which is the key parse results are cached by"""
+    return ' '.join(text.split())
+
+
+def parse_jpql(text: str) -> JpqlQuery:
+    return _parse(normalize(text))
+
+
+@lru_cache(maxsize=8192)
+def _parse(text: str) -> JpqlQuery:
+    """
+    One pass over the tokens: every FROM (including the ones of subqueries), JOIN, UPDATE, DELETE and INSERT INTO
+    introduces a range variable, which is an entity unless its path starts with an alias already declared, in which
+    case it joins an association of that alias.
+    """
+    tokens = tokenize(text)
+    entities, joins, parameters, aliases = [], [], [], set()
+    first_keyword = next((token.text.upper() for token in tokens if token.kind == 'name'), '')
+    operation = 'M' if first_keyword in MODIFY_STATEMENTS else 'R'
+
+    def is_keyword(token: Token) -> bool:
+        return token.kind == 'name' and token.text.upper() in KEYWORDS
+
+    def range_variable(index: int) -> int:
+        """read path [AS] alias at index, returning the index after it"""
+        if index >= len(tokens) or tokens[index].kind != 'name' or is_keyword(tokens[index]):
+            return index
+        path = tokens[index]
+        index += 1
+        if index < len(tokens) and tokens[index].text.upper() == 'AS':
+            index += 1
+        alias = None
+        if index < len(tokens) and tokens[index].kind == 'name' and not is_keyword(tokens[index]):
+            alias = tokens[index].text
+            index += 1
+        if path.text.split('.')[0] in aliases:
+            joins.append(JoinReference(path.text, alias, path.offset))
+        else:
+            entities.append(EntityReference(path.text, alias, path.offset))
+        if alias:
+            aliases.add(alias)
+        return index
+
+    index = 0
+    subqueries = []  # for every open parenthesis, whether it holds a subquery rather than TRIM(... FROM x) and alike
+    while index < len(tokens):
+        token = tokens[index]
+        keyword = token.text.upper() if token.kind == 'name' else ''
+        index += 1
+        if token.text == '(':
+            subqueries.append(index < len(tokens) and tokens[index].text.upper() == 'SELECT')
+        elif token.text == ')':
+            if subqueries:
+                subqueries.pop()
+        elif token.kind == 'parameter':
+            parameters.append(token.text)
+        elif keyword == 'FROM' and (not subqueries or subqueries[-1]):
+            index = range_variable(index)
+            while index < len(tokens) and tokens[index].text == ',':  # FROM A a, B b
+                index = range_variable(index + 1)
+        elif keyword == 'JOIN':
+            if index < len(tokens) and tokens[index].text.upper() == 'FETCH':
+                index += 1
+            index = range_variable(index)
+        elif keyword == 'UPDATE' or (keyword == 'DELETE' and index < len(tokens) and
+                                     tokens[index].text.upper() != 'FROM'):
+            index = range_variable(index)
+        elif keyword == 'INTO' and index > 1 and tokens[index - 2].text.upper() == 'INSERT':
+            index = range_variable(index)
+    return JpqlQuery(text=text, operation=operation, entities=tuple(entities), joins=tuple(joins),
+                     parameters=tuple(dict.fromkeys(parameters)))
+
+
+def element_type(type_name: str) -> str:
+    """the entity type of an association: the declared type or the element type of a collection (the value of a map)"""
+    if '<' in type_name:
+        arguments = type_name[type_name.index('<') + 1:type_name.rindex('>')]
+        return arguments.split(',')[-1].strip()
+    return type_name
+
+
+def property_type(index: EntityIndex, entity: EntityInfo, property_name: str) -> str | None:
+    visited = set()
+    while entity is not None and entity.qualified_name not in visited:
+        if property_name in entity.property_types:
+            return entity.property_types[property_name]
+        visited.add(entity.qualified_name)
+        entity = index.get(entity.superclass, entity.context) if entity.superclass else None
+    return None
+
+
+def resolve_entities(query: JpqlQuery, index: EntityIndex,
+                     context: TypeContext | None = None) -> List[Tuple[str, EntityInfo]]:
+    """(name or path as written, entity) of every entity and association join the query reads or writes"""
+    resolved, by_alias = [], {}
+    for reference in query.entities:
+        if entity := index.get(reference.name, context):
+            resolved.append((reference.name, entity))
+            if reference.alias:
+                by_alias[reference.alias] = entity
+    for join in query.joins:
+        root, *properties = join.path.split('.')
+        entity = by_alias.get(root)
+        for property_name in properties:
+            if entity is None:
+                break
+            type_name = property_type(index, entity, property_name)
+            entity = index.get(element_type(type_name), entity.context) if type_name else None
+        if entity is not None and properties:
+            resolved.append((join.path, entity))
+            if join.alias:
+                by_alias[join.alias] = entity
+    return resolved
+
+
+@dataclass
+class AnnotationQuery:
+    text: str
+    native: bool
+    line_number: int
+    context: TypeContext
+
+
+def annotation_arguments(text: str, start: int) -> Tuple[Dict[str, str], int]:
+    """the name=value pairs of the annotation arguments starting at text[start], up to the closing parenthesis"""
+    arguments, depth, position, pair_start = {}, 0, start, start
+    while position < len(text):
+        char = text[position]
+        if char == '"' and (literal := java_string_pattern.match(text, position)):
+            position = literal.end() - 1
+        elif char in '({':
+            depth += 1
+        elif char in ')}' or (char == ',' and depth == 0):
+            if depth == 0:
+                name, _, value = text[pair_start:position].partition('=')
+                if value:
+                    arguments[name.strip()] = value.strip()
+                if char != ',':
+                    break
+                pair_start = position + 1
+            else:
+                depth -= 1
+        position += 1
+    return arguments, position
+
+
+def query_values(annotation: AnnotationInfo) -> Iterable[Tuple[str, Dict[str, str]]]:
+    """(annotation name, arguments) of a query annotation or of each query nested in a @NamedQueries"""
+    name = simple_name(annotation.name)
+    if name in QUERY_ANNOTATION_NAMES:
+        yield name, annotation.parameters
+        return
+    for value in annotation.parameters.values():
+        for match in nested_annotation_pattern.finditer(value):
+            yield match.group(1), annotation_arguments(value, match.end())[0]
+
+
+def annotation_queries(java_file_info: JavaFileInfo, constants: ConstantTable) -> List[AnnotationQuery]:
+    """the @Query, @NamedQuery and @NamedNativeQuery texts of a file, with the String constants they use folded"""
+    queries = []
+    for reference_type in java_file_info.reference_types:
+        context = type_context(java_file_info, reference_type)
+        annotations = list(reference_type.annotations)
+        annotations += [a for method in reference_type.methods for a in method.annotations]
+        for annotation in annotations:
+            for name, arguments in query_values(annotation):
+                value = arguments.get('query') or arguments.get('value') or arguments.get(name)
+                text = constants.fold(value, context) if value else None
+                if text:
+                    queries.append(AnnotationQuery(text, name == 'NamedNativeQuery' or
+                                                   arguments.get('nativeQuery') == 'true',
+                                                   annotation.line_number, context))
+    return queries
+
+
+if __name__ == '__main__':
+    import sys
+
+    for query_text in sys.argv[1:]:
+        print(parse_jpql(query_text))
@@ -0,0 +1,322 @@
+from itertools import product
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+from java_code_parser_metadata import ExpressionInfo, JavaFileInfo, MethodInfo, ReferenceTypeInfo, SINK_METHODS, \
+    AMBIGUOUS_SINK_METHODS, sql_statement_pattern
+from constant_table import ConstantTable, TypeContext, type_context
+from query_text import Part, unquote
+
+# a string value as a sequence of literal text and parameter indexes, standing for the argument of each call
+Template = Tuple[str | int, ...]
+
+MAX_VALUES = 16  # alternative values kept per expression, branches beyond it are dropped
+
+
+def concat(elements: Iterable[str | int]) -> Template:
+    """a template with the adjacent literals merged and the empty ones dropped"""
+    merged = []
+    for element in elements:
+        if isinstance(element, str):
+            if not element:
+                continue
+            if merged and isinstance(merged[-1], str):
+                merged[-1] += element
+                continue
+        merged.append(element)
+    return tuple(merged)
+
+
+def combine(alternatives: Sequence[List[Template]]) -> List[Template]:
+    """the concatenations of one alternative of every piece, deduplicated and capped at MAX_VALUES"""
+    values = []
+    for templates in product(*alternatives):
+        value = concat(element for template in templates for element in template)
+        if value not in values:
+            values.append(value)
+            if len(values) == MAX_VALUES:
+                break
+    return values
+
+
+def is_concrete(template: Template) -> bool:
+    return all(isinstance(element, str) for element in template)
+
+
+def render(template: Template) -> str:
+    """the text of a template, the parameters it still depends on left empty"""
+    return ''.join(element for element in template if isinstance(element, str))
+
+
+def generic_erasure(type_name: str) -> str:
+    return type_name.split('<', 1)[0].strip()
+
+
+@dataclass
+class MethodNode:
+    qualified_name: str  # package.Type.method
+    method: MethodInfo
+    java_file_info: JavaFileInfo
+    reference_type: ReferenceTypeInfo
+    context: TypeContext
+    _locals: Dict[str, List[ExpressionInfo]] | None = field(default=None, repr=False)
+
+    def local(self, name: str, line_number: int) -> ExpressionInfo | None:
+        """the latest declaration of a local string before line_number"""
+        if self._locals is None:
+            self._locals = {}
+            declarations = self.method.scope.all_declarations() if self.method.scope else ()
+            for expression in sorted(declarations, key=lambda e: e.line_number):
+                self._locals.setdefault(expression.name, []).append(expression)
+        latest = None
+        for expression in self._locals.get(name, ()):
+            if expression.line_number > line_number:
+                break
+            latest = expression
+        return latest
+
+
+@dataclass
+class QueryFlow:
+    """a query value reaching a sink method, through the return or the parameters of another method when through"""
+    template: Template
+    node: MethodNode
+    line_number: int
+    sink: str
+    through: str | None = None
+    # the argument of the sink is a local string or builder, mapped where it is built rather than as a flow
+    local: bool = False
+
+
+@dataclass
+class MethodSummary:
+    returns: List[Template] = field(default_factory=list)
+    # the values passed to a sink that still depend on parameters, completed by each caller
+    sinks: List[Tuple[Template, str]] = field(default_factory=list)
+    flows: List[QueryFlow] = field(default_factory=list)
+
+    @property
+    def returned_parameters(self) -> Set[int]:
+        return {element for template in self.returns for element in template if isinstance(element, int)}
+
+    @property
+    def sink_parameters(self) -> Set[int]:
+        return {element for template, _ in self.sinks for element in template if isinstance(element, int)}
+
+
+class CallGraph:
+    """
+    The methods of a repository indexed by declaring type, resolving the calls a method makes: unqualified and this
+    calls against the type and its supertypes, field receivers against the declared type of the field (or its only
+    implementation when it is an interface) and capitalized receivers as static calls.
+    """
+
+    def __init__(self, java_file_infos: Iterable[JavaFileInfo], constants: ConstantTable) -> None:
+        self.constants = constants
+        self.methods: Dict[Tuple[str, str], List[MethodNode]] = {}
+        self.types: Dict[str, Tuple[ReferenceTypeInfo, TypeContext]] = {}
+        self.implementations: Dict[str, List[str]] = {}
+        self.nodes: Dict[int, MethodNode] = {}
+        for java_file_info in java_file_infos:
+            for reference_type in java_file_info.reference_types:
+                context = type_context(java_file_info, reference_type)
+                self.types[context.qualified_name] = (reference_type, context)
+                for method in reference_type.methods:
+                    node = MethodNode(f"{context.qualified_name}.{method.name}", method, java_file_info,
+                                      reference_type, context)
+                    self.methods.setdefault((context.qualified_name, method.name), []).append(node)
+                    self.nodes[id(method)] = node
+        for qualified_name, (reference_type, context) in self.types.items():
+            for implemented in reference_type.implements:  # the implemented types are kept as written
+                if supertype := self.known_type(implemented, context):
+                    self.implementations.setdefault(supertype, []).append(qualified_name)
+
+    def node(self, method: MethodInfo) -> MethodNode | None:
+        return self.nodes.get(id(method))
+
+    def known_type(self, type_name: str | None, context: TypeContext) -> str | None:
+        if not type_name:
+            return None
+        for qualified_name in self.constants.qualified_types(generic_erasure(type_name), context):
+            if qualified_name in self.types:
+                return qualified_name
+        return None
+
+    def find(self, qualified_type: str, name: str, arity: int, visited: Set[str]) -> MethodNode | None:
+        """the method declared by the type or inherited from its supertypes, preferring the overload of same arity"""
+        if qualified_type in visited or qualified_type not in self.types:
+            return None
+        visited.add(qualified_type)
+        if candidates := self.methods.get((qualified_type, name)):
+            return next((node for node in candidates if len(node.method.parameters) == arity), candidates[0])
+        reference_type, context = self.types[qualified_type]
+        for type_name in [inheritance.name for inheritance in reference_type.extends or []] + reference_type.implements:
+            if (supertype := self.known_type(type_name, context)) and \
+                    (node := self.find(supertype, name, arity, visited)):
+                return node
+        return None
+
+    def resolve(self, caller: MethodNode, receiver: str | None, name: str, arity: int) -> MethodNode | None:
+        if receiver in (None, 'this'):
+            return self.find(caller.context.qualified_name, name, arity, set())
+        if receiver == 'super':
+            for supertype in caller.context.supertypes:
+                if (qualified_type := self.known_type(supertype, caller.context)) and \
+                        (node := self.find(qualified_type, name, arity, set())):
+                    return node
+            return None
+        field_name = receiver.removeprefix('this.')
+        field_info = next((f for f in caller.reference_type.fields if f.name == field_name), None)
+        if field_info is not None:
+            qualified_type = self.known_type(field_info.type, caller.context)
+        elif receiver[0].isupper() or '.' in receiver:
+            qualified_type = self.known_type(receiver, caller.context)  # a static call
+        else:
+            return None  # a local variable or an expression, whose type the parsers do not keep
+        if qualified_type is None:
+            return None
+        node = self.find(qualified_type, name, arity, set())
+        if node is not None and not node.method.returns and not node.method.calls:
+            # an interface method: follow the implementation when the repository has a single one
+            if len(implementations := self.implementations.get(qualified_type, [])) == 1:
+                return self.find(implementations[0], name, arity, set()) or node
+        return node
+
+
+class MethodSummaries:
+    """
+    The string values each method returns and the values it passes to the query sinks, as templates over its
+    parameters. A summary is computed once, the first time a caller needs it, and is then substituted with the
+    arguments of every call, so that building all of them costs one evaluation per call edge. A method reached again
+    while its own summary is being computed (recursion) contributes an empty summary and is listed in recursive.
+    """
+
+    def __init__(self, graph: CallGraph) -> None:
+        self.graph = graph
+        self.recursive: List[str] = []
+        self._summaries: Dict[int, MethodSummary] = {}
+        self._computing: Set[int] = set()
+        self._evaluating: Set[int] = set()
+
+    def summary(self, node: MethodNode) -> MethodSummary:
+        key = id(node.method)
+        if key in self._summaries:
+            return self._summaries[key]
+        if key in self._computing:
+            self.recursive.append(node.qualified_name)
+            return MethodSummary()
+        self._computing.add(key)
+        try:
+            summary = MethodSummary()
+            for parts in node.method.returns:
+                line_number = parts[0].line_number if parts else node.method.line_number
+                for template in self.evaluate(node, parts, line_number):
+                    if template not in summary.returns and len(summary.returns) < MAX_VALUES:
+                        summary.returns.append(template)
+            for call in node.method.calls:
+                self.add_sinks(node, call, summary)
+        finally:
+            self._computing.discard(key)
+        self._summaries[key] = summary
+        return summary
+
+    def add_sinks(self, node: MethodNode, call, summary: MethodSummary) -> None:
+        callee = self.graph.resolve(node, call.receiver, call.name, len(call.arguments))
+        if call.name in SINK_METHODS and call.arguments and not (call.name in AMBIGUOUS_SINK_METHODS and callee):
+            argument, sink = call.arguments[0], call.name
+            templates = self.evaluate(node, argument, call.line_number)
+            # a value only the summary of another method knows, unlike literals, constants and local builders
+            through = next((part.text for part in argument if part.call and not (
+                part.text.endswith('.toString') and part.text.removesuffix('.toString').isidentifier())), None)
+            local = len(argument) == 1 and self.built_locally(node, argument[0], call.line_number)
+            self.add_flows(node, call.line_number, sink, through, templates, summary, local)
+        elif callee:
+            callee_summary = self.summary(callee)
+            if not callee_summary.sinks:
+                return
+            through = callee.qualified_name
+            arguments = [self.evaluate(node, argument, call.line_number) for argument in call.arguments]
+            for template, sink in callee_summary.sinks:
+                self.add_flows(node, call.line_number, sink, through, self.substitute(template, arguments), summary)
+
+    @staticmethod
+    def built_locally(node: MethodNode, part: Part, line_number: int) -> bool:
+        """whether a part is a local string or builder (sql, sql.toString()) whose text is mapped where it is built"""
+        name = part.text.removesuffix('.toString') if part.call and not part.arguments else part.text
+        if not (part.reference or part.call) or not name.isidentifier() or name in node.method.parameters:
+            return False
+        expression = node.local(name, line_number)
+        return expression is not None and expression.query is not None
+
+    @staticmethod
+    def add_flows(node: MethodNode, line_number: int, sink: str, through: str | None, templates: List[Template],
+                  summary: MethodSummary, local: bool = False) -> None:
+        for template in templates:
+            if not template:
+                continue
+            if is_concrete(template):
+                if sink in AMBIGUOUS_SINK_METHODS and not sql_statement_pattern.match(render(template)):
+                    continue
+                summary.flows.append(QueryFlow(template, node, line_number, sink, through, local))
+            elif (template, sink) not in summary.sinks:
+                summary.sinks.append((template, sink))
+
+    @staticmethod
+    def substitute(template: Template, arguments: List[List[Template]]) -> List[Template]:
+        """replace the parameters of a callee template with the values of the arguments of a call"""
+        return combine([arguments[element] if isinstance(element, int) and element < len(arguments)
+                        else [()] if isinstance(element, int) else [(element,)] for element in template])
+
+    def evaluate(self, node: MethodNode, parts: Sequence[Part], line_number: int) -> List[Template]:
+        """the values of a concatenation evaluated inside a method"""
+        return combine([self.evaluate_part(node, part, line_number) for part in parts])
+
+    def evaluate_part(self, node: MethodNode, part: Part, line_number: int) -> List[Template]:
+        if part.call:
+            return self.evaluate_call(node, part, line_number)
+        if not part.reference:
+            return [concat([unquote(part.text)])]
+        name = part.text
+        if name in node.method.parameters:
+            return [(node.method.parameters.index(name),)]
+        if (expression := node.local(name, line_number)) is not None and expression.query is not None:
+            return self.evaluate_local(node, expression)
+        if (value := self.graph.constants.resolve(name, node.context)) is not None:
+            return [concat([value])]
+        return [()]
+
+    def evaluate_local(self, node: MethodNode, expression: ExpressionInfo) -> List[Template]:
+        key = id(expression)
+        if key in self._evaluating:
+            return [()]  # sql = sql + "...": the earlier value is the literal part already accumulated
+        self._evaluating.add(key)
+        try:
+            return combine([self.evaluate_part(node, segment.reference, segment.line_number) if segment.reference
+                            else [(segment.text,)] for segment in expression.query.segments])
+        finally:
+            self._evaluating.discard(key)
+
+    def evaluate_call(self, node: MethodNode, part: Part, line_number: int) -> List[Template]:
+        receiver, _, name = part.text.rpartition('.')
+        if name == 'toString' and receiver.isidentifier() and not part.arguments:
+            return self.evaluate_part(node, Part(receiver, part.line_number, reference=True), line_number)
+        if name == 'valueOf' and receiver == 'String' and len(part.arguments) == 1:
+            return self.evaluate(node, part.arguments[0], line_number)
+        callee = self.graph.resolve(node, receiver or None, name, len(part.arguments))
+        if callee is not None and (returns := self.summary(callee).returns):
+            arguments = [self.evaluate(node, argument, line_number) for argument in part.arguments]
+            return combine([[value for template in returns for value in self.substitute(template, arguments)]])
+        return [concat(self.evaluate(node, [argument_part for argument in part.arguments for argument_part in argument],
+                                     line_number)[0])]
+
+    def value(self, node: MethodNode, part: Part) -> str | None:
+        """the text of a call or name as a query would read it, alternatives one per line, None when unknown"""
+        templates = [template for template in self.evaluate_part(node, part, part.line_number) if template]
+        return '\n'.join(render(template) for template in templates) if templates else None
+
+    def flows(self) -> List[QueryFlow]:
+        """the concrete query values reaching a sink anywhere in the repository"""
+        flows = []
+        for nodes in self.graph.methods.values():
+            for node in nodes:
+                flows.extend(self.summary(node).flows)
+        return flows
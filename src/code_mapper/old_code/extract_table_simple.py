@@ -1,6 +1,7 @@
 import csv
 import re
 from collections import defaultdict
+from name_matcher import NameMatcher, hit_lines
 
 
 def load_db_objects(csv_filepath, owner_filter=None):
@@ -24,12 +25,33 @@ def identify_tables(java_code):
     return tables_in_code
 
 
+read_start_pattern = re.compile(r'(?i)SELECT')
+read_from_pattern = re.compile(r'(?i)FROM')
+modify_pattern = re.compile(r'(?i)(?:INSERT INTO|UPDATE|DELETE FROM)\b')
+
+
+def hit_usages(java_code, hits):
+    """
+    (is_read, is_modified) of every table hit: a table is read when it appears after a FROM that follows a SELECT,
+    and modified when it appears after an INSERT INTO/UPDATE/DELETE FROM, anywhere in the file. Only the first
+    SELECT ... FROM and the first modify keyword matter, so each is searched once, and the hits of all the tables come
+    from a single NameMatcher pass, where a pattern per table rescanned the whole file for every table.
+    """
+    select = read_start_pattern.search(java_code)
+    read_from = read_from_pattern.search(java_code, select.end()) if select else None
+    modify = modify_pattern.search(java_code)
+    last_hit = dict(hits)
+    return {table_name: (bool(read_from) and position >= read_from.end(), bool(modify) and position >= modify.end())
+            for table_name, position in last_hit.items()}
+
+
+def table_usages(java_code, table_names):
+    usages = hit_usages(java_code, NameMatcher(table_names).finditer(java_code))
+    return {table_name: usages.get(table_name.upper(), (False, False)) for table_name in table_names}
+
+
 def categorize_table_usage(java_code, table_name):
-    read_pattern = re.compile(fr'(?i)SELECT.*?FROM.*?\b{table_name}\b', re.DOTALL)
-    modify_pattern = re.compile(fr'(?i)(INSERT INTO|UPDATE|DELETE FROM)\b.*?\b{table_name}\b', re.DOTALL)
-    is_read = bool(read_pattern.search(java_code))
-    is_modified = bool(modify_pattern.search(java_code))
-    return is_read, is_modified
+    return table_usages(java_code, [table_name])[table_name]
 
 
 def main(csv_filepath, java_filepath, owner_filter=None):
@@ -38,12 +60,17 @@ def main(csv_filepath, java_filepath, owner_filter=None):
     with open(java_filepath, 'r', encoding='utf-8') as file:
         java_code = file.read()
 
-    tables_in_code = identify_tables(java_code)
+    # one pass for every catalog name: the usages count them in any case, as the per-table patterns did, while the
+    # lines only count the ones written in upper case, as identify_tables did
+    hits = list(NameMatcher(db_objects).finditer(java_code))
+    upper_case_hits = [(name, offset) for name, offset in hits if java_code.startswith(name, offset)]
+    tables_in_code = hit_lines(java_code, upper_case_hits)
 
     table_usage = defaultdict(lambda: {'read': False, 'modified': False, 'lines': set()})
+    usages = hit_usages(java_code, hits)
     for table_name, lines in tables_in_code.items():
         if table_name in db_objects:
-            is_read, is_modified = categorize_table_usage(java_code, table_name)
+            is_read, is_modified = usages[table_name]
             table_usage[table_name]['read'] = is_read
             table_usage[table_name]['modified'] = is_modified
             table_usage[table_name]['lines'].update(lines)
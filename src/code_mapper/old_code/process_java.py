@@ -1,37 +1,21 @@
 from source_code_metadata import *
 import os
 from tree_sitter import Language, Parser, Tree
+from ts_languages import get_language
+from ts_query_registry import registry
 
 
 def build_languages():
-    Language.build_library(
-        '../../vendor/build/my-languages.so',
-        [
-            '../../vendor/tree-sitter/tree-sitter-java',
-            '../../vendor/tree-sitter/tree-sitter-javascript',
-            '../../vendor/tree-sitter/tree-sitter-php'
-        ]
-    )
-    JV_LANGUAGE = Language('../../vendor/build/my-languages.so', 'java')
-    return JV_LANGUAGE
+    return get_language('java')
 
 
 def find_package_class(language: Language, tree: Tree) -> tuple[str, str]:
-    tsq_package_class = """(package_declaration (scoped_identifier) @package)
-                            (class_declaration name: (identifier) @class_name)
-                        """
-    query = language.query(tsq_package_class)
-    captures = query.captures(tree.root_node)
-
     package, class_name = '', ''
-    for capture in captures:
-        text = capture[0].text.decode('utf8')
-        type = capture[1]
-
-        if type == "package":
-            package = text
-        elif type == "class_name":
-            class_name = text
+    for capture in registry.captures('package_class', tree.root_node):
+        if capture.name == "package":
+            package = capture.text
+        elif capture.name == "class_name":
+            class_name = capture.text
 
     return package, class_name
 
@@ -65,33 +49,15 @@ def find_string_variables(language: Language, tree: Tree) -> dict[str, tuple[str
                     current_fragment += char
         return ''.join(result)
 
-    tsq_str_multi_line1 = """(field_declaration
-                              type: (type_identifier) @_type (#eq? @_type "String")
-                              declarator: (variable_declarator
-                                name: (identifier) @str_name
-                                value: [
-                                    (binary_expression) @str
-                                    (string_literal) @str
-                                    ]
-                              )
-                            )
-
-    """
-    query = language.query(tsq_str_multi_line1)
-    captures = query.captures(tree.root_node)
-
     string_variables = {}
     variable_name = ''
-    for capture in captures:
-        text = capture[0].text.decode('utf8')
-        type = capture[1]
-
-        if type == 'str_name':
-            variable_name = text
+    for capture in registry.captures('string_fields', tree.root_node):
+        if capture.name == 'str_name':
+            variable_name = capture.text
             string_variables[variable_name] = ('', 0)
             continue
-        elif type == 'str':
-            string_variables[variable_name] = (extract_string(text), capture[0].start_point)
+        elif capture.name == 'str':
+            string_variables[variable_name] = (extract_string(capture.text), capture.node.start_point)
 
     return string_variables
 
@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from typing import List
+from importlib.metadata import version
+from antlr4 import InputStream, Token
+from antlr4.PredictionContext import ArrayPredictionContext, PredictionContext, SingletonPredictionContext
+from antlr4.atn.ATNConfigSet import ATNConfigSet
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.LexerAction import LexerAction
+from antlr4.atn.LexerActionExecutor import LexerActionExecutor
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr.PlSqlLexer import PlSqlLexer, serializedATN
+
+# the lexer DFA built by earlier runs, keyed by the sha1 of the grammar and runtime it was built with
+CACHE_PATH = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'code_mapper' / 'plsql_lexer_dfa.pickle'
+
+
+class CaseFoldingStream(InputStream):
+    """
+    An InputStream that shows the lexer the upper case of a text, while the tokens keep the text as written. Oracle
+    sql is case-insensitive: folding the characters as they are read lets select and SELECT share the states of the
+    lexer DFA, without copying the text into an upper case string nor into the list of code points of InputStream.
+    """
+    __slots__ = ()
+
+    def _loadString(self) -> None:
+        self._index = 0
+        self._size = len(self.strdata)
+
+    def LA(self, offset: int) -> int:
+        if offset == 0:
+            return 0  # undefined
+        if offset < 0:
+            offset += 1  # LA(-1) is the last character read
+        position = self._index + offset - 1
+        if position < 0 or position >= self._size:
+            return Token.EOF
+        char = self.strdata[position]
+        code = ord(char)
+        if code < 128:
+            return code - 32 if 97 <= code <= 122 else code
+        upper = char.upper()
+        return ord(upper) if len(upper) == 1 else code  # ß has no single upper case character
+
+
+def cache_key() -> str:
+    """the grammar and the runtime the cache was built with; a regenerated lexer or another runtime invalidates it"""
+    return hashlib.sha1(repr((serializedATN(), version('antlr4-python3-runtime'))).encode()).hexdigest()
+
+
+def config_set(configs: list, full_context: bool, unique_alt: int, conflicting_alts, has_semantic_context: bool,
+               dips_into_outer_context: bool) -> ATNConfigSet:
+    """the read-only config set of a DFA state, as it is before its hash code is first asked for"""
+    configs_set = ATNConfigSet(full_context)
+    configs_set.configs, configs_set.uniqueAlt, configs_set.conflictingAlts = configs, unique_alt, conflicting_alts
+    configs_set.hasSemanticContext, configs_set.dipsIntoOuterContext = has_semantic_context, dips_into_outer_context
+    configs_set.setReadonly(True)
+    return configs_set
+
+
+class DfaPickler(pickle.Pickler):
+    """
+    Pickles the DFA of the lexer without the ATN its states point into: the ATN states, the lexer actions and the
+    empty contexts the runtime compares by identity are written as references, resolved against the ATN deserialized
+    when PlSqlLexer is imported
+    """
+
+    def __init__(self, file, atn) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.actions = {id(action): index for index, action in enumerate(atn.lexerActions)}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, ATNState):
+            return 'state', obj.stateNumber
+        if isinstance(obj, LexerAction) and id(obj) in self.actions:
+            return 'action', self.actions[id(obj)]
+        if obj is SemanticContext.NONE or obj is PredictionContext.EMPTY:
+            return 'singleton', type(obj).__name__
+        return None
+
+    def reducer_override(self, obj):
+        # the contexts, executors and config sets cache hash codes built from str hashes, which differ from a process
+        # to the next: they are rebuilt by their constructors so that the DFA states are found again once loaded
+        if isinstance(obj, ArrayPredictionContext):
+            return ArrayPredictionContext, (obj.parents, obj.returnStates)
+        if isinstance(obj, SingletonPredictionContext):
+            return SingletonPredictionContext, (obj.parentCtx, obj.returnState)
+        if isinstance(obj, LexerActionExecutor):
+            return LexerActionExecutor, (obj.lexerActions,)
+        if isinstance(obj, ATNConfigSet):
+            return config_set, (obj.configs, obj.fullCtx, obj.uniqueAlt, obj.conflictingAlts, obj.hasSemanticContext,
+                                obj.dipsIntoOuterContext)
+        return NotImplemented
+
+
+class DfaUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, atn) -> None:
+        super().__init__(file)
+        self.atn = atn
+
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == 'state':
+            return self.atn.states[value]
+        if kind == 'action':
+            return self.atn.lexerActions[value]
+        return SemanticContext.NONE if value == type(SemanticContext.NONE).__name__ else PredictionContext.EMPTY
+
+
+def load_cache(path: Path = CACHE_PATH) -> bool:
+    """the DFA a warm run saved, set on PlSqlLexer before any lexer is created; False when there is no usable cache"""
+    try:
+        with open(path, 'rb') as cache_file:
+            if cache_file.read(40).decode() != cache_key():
+                return False
+            decisions_to_dfa = DfaUnpickler(cache_file, PlSqlLexer.atn).load()
+    except (OSError, EOFError, ImportError, AttributeError, TypeError, ValueError, IndexError, pickle.UnpicklingError):
+        return False
+    PlSqlLexer.decisionsToDFA = decisions_to_dfa
+    return True
+
+
+def save_cache(path: Path = CACHE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(recursion_limit, 100000))  # the DFA states are linked by their edges
+    try:
+        with open(path.with_suffix('.tmp'), 'wb') as cache_file:
+            cache_file.write(cache_key().encode())
+            DfaPickler(cache_file, PlSqlLexer.atn).dump(PlSqlLexer.decisionsToDFA)
+        path.with_suffix('.tmp').replace(path)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+
+def new_lexer() -> PlSqlLexer:
+    lexer = PlSqlLexer(CaseFoldingStream(''))
+    lexer.removeErrorListeners()
+    return lexer
+
+
+def lex(lexer: PlSqlLexer, text: str) -> List[Token]:
+    lexer.inputStream = CaseFoldingStream(text)
+    lexer.reset()
+    return lexer.getAllTokens()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the warm DFA cache of the PlSql lexer")
+    parser.add_argument('scripts', nargs='*', type=Path, help='Sql scripts lexed to fill the cache')
+    parser.add_argument('--cache', type=Path, default=CACHE_PATH, help=f"Cache file, defaults to {CACHE_PATH}")
+    parser.add_argument('--time', action='store_true', help='Only time the lexing of the scripts, cold and cached')
+    args = parser.parse_args()
+
+    texts = [script.read_text(encoding='utf-8', errors='replace') for script in args.scripts]
+    if args.time:
+        loaded = load_cache(args.cache)
+        start = time.perf_counter()
+        plsql_lexer = new_lexer()
+        token_count = sum(len(lex(plsql_lexer, text)) for text in texts)
+        print(f"{token_count} tokens in {time.perf_counter() - start:.3f}s "
+              f"({'cached' if loaded else 'cold'} DFA, {sum(len(dfa._states) for dfa in PlSqlLexer.decisionsToDFA)} "
+              f"states after)")
+        sys.exit(0)
+    load_cache(args.cache)
+    plsql_lexer = new_lexer()
+    for text in texts:
+        lex(plsql_lexer, text)
+    save_cache(args.cache)
+    print(f"{sum(len(dfa._states) for dfa in PlSqlLexer.decisionsToDFA)} DFA states written to {args.cache}")
@@ -0,0 +1,553 @@
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+from functools import lru_cache, partial
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+from sql_lexer import KEYWORDS as SQL_KEYWORDS, ObjectReference, object_references, split_name
+from file_walker import walk
+
+# the first words of the statements that hold pl/sql code, ended by the END of their outermost block or by a / line
+BLOCK_START = r"""(?:DECLARE|BEGIN|CREATE\s+(?:(?:OR\s+REPLACE|EDITIONABLE|NONEDITIONABLE|AND\s+RESOLVE|AND\s+COMPILE
+    |NOFORCE|NO\s+FORCE|FORCE)\s+)*(?:PACKAGE|PROCEDURE|FUNCTION|TRIGGER|TYPE|LIBRARY|JAVA))(?![\w$#])"""
+block_pattern = re.compile(BLOCK_START, re.IGNORECASE | re.VERBOSE)
+# whether a statement is pl/sql, or a create statement that may be once its first words are read
+statement_start_pattern = re.compile(rf"(?P<block>{BLOCK_START})|(?P<create>CREATE(?![\w$#]))",
+                                     re.IGNORECASE | re.VERBOSE)
+# the kind and name of the object a create statement defines
+create_pattern = re.compile(r"""CREATE\s+(?:(?:OR\s+REPLACE|EDITIONABLE|NONEDITIONABLE|EDITIONING|NOFORCE|NO\s+FORCE
+    |FORCE|AND\s+RESOLVE|AND\s+COMPILE|GLOBAL\s+TEMPORARY|PRIVATE\s+TEMPORARY|PUBLIC|UNIQUE|BITMAP)\s+)*
+    (?P<kind>PACKAGE\s+BODY|TYPE\s+BODY|MATERIALIZED\s+VIEW|JAVA\s+SOURCE|PACKAGE|PROCEDURE|FUNCTION|TRIGGER|TYPE
+    |VIEW|TABLE|INDEX|SEQUENCE|SYNONYM|LIBRARY)\s+(?:IF\s+NOT\s+EXISTS\s+)?
+    (?P<name>(?:"[^"]*"|[A-Za-z_][\w$#]*)(?:\s*\.\s*(?:"[^"]*"|[A-Za-z_][\w$#]*))?)""", re.IGNORECASE | re.VERBOSE)
+# the words that open and close pl/sql blocks
+KEYWORDS = r"(?i:END(?:\s+(?:IF|LOOP|CASE))?|BEGIN|CASE|DECLARE|COMPOUND|IS|AS|PROCEDURE|FUNCTION|PACKAGE|BODY)"
+# the closed strings, quoted identifiers and comments, which may hide a ; or a keyword
+CLOSED = r"""'(?:[^']|'')*+'|"[^"\n]*"|--[^\n]*+|/\*(?:[^*]|\*(?!/))*+\*/"""
+# what a splitter stops at: what the chunk leaves open (a string, a comment, any q'[..]' quoting, whose closing is
+# then looked for by itself), the semicolons and a / that may be alone on its line
+STOPS = r"""(?P<string>'(?:[^']|'')*+\Z) | (?P<quoted>[qQ]'(?P<opening>\S)) | (?P<comment>/\*) | (?P<semicolon>;)
+    | (?P<slash>/[ \t]*(?=\r?\n|\Z))"""
+# everything up to the next stop is consumed in one possessive match, the runs of plain characters and the closed
+# strings and comments at once, so that a statement costs a match or two instead of one per token
+plain_split_pattern = re.compile(rf"""(?:[^'";qQ/\-]++|{CLOSED}|[qQ](?!')|-|/(?![*\s]))*+
+    (?:{STOPS} | [^;] | \Z)""", re.VERBOSE)
+# the same plus the keywords, for pl/sql; the other words are consumed whole, so that a keyword is only seen as a word
+block_split_pattern = re.compile(rf"""(?:[^'";qQ/\-\w$#]++|{CLOSED}|(?!{KEYWORDS}(?![\w$#])|[nN]?[qQ]')[\w$#]++
+    |-|/(?![*\s]))*+
+    (?:{STOPS} | (?<![\w$#])(?P<keyword>{KEYWORDS})(?![\w$#]) | [^;] | \Z)""", re.VERBOSE)
+# the rest of a string continued from a previous chunk, possessive so that a '' pair is never split
+string_end_pattern = re.compile(r"(?:[^']|'')*+'")
+blank_pattern = re.compile(r'(?:\s++|--[^\n]*+|/\*(?:[^*]|\*(?!/))*+\*/)*+')
+blank_end_pattern = re.compile(r'\s*\Z')
+end_suffix_pattern = re.compile(r'\s*(IF|LOOP|CASE)(?![\w$#])', re.IGNORECASE)
+# the lines that are not sql: a / ending the last block, the sql*plus commands, which take the rest of their line
+# (PROMPT don't would open a string) and EXEC, which runs the rest of its line as a block and needs no terminator
+line_command_pattern = re.compile(r"""(?P<slash>/[ \t]*\r?(?:\n|\Z)) | (?P<exec>EXEC(?:UTE)?(?![\w$#]))
+    | (?P<sqlplus>@|(?:REM|REMARK|PROMPT|SET|SPOOL|WHENEVER|EXIT|QUIT|SHOW|DEFINE|UNDEFINE|COLUMN|TTITLE|BTITLE|BREAK
+    |COMPUTE|CLEAR|PAUSE|ACCEPT|CONNECT|DISCONNECT|HOST|TIMING|VARIABLE|PRINT)(?![\w$#]))""",
+                                  re.IGNORECASE | re.VERBOSE)
+# the table references of plain sql, found without lexing every token: the names after the keywords that introduce
+# tables (with their aliases and comma separated lists) and the names followed by an argument list. What lies between
+# two of them is consumed in one possessive match, the strings and comments included, and a word is only consumed
+# when it is not a stop, so that a match never fails half way to be retried from the next character
+NAME = r'(?:"[^"]*"|[A-Za-z_][\w$#]*)(?:\.(?:"[^"]*"|[A-Za-z_][\w$#]*))*(?:@[\w$#.]+)?'
+TABLE_KEYWORDS = r'(?i:DELETE(?:\s+FROM)?|UPDATE|TRUNCATE\s+TABLE|INTO|FROM|JOIN|USING)'
+CLAUSE_KEYWORDS = '|'.join(sorted(SQL_KEYWORDS, key=len, reverse=True))
+ALIAS = rf'(?:\s++(?!(?i:{CLAUSE_KEYWORDS})(?![\w$#]))[A-Za-z_][\w$#]*+)?'
+table_reference_pattern = re.compile(rf'(?P<name>{NAME}){ALIAS}')
+classify_pattern = re.compile(rf"""(?:[^'"\w$#\-/]++|'(?:[^']|'')*+'?|"[^"]*+"?|--[^\n]*+|/\*(?:[^*]|\*(?!/))*+(?:\*/)?
+    |[-/]|[0-9$#][\w$#]*+|(?!{TABLE_KEYWORDS}\s++{NAME})(?:[A-Za-z_][\w$#]*+(?!\s*+\(|\.)|(?!{NAME}\s*+\(){NAME}))*+
+    (?:(?P<keyword>{TABLE_KEYWORDS})\s++(?P<tables>{NAME}{ALIAS}(?:\s*+,\s*+{NAME}{ALIAS})*+)
+      | (?P<call>{NAME})\s*+\(
+      | \Z)""", re.VERBOSE)
+# the statements whose references depend on their structure (subqueries, common table expressions), left to the parser
+nested_query_pattern = re.compile(r'\(\s*(?:SELECT|WITH)(?![\w$#])|^WITH(?![\w$#])', re.IGNORECASE)
+Q_CLOSINGS = {'[': "]'", '{': "}'", '(': ")'", '<': ">'"}
+# the name of a procedure or function declared in a package body is followed by its parameters, not called
+declaration_pattern = re.compile(r'(?:PROCEDURE|FUNCTION)\s+$', re.IGNORECASE)
+# the table or view a trigger fires on, read by it (not a database or schema event)
+trigger_table_pattern = re.compile(rf'(?<![\w$#])ON\s+(?!(?:DATABASE|SCHEMA)(?![\w$#]))(?P<name>{NAME})',
+                                   re.IGNORECASE)
+# the types and built-in functions whose argument lists (VARCHAR2(100), NVL(..)) are not calls to database objects
+BUILTINS = frozenset({
+    'VARCHAR2', 'VARCHAR', 'NVARCHAR2', 'CHAR', 'NCHAR', 'NUMBER', 'INTEGER', 'INT', 'SMALLINT', 'DECIMAL', 'NUMERIC',
+    'FLOAT', 'BINARY_INTEGER', 'PLS_INTEGER', 'BINARY_FLOAT', 'BINARY_DOUBLE', 'DATE', 'TIMESTAMP', 'INTERVAL', 'RAW',
+    'CLOB', 'NCLOB', 'BLOB', 'BOOLEAN', 'NVL', 'NVL2', 'DECODE', 'COALESCE', 'NULLIF', 'CAST', 'TO_CHAR', 'TO_DATE',
+    'TO_NUMBER', 'TO_TIMESTAMP', 'TO_CLOB', 'TRUNC', 'ROUND', 'SUBSTR', 'INSTR', 'LENGTH', 'UPPER', 'LOWER', 'INITCAP',
+    'TRIM', 'LTRIM', 'RTRIM', 'LPAD', 'RPAD', 'REPLACE', 'TRANSLATE', 'CONCAT', 'CHR', 'ASCII', 'COUNT', 'SUM', 'MIN',
+    'MAX', 'AVG', 'ABS', 'MOD', 'POWER', 'SQRT', 'CEIL', 'FLOOR', 'SIGN', 'GREATEST', 'LEAST', 'ADD_MONTHS',
+    'MONTHS_BETWEEN', 'LAST_DAY', 'NEXT_DAY', 'EXTRACT', 'REGEXP_LIKE', 'REGEXP_SUBSTR', 'REGEXP_REPLACE',
+    'REGEXP_INSTR', 'ROW_NUMBER', 'RANK', 'DENSE_RANK', 'LAG', 'LEAD', 'LISTAGG', 'OVER', 'SQLERRM',
+    'RAISE_APPLICATION_ERROR'})
+HEADER_LENGTH = 512  # characters that hold the first words of a create statement, which tell whether it is pl/sql
+CHUNK_SIZE = 1 << 20  # bytes read at a time, a statement splits across chunks at no cost
+STATEMENT_TIMEOUT = 2.0  # seconds a statement may be parsed for before the token scanner is used instead
+BATCH_SIZE = 256  # statements sent to each worker at a time
+
+
+@dataclass(frozen=True)
+class ScriptStatement:
+    text: str
+    line_number: int  # of its first token in the script
+    kind: str = ''  # PACKAGE BODY, PROCEDURE, FUNCTION, TRIGGER, VIEW... for a create statement
+    name: str = ''  # of the object it creates, owner.name when qualified
+    block: bool = False  # pl/sql code, which the token scanner can only approximate
+
+
+@dataclass(frozen=True)
+class Edge:
+    source: str  # the object whose code refers to the target, '' for a statement outside of any
+    target: str
+    qualifier: str | None  # the owner of owner.object or the package of package.procedure
+    operation: str  # R, M or C for a procedure or function call
+    line_number: int
+
+
+def created_object(text: str) -> Tuple[str, str]:
+    """(kind, name) of the object a statement creates, ('', '') if none"""
+    match = create_pattern.match(text)
+    if match is None:
+        return '', ''
+    return ' '.join(match.group('kind').upper().split()), '.'.join(split_name(re.sub(r'\s+', '', match.group('name'))))
+
+
+class ScriptSplitter:
+    """
+    Splits a sql*plus script fed in chunks of whole lines into its statements, holding only the text of the statement
+    being read. Plain sql ends at its semicolon; a pl/sql unit or an anonymous block at the semicolon after the END of
+    its outermost block (BEGIN, DECLARE, CASE or the IS/AS of a package, procedure or function), nested ones and END
+    IF/LOOP counted, or at a / alone on its line. Strings, q'[..]' quoting, quoted identifiers and comments are
+    skipped, across chunks too, and sql*plus commands are dropped with their line.
+    """
+
+    def __init__(self) -> None:
+        self.line_number = 1  # of the start of the next chunk
+        self.closing: str | None = None  # what closes the string or comment the last chunk left open
+        self.started = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.parts: List[str] = []
+        self.start_line = 0
+        self.block: bool | None = None  # None for a create statement whose first words are not all read yet
+        self.blocks: List[str] = []  # the open blocks, innermost last
+        self.closed = False  # the outermost block has ended
+        self.unit = False  # a procedure, function or package name was seen, its IS/AS opens its block
+        self.end_pending = False  # an END ended the last chunk, END IF/LOOP/CASE may go on in the next one
+
+    def statement(self) -> ScriptStatement:
+        text = ''.join(self.parts).rstrip()
+        kind, name = created_object(text)
+        statement = ScriptStatement(text, self.start_line, kind, name, self.is_block(''))
+        self.started = False
+        self.reset()
+        return statement
+
+    def is_block(self, tail: str) -> bool:
+        """whether the statement is pl/sql, told by its first words (the parts read so far and the tail of the chunk)"""
+        if self.block is None:
+            self.block = block_pattern.match(''.join(self.parts) + tail) is not None
+        return self.block
+
+    def close_block(self) -> None:
+        if self.blocks:
+            self.blocks.pop()
+            self.closed = not self.blocks
+
+    def keyword(self, word: str, chunk_end: bool) -> None:
+        match word:
+            case 'END':
+                if chunk_end:
+                    self.end_pending = True
+                else:
+                    self.close_block()
+            case 'END CASE':
+                self.close_block()
+            case 'BEGIN':
+                if self.blocks and self.blocks[-1] == 'DECLARE':
+                    self.blocks[-1] = 'BEGIN'  # the body of the declarations
+                else:
+                    self.blocks.append('BEGIN')
+            case 'DECLARE' | 'CASE' | 'COMPOUND':
+                self.blocks.append(word)
+            case 'IS' | 'AS':
+                if self.unit:
+                    self.blocks.append('DECLARE')
+                    self.unit = False
+            case 'PROCEDURE' | 'FUNCTION' | 'PACKAGE' | 'BODY':
+                self.unit = True
+
+    def skip_closing(self, text: str, position: int) -> int | None:
+        """the position after the closing of the open string or comment, None when the chunk does not hold it"""
+        if self.closing == "'":
+            match = string_end_pattern.match(text, position)
+            return None if match is None else match.end()
+        end = text.find(self.closing, position)
+        return None if end < 0 else end + len(self.closing)
+
+    def feed(self, text: str) -> Iterator[ScriptStatement]:
+        """the statements a chunk of whole lines ends"""
+        position, segment, length = 0, 0, len(text)  # segment: where the statement starts in the chunk
+        counted, line_number = 0, self.line_number  # line_number is the line of text[counted]
+        while position < length:
+            if self.closing is not None:
+                end = self.skip_closing(text, position)
+                if end is None:
+                    break
+                self.closing, position = None, end
+                continue
+            if self.end_pending:
+                self.end_pending = False
+                suffix = end_suffix_pattern.match(text, position)
+                if suffix is None or suffix.group(1).upper() == 'CASE':
+                    self.close_block()
+                if suffix is not None:
+                    position = suffix.end()
+            if not self.started:
+                position = blank_pattern.match(text, position).end()
+                if position == length:
+                    break
+                if text.startswith('/*', position):
+                    self.closing, position = '*/', position + 2
+                    continue
+                line_start = text.rfind('\n', 0, position) + 1
+                command = line_command_pattern.match(text, position) if not text[line_start:position].strip() else None
+                if command is not None:
+                    line_end = text.find('\n', position)
+                    line_end = length if line_end < 0 else line_end + 1
+                    if command.lastgroup == 'exec':
+                        line_number += text.count('\n', counted, position)
+                        counted = position
+                        self.start_line, self.parts = line_number, [text[position:line_end]]
+                        yield self.statement()
+                    position = line_end
+                    continue
+                line_number += text.count('\n', counted, position)
+                counted = position
+                self.started, self.start_line, segment = True, line_number, position
+                start = statement_start_pattern.match(text, position)
+                if start is not None and start.lastgroup == 'block':
+                    self.block = True
+                elif start is None or length - position > HEADER_LENGTH:
+                    self.block = False
+            match = (plain_split_pattern if self.block is False else block_split_pattern).match(text, position)
+            position = match.end()
+            kind = match.lastgroup
+            if kind is None:
+                continue
+            if kind == 'string':
+                if position == length and text[-1] == '\n':
+                    self.closing = "'"  # a string the chunk does not close
+            elif kind == 'quoted':
+                opening = match.group('opening')
+                self.closing = Q_CLOSINGS.get(opening, opening + "'")
+            elif kind == 'comment':
+                self.closing = '*/'
+            elif kind == 'semicolon':
+                self.unit = False
+                if not self.is_block(text[segment:position]) or (self.closed and not self.blocks):
+                    self.parts.append(text[segment:position])
+                    yield self.statement()
+                    segment = position
+            elif kind == 'slash':
+                slash = match.start(kind)
+                line_start = text.rfind('\n', 0, slash) + 1
+                if not text[line_start:slash].strip():
+                    self.parts.append(text[segment:line_start])
+                    yield self.statement()
+                    segment = position
+            else:
+                self.keyword(' '.join(match.group(kind).upper().split()),
+                             blank_end_pattern.match(text, position) is not None)
+        if self.started:
+            self.parts.append(text[segment:])
+        self.line_number = line_number + text.count('\n', counted)
+
+    def close(self) -> Iterator[ScriptStatement]:
+        if self.started and ''.join(self.parts).strip():
+            yield self.statement()
+
+
+def split_chunks(chunks: Iterable[str]) -> Iterator[ScriptStatement]:
+    splitter = ScriptSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+
+def split_script(text: str) -> Iterator[ScriptStatement]:
+    return split_chunks([text])
+
+
+def read_chunks(file_path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """a script in chunks of whole lines, decoded as utf-8, or line by line as windows-1252 where that fails"""
+    with open(file_path, 'rb') as script:
+        pending = []  # the bytes read since the last line break
+        while block := script.read(chunk_size):
+            cut = block.rfind(b'\n') + 1
+            if not cut:
+                pending.append(block)
+                continue
+            yield decode(b''.join(pending) + block[:cut])
+            pending = [block[cut:]]
+        if rest := b''.join(pending):
+            yield decode(rest)
+
+
+def decode(data: bytes) -> str:
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return ''.join(decode_line(line) for line in data.splitlines(keepends=True))
+
+
+def decode_line(line: bytes) -> str:
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode('windows-1252', errors='replace')
+
+
+def builtin(target: str, qualifier: str | None) -> bool:
+    """whether a name followed by an argument list is a built-in type or function, not a call to a database object"""
+    return qualifier is None and target in BUILTINS
+
+
+def table_offsets(text: str) -> Dict[int, str]:
+    """the offsets of the names a text refers to as tables, with the keyword before them (FROM, JOIN, INTO...)"""
+    offsets = {}
+    for match in classify_pattern.finditer(text):
+        if match.lastgroup != 'call' and match.group('keyword') is not None:
+            keyword = ' '.join(match.group('keyword').upper().split())
+            for table in table_reference_pattern.finditer(match.group('tables')):
+                offsets[match.start('tables') + table.start()] = keyword
+    return offsets
+
+
+def scan_edges(statement: ScriptStatement) -> List[Edge]:
+    """
+    The edges of a statement from its tokens alone (sql_lexer): the targets of dml are modified, the names in the
+    place of a table (after FROM, JOIN or USING, not the variables of SELECT ... INTO, or the table of a trigger) read
+    and the names followed by an argument list, built-in functions and types excepted, called. The columns, aliases
+    and variables of its select lists and predicates are left out.
+    """
+    tables = table_offsets(statement.text)
+    if statement.kind == 'TRIGGER' and (trigger := trigger_table_pattern.search(statement.text)):
+        tables[trigger.start('name')] = 'ON'
+    edges, line_number, position = [], statement.line_number, 0
+    for reference in object_references(statement.text):
+        operation = 'M' if reference.operation == 'M' else 'C' if reference.call else reference.operation
+        if not operation or operation == 'R' and tables.get(reference.offset, 'INTO') == 'INTO':
+            continue
+        if operation == 'C' and (builtin(reference.name, reference.qualifier) or
+                                  declaration_pattern.search(statement.text, max(0, reference.offset - 40),
+                                                             reference.offset)):
+            continue
+        qualified = f"{reference.qualifier}.{reference.name}" if reference.qualifier else reference.name
+        if qualified == statement.name:
+            continue
+        line_number += statement.text.count('\n', position, reference.offset)
+        position = reference.offset
+        edges.append(Edge(statement.name, reference.name, reference.qualifier, operation, line_number))
+    return edges
+
+
+def classify_edges(statement: ScriptStatement) -> List[Edge]:
+    """
+    The edges of a plain sql statement from its table references alone, without lexing every token nor building a
+    parse tree: the target of INSERT/MERGE INTO, UPDATE, DELETE [FROM] and TRUNCATE TABLE is modified, the tables after
+    FROM, JOIN and USING are read and the names followed by an argument list called
+    """
+    text = statement.text
+    first_word = re.match(r'\w*', text).group().upper()
+    edges, line_number, position = [], statement.line_number, 0
+    for match in classify_pattern.finditer(text):
+        if match.lastgroup == 'call':
+            references = [(match.group('call'), match.start('call'), 'C')]
+        elif match.group('keyword') is not None:
+            keyword = ' '.join(match.group('keyword').upper().split())
+            modified = (match.start() == 0 and keyword in ('UPDATE', 'DELETE', 'DELETE FROM', 'TRUNCATE TABLE')
+                        or keyword == 'INTO' and first_word in ('INSERT', 'MERGE'))
+            offset = match.start('tables')
+            references = [(table.group('name'), offset + table.start(), 'M' if modified else 'R')
+                          for table in table_reference_pattern.finditer(match.group('tables'))]
+        else:
+            continue
+        for name, offset, operation in references:
+            if name.upper() in SQL_KEYWORDS:
+                continue
+            parts = split_name(name)
+            target, qualifier = (parts[0], None) if len(parts) == 1 else (parts[-1], parts[-2])
+            if operation == 'C' and builtin(target, qualifier) or '.'.join(parts[-2:]) == statement.name:
+                continue
+            line_number += text.count('\n', position, offset)
+            position = offset
+            edges.append(Edge(statement.name, target, qualifier, operation, line_number))
+    return edges
+
+
+@lru_cache(maxsize=None)
+def parser_available() -> bool:
+    """whether the antlr PlSqlParser has been generated into antlr/, it is not part of the tree"""
+    try:
+        import plsql_parser  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def extract_edges(statement: ScriptStatement, timeout: float = STATEMENT_TIMEOUT) -> Tuple[List[Edge], str]:
+    """
+    (edges, 'classifier', 'parser' or 'scanner') of a statement: the table references of plain sql without nested
+    queries, which is most of a dump, and for pl/sql and the rest the parse tree when it parses in time, the tokens
+    otherwise
+    """
+    if not statement.block and nested_query_pattern.search(statement.text) is None:
+        return classify_edges(statement), 'classifier'
+    if timeout > 0 and parser_available():
+        from plsql_parser import parse_edges
+
+        edges = parse_edges(statement, time.perf_counter() + timeout)
+        if edges is not None:
+            return edges, 'parser'
+    return scan_edges(statement), 'scanner'
+
+
+def batches(statements: Iterable[ScriptStatement], size: int) -> Iterator[List[ScriptStatement]]:
+    batch = []
+    for statement in statements:
+        batch.append(statement)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def extract_script(statements: Iterable[ScriptStatement], workers: int = 1,
+                   timeout: float = STATEMENT_TIMEOUT) -> Iterator[Tuple[ScriptStatement, List[Edge], str]]:
+    """
+    (statement, edges, method) of a stream of statements, parsed by a pool of processes with workers > 1. The
+    statements are sent in bounded batches, so that a dump is never held in memory as a whole.
+    """
+    if workers <= 1:
+        for statement in statements:
+            yield statement, *extract_edges(statement, timeout)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in batches(statements, BATCH_SIZE * workers):
+            for statement, (edges, method) in zip(batch, pool.map(partial(extract_edges, timeout=timeout), batch,
+                                                                  chunksize=BATCH_SIZE // 4)):
+                yield statement, edges, method
+
+
+def map_edge(edge: Edge, mapper, line: str, file_info: dict) -> List:
+    """the TokenInfo of the catalog objects of a db_code_map.CodeDbMapper an edge can refer to"""
+    from db_code_map import TokenInfo
+
+    reference = ObjectReference(edge.target, edge.qualifier, 0, edge.operation, call=edge.operation == 'C')
+    return [TokenInfo(owner=owner,
+                      object_name=object_name,
+                      object_type=db_type,
+                      line=line.strip(),
+                      line_number=edge.line_number,
+                      file_path=file_info['file_path'],
+                      file_name=file_info['file_name'],
+                      repo_name=file_info['repo_name'],
+                      operation=edge.operation)
+            for owner, db_type, object_name in mapper.catalog_matches(reference)]
+
+
+def map_scripts(file_paths: List[Path], repo_name: str, mapper=None, workers: int = 1,
+                timeout: float = STATEMENT_TIMEOUT) -> Tuple[List[Tuple[str, Edge]], List]:
+    """
+    (file, edge) of every statement of sql scripts and the catalog hits of the edges. With a mapper only the edges
+    to catalog objects are kept, the others being columns, variables and built-in functions.
+    """
+    all_edges, results, methods = [], [], {'classifier': 0, 'parser': 0, 'scanner': 0}
+    for file_path in file_paths:
+        file_info = {'file_path': str(file_path.parent), 'file_name': file_path.name, 'repo_name': repo_name}
+        for statement, edges, method in extract_script(split_chunks(read_chunks(file_path)), workers, timeout):
+            methods[method] += 1
+            lines = statement.text.split('\n') if edges and mapper is not None else []
+            for edge in edges:
+                hits = (map_edge(edge, mapper, lines[edge.line_number - statement.line_number], file_info)
+                        if mapper is not None else None)
+                if mapper is None or hits:
+                    all_edges.append((str(file_path), edge))
+                    results.extend(hits or [])
+    print(f"{len(file_paths)} scripts, {methods['classifier']} statements classified from their tables, "
+          f"{methods['parser']} parsed, {methods['scanner']} scanned"
+          + ('' if parser_available() else ' (antlr/PlSqlParser.py not generated)'), file=sys.stderr)
+    return all_edges, results
+
+
+def write_edges_csv(edges: List[Tuple[str, Edge]], file_path: Path) -> None:
+    with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Source', 'Target', 'Operation', 'Line Number', 'File'])
+        for script, edge in edges:
+            target = f"{edge.qualifier}.{edge.target}" if edge.qualifier else edge.target
+            writer.writerow([edge.source, target, edge.operation, edge.line_number, script])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="PL/SQL Mapper CLI\n\nExtracts the read (R), modify (M) and call (C) edges of the objects "
+                    "created by sql scripts\n(package bodies, procedures, functions, triggers and views).",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--file', type=str, help='Sql script whose edges are printed')
+    parser.add_argument('--map', type=str, help='Root directory whose .sql scripts are mapped')
+    parser.add_argument('--edges', type=str, help='Csv file the edges of --map are written to')
+    parser.add_argument('--output', type=str,
+                        help='Csv file the catalog hits of --map are written to, defaults to <root directory name>.csv')
+    parser.add_argument('--db_objects_csv', type=str, help='Path to the csv file containing the database objects')
+    parser.add_argument('--owners', type=str, help='Owners to be considered, separated by comma')
+    parser.add_argument('--workers', type=int,
+                        help='Processes parsing the statements, defaults to the cpu count when the parser is generated')
+    parser.add_argument('--timeout', type=float, default=STATEMENT_TIMEOUT,
+                        help='Seconds a statement may be parsed for before it is scanned instead, 0 to only scan')
+    args = parser.parse_args()
+
+    worker_count = args.workers or ((os.cpu_count() or 1) if parser_available() else 1)
+    if args.db_objects_csv and not args.owners:
+        parser.error('--db_objects_csv requires --owners')
+    code_db_mapper = None
+    if args.db_objects_csv:
+        from db_code_map import CodeDbMapper
+
+        code_db_mapper = CodeDbMapper(owners=set(args.owners.split(',')))
+        code_db_mapper.load_db_objects_csv(Path(args.db_objects_csv))
+    if args.file:
+        script_path = Path(args.file)
+        script_edges, hits = map_scripts([script_path], script_path.parent.name, code_db_mapper, worker_count,
+                                         args.timeout)
+        for _, script_edge in script_edges:
+            print(f"  {script_edge.line_number}: {script_edge.source or '-'} {script_edge.operation} "
+                  f"{script_edge.qualifier + '.' if script_edge.qualifier else ''}{script_edge.target}")
+        for token_info in hits:
+            print(f"  {token_info.line_number}: {token_info.owner}.{token_info.object_name} {token_info.object_type} "
+                  f"{token_info.operation}")
+        sys.exit(0)
+    if not args.map:
+        parser.print_help()
+        sys.exit(1)
+    root_directory = Path(args.map)
+    # dumps are streamed whatever their size
+    sql_files = [walked_file.path for walked_file in walk(root_directory, {'.sql': 'sql'}, max_size=None)]
+    script_edges, hits = map_scripts(sql_files, root_directory.name, code_db_mapper, worker_count, args.timeout)
+    if args.edges:
+        write_edges_csv(script_edges, Path(args.edges))
+        print(f"{len(script_edges)} edges written to {args.edges}")
+    if code_db_mapper is not None:
+        from db_code_map import write_csv_from_token_info
+
+        output_file = args.output or root_directory.name + '.csv'
+        write_csv_from_token_info(hits, output_file)
+        print(f"{len(hits)} rows written to {output_file}")
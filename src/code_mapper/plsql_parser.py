@@ -0,0 +1,138 @@
+import time
+from functools import lru_cache
+from typing import List, Tuple
+from antlr4 import CommonTokenStream, ParseTreeWalker
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.tree.Tree import ParseTreeListener
+# generated from vendor/antlr/PlSqlParser.g4 by the antlr tool; imported first so that a tree without it fails before
+# the lexer ATN is deserialized
+from antlr.PlSqlParser import PlSqlParser
+from antlr.PlSqlParserListener import PlSqlParserListener
+from antlr.PlSqlLexer import PlSqlLexer
+from plsql_lexer import CaseFoldingStream, load_cache, new_lexer
+from sql_lexer import split_name
+from plsql_mapper import Edge, ScriptStatement, builtin
+
+# the statements whose general_table_ref is the object written to
+MODIFY_CONTEXTS = (PlSqlParser.Update_statementContext, PlSqlParser.Delete_statementContext,
+                   PlSqlParser.Insert_into_clauseContext)
+
+
+def name_parts(text: str) -> Tuple[str, str | None]:
+    """(name, qualifier) of owner.object or package.procedure, as sql_lexer reports them"""
+    parts = split_name(text)
+    return (parts[0], None) if len(parts) == 1 else (parts[1], parts[0])
+
+
+class DeadlineListener(ParseTreeListener):
+    """cancels a parse that is still running past its deadline, checked as every rule is entered"""
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+
+    def enterEveryRule(self, ctx) -> None:
+        if time.perf_counter() > self.deadline:
+            raise ParseCancellationException('deadline')
+
+
+class DependencyListener(PlSqlParserListener):
+    """the read, modify and call edges of a parse tree, from the object each create statement defines"""
+
+    def __init__(self, statement: ScriptStatement) -> None:
+        self.statement = statement
+        self.source = statement.name
+        self.edges: List[Edge] = []
+
+    def add(self, text: str, operation: str, ctx) -> None:
+        name, qualifier = name_parts(text)
+        if operation == 'C' and builtin(name, qualifier):
+            return  # UPPER(x) or SUBSTR(..) are general elements like pkg.fn(x), left out as the token scanner does
+        if (f"{qualifier}.{name}" if qualifier else name) == self.source:
+            return
+        line_number = self.statement.line_number + ctx.start.line - 1
+        self.edges.append(Edge(self.source, name, qualifier, operation, line_number))
+
+    def define(self, text: str) -> None:
+        self.source = '.'.join(split_name(text))
+
+    def enterCreate_package_body(self, ctx: PlSqlParser.Create_package_bodyContext):
+        owner = ctx.schema_object_name()
+        self.define((owner.getText() + '.' if owner else '') + ctx.package_name(0).getText())
+
+    def enterCreate_procedure_body(self, ctx: PlSqlParser.Create_procedure_bodyContext):
+        self.define(ctx.procedure_name().getText())
+
+    def enterCreate_function_body(self, ctx: PlSqlParser.Create_function_bodyContext):
+        self.define(ctx.function_name().getText())
+
+    def enterCreate_trigger(self, ctx: PlSqlParser.Create_triggerContext):
+        self.define(ctx.trigger_name().getText())
+
+    def enterCreate_view(self, ctx: PlSqlParser.Create_viewContext):
+        owner = ctx.schema_name()
+        self.define((owner.getText() + '.' if owner else '') + ctx.v.getText())
+
+    def enterTableview_name(self, ctx: PlSqlParser.Tableview_nameContext):
+        if ctx.identifier() is None:  # xmltable
+            return
+        text = ctx.identifier().getText() + ('.' + ctx.id_expression().getText() if ctx.id_expression() else '')
+        parent = ctx.parentCtx
+        if isinstance(parent, (PlSqlParser.Merge_statementContext, PlSqlParser.Truncate_tableContext)):
+            modified = True
+        else:
+            table_ref = parent.parentCtx if isinstance(parent, PlSqlParser.Dml_table_expression_clauseContext) else None
+            modified = (isinstance(table_ref, PlSqlParser.General_table_refContext)
+                        and isinstance(table_ref.parentCtx, MODIFY_CONTEXTS))
+        self.add(text, 'M' if modified else 'R', ctx)
+
+    def enterCall_statement(self, ctx: PlSqlParser.Call_statementContext):
+        self.add(ctx.routine_name(0).getText(), 'C', ctx)
+
+    def enterGeneral_element(self, ctx: PlSqlParser.General_elementContext):
+        # pkg.fn(x) in an expression: the parts up to the first argument list name the routine
+        parts = ctx.general_element_part()
+        for index, part in enumerate(parts):
+            if part.function_argument() is not None:
+                self.add('.'.join(p.id_expression().getText() for p in parts[:index + 1]), 'C', ctx)
+                return
+
+
+@lru_cache(maxsize=None)
+def recognizers() -> Tuple[PlSqlLexer, PlSqlParser]:
+    """
+    one lexer and parser per process, their ATNs are deserialized once and their DFA caches shared; the lexer DFA
+    starts from the one saved by plsql_lexer.py when there is one
+    """
+    load_cache()
+    lexer = new_lexer()
+    parser = PlSqlParser(CommonTokenStream(lexer))
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    return lexer, parser
+
+
+def parse_edges(statement: ScriptStatement, deadline: float) -> List[Edge] | None:
+    """
+    The edges of a statement from its parse tree, or None when it does not parse or the deadline passes. The fast SLL
+    prediction is tried first and the full LL one only when it fails, as the antlr runtime recommends.
+    """
+    lexer, parser = recognizers()
+    for mode in (PredictionMode.SLL, PredictionMode.LL):
+        lexer.inputStream = CaseFoldingStream(statement.text)
+        lexer.reset()
+        parser.setTokenStream(CommonTokenStream(lexer))
+        parser._interp.predictionMode = mode
+        parser.removeParseListeners()
+        parser.addParseListener(DeadlineListener(deadline))
+        try:
+            tree = parser.sql_script()
+        except ParseCancellationException:
+            if time.perf_counter() > deadline:
+                return None
+            continue
+        listener = DependencyListener(statement)
+        ParseTreeWalker.DEFAULT.walk(listener, tree)
+        return listener.edges
+    return None
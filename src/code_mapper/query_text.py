@@ -0,0 +1,156 @@
+import re
+import textwrap
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, NamedTuple, Tuple
+
+ESCAPES = {'b': '\b', 't': '\t', 'n': '\n', 'f': '\f', 'r': '\r', 's': ' ', '"': '"', "'": "'", '\\': '\\'}
+escape_pattern = re.compile(r'\\(u+[0-9a-fA-F]{4}|[0-3]?[0-7]{1,2}|.)')
+
+# StringBuilder methods that return the builder itself and therefore can be chained: sb.append(a).append(b)
+BUILDER_METHODS = {'append', 'insert'}
+
+
+def _unescape(match: re.Match) -> str:
+    escape = match.group(1)
+    if escape[0] == 'u':
+        return chr(int(escape[-4:], 16))
+    if escape[0].isdigit():
+        return chr(int(escape, 8))
+    return ESCAPES.get(escape, escape)
+
+
+def unquote(literal: str) -> str:
+    """the value of a java string literal token, quotes removed and escape sequences resolved"""
+    if len(literal) >= 6 and literal.startswith('"""') and literal.endswith('"""'):
+        # a text block: the content starts on the line after the quotes and loses its common indentation
+        value = textwrap.dedent(literal[3:-3].partition('\n')[2])
+    else:
+        value = literal[1:-1] if len(literal) >= 2 and literal[0] == literal[-1] == '"' else literal
+    return escape_pattern.sub(_unescape, value) if '\\' in value else value
+
+
+class Part(NamedTuple):
+    """
+    A piece of a concatenation: a string literal token, a name when reference is set, or a method call when call is
+    set, text being the method as written (getSql, this.getSql, sb.toString) and arguments the parts of each argument.
+    """
+    text: str
+    line_number: int
+    reference: bool = False
+    call: bool = False
+    arguments: Tuple[Tuple['Part', ...], ...] = ()
+
+
+def literal_text(part: Part) -> str:
+    """the literals of a part, including the ones passed to a call, which is all that is known without resolving it"""
+    if part.call:
+        return ''.join(literal_text(argument_part) for argument in part.arguments for argument_part in argument)
+    return '' if part.reference else unquote(part.text)
+
+
+@dataclass
+class Segment:
+    text: str
+    line_number: int
+    # the name or call this segment stands for: a name is empty until folded, a call holds its literal arguments
+    reference: Part | None = None
+
+
+@dataclass
+class QueryText:
+    """
+    The text accumulated by a String or StringBuilder, kept as a list of literal segments (a rope) that is joined
+    once, when read. Every segment keeps its source line, so an offset in the joined text maps back to the code.
+    """
+    segments: List[Segment] = field(default_factory=list)
+    _text: str | None = field(default=None, repr=False, compare=False)
+    _offsets: List[int] | None = field(default=None, repr=False, compare=False)
+
+    def append(self, text: str, line_number: int) -> None:
+        if text:
+            self.segments.append(Segment(text, line_number))
+            self._text = self._offsets = None
+
+    def extend(self, parts: Iterable[Part]) -> None:
+        """append the parts of a concatenation, e.g. the argument of an append"""
+        for part in parts:
+            if part.reference or part.call:
+                self.segments.append(Segment(literal_text(part), part.line_number, part))
+                self._text = self._offsets = None
+            else:
+                self.append(unquote(part.text), part.line_number)
+
+    def insert_literals(self, offset: int, parts: List[Part]) -> None:
+        literals = [part for part in parts if not part.reference and not part.call]
+        if literals:
+            self.insert(offset, ''.join(unquote(part.text) for part in literals), literals[0].line_number)
+
+    def insert(self, offset: int, text: str, line_number: int) -> None:
+        """StringBuilder.insert: splits the segment holding offset when it falls inside one"""
+        if not text:
+            return
+        offsets = self.offsets
+        index = bisect_right(offsets, offset)
+        if index and offset == offsets[index - 1]:
+            index -= 1
+        elif index and offset < offsets[index - 1] + len(self.segments[index - 1].text):
+            # the offset falls inside the previous segment, split it around the inserted text
+            segment = self.segments[index - 1]
+            cut = offset - offsets[index - 1]
+            self.segments[index - 1:index] = [Segment(segment.text[:cut], segment.line_number),
+                                              Segment(segment.text[cut:], segment.line_number)]
+        self.segments.insert(index, Segment(text, line_number))
+        self._text = self._offsets = None
+
+    @property
+    def references(self) -> List[Part]:
+        return [segment.reference for segment in self.segments if segment.reference]
+
+    def fold(self, resolve: Callable[[Part], str | None]) -> None:
+        """replace the names and calls with their values; the ones resolve returns None for keep their text"""
+        for segment in self.segments:
+            if segment.reference and (value := resolve(segment.reference)) is not None:
+                segment.text = value
+        self._text = self._offsets = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = ''.join(segment.text for segment in self.segments)
+        return self._text
+
+    @property
+    def offsets(self) -> List[int]:
+        """the offset of every segment in the joined text"""
+        if self._offsets is None:
+            self._offsets, offset = [], 0
+            for segment in self.segments:
+                self._offsets.append(offset)
+                offset += len(segment.text)
+        return self._offsets
+
+    def line_map(self) -> List[Tuple[int, int]]:
+        """(offset in the joined text, source line) of every segment"""
+        return [(offset, segment.line_number) for offset, segment in zip(self.offsets, self.segments)]
+
+    def segment_at(self, offset: int) -> Segment | None:
+        if not self.segments:
+            return None
+        return self.segments[max(bisect_right(self.offsets, offset) - 1, 0)]
+
+    def segment_offset(self, offset: int) -> int:
+        """the offset in its segment of an offset in the joined text"""
+        if not self.segments:
+            return offset
+        return offset - self.offsets[max(bisect_right(self.offsets, offset) - 1, 0)]
+
+    def line_at(self, offset: int) -> int | None:
+        segment = self.segment_at(offset)
+        return segment.line_number if segment else None
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __str__(self) -> str:
+        return self.text
@@ -0,0 +1,197 @@
+import re
+from enum import Enum
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Tuple
+
+# the subject of a derived query: the operation, an optional Distinct/First10/Top/All... and the By that ends it
+subject_pattern = re.compile(
+    r'^(find|read|get|query|search|stream|count|exists|delete|remove)([A-Z]\w*?)??By(?=[A-Z]|$)')
+limit_pattern = re.compile(r'(First|Top)(\d*)')
+or_pattern = re.compile(r'Or(?=[A-Z])')
+and_pattern = re.compile(r'And(?=[A-Z])')
+order_by_pattern = re.compile(r'OrderBy(?=[A-Z])')
+order_pattern = re.compile(r'(?:(?<=Asc)|(?<=Desc))(?=[A-Z])')
+camel_hump_pattern = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+
+# the predicate keywords of Spring Data, the first of each group being the canonical name
+KEYWORDS = [
+    ['Between', 'IsBetween'], ['IsNotNull', 'NotNull'], ['IsNull', 'Null'], ['LessThan', 'IsLessThan'],
+    ['LessThanEqual', 'IsLessThanEqual'], ['GreaterThan', 'IsGreaterThan'],
+    ['GreaterThanEqual', 'IsGreaterThanEqual'], ['Before', 'IsBefore'], ['After', 'IsAfter'],
+    ['NotLike', 'IsNotLike'], ['Like', 'IsLike'], ['StartingWith', 'IsStartingWith', 'StartsWith'],
+    ['EndingWith', 'IsEndingWith', 'EndsWith'], ['IsNotEmpty', 'NotEmpty'], ['IsEmpty', 'Empty'],
+    ['NotContaining', 'IsNotContaining', 'NotContains'], ['Containing', 'IsContaining', 'Contains'],
+    ['NotIn', 'IsNotIn'], ['In', 'IsIn'], ['Near', 'IsNear'], ['Within', 'IsWithin'],
+    ['Regex', 'MatchesRegex', 'Matches'], ['True', 'IsTrue'], ['False', 'IsFalse'], ['Not', 'IsNot'],
+    ['Equals', 'Is'],
+]
+IGNORE_CASE = ('IgnoreCase', 'IgnoringCase')
+ALL_IGNORE_CASE = ('AllIgnoreCase', 'AllIgnoringCase')
+
+
+class DerivedQueryType(Enum):
+    FIND = "find"
+    COUNT = "count"
+    EXISTS = "exists"
+    DELETE = "delete"
+
+    @property
+    def operation(self) -> str:
+        """the operation letter db_code_map uses: R(ead) or M(odify)"""
+        return 'M' if self == DerivedQueryType.DELETE else 'R'
+
+
+SUBJECT_TYPES = {'find': DerivedQueryType.FIND, 'read': DerivedQueryType.FIND, 'get': DerivedQueryType.FIND,
+                 'query': DerivedQueryType.FIND, 'search': DerivedQueryType.FIND, 'stream': DerivedQueryType.FIND,
+                 'count': DerivedQueryType.COUNT, 'exists': DerivedQueryType.EXISTS,
+                 'delete': DerivedQueryType.DELETE, 'remove': DerivedQueryType.DELETE}
+
+
+def keyword_trie() -> dict:
+    """the keywords spelled backwards, so that the keyword ending a predicate is found reading it from its end"""
+    trie = {}
+    for group in KEYWORDS:
+        for keyword in group:
+            node = trie
+            for char in reversed(keyword):
+                node = node.setdefault(char, {})
+            node[''] = group[0]
+    return trie
+
+
+KEYWORD_TRIE = keyword_trie()
+
+
+def split_keyword(predicate: str) -> Tuple[str, str]:
+    """(property, canonical keyword) of a predicate such as AgeGreaterThan, the longest keyword leaving a property"""
+    node, keyword, cut = KEYWORD_TRIE, 'Equals', len(predicate)
+    for position in range(len(predicate) - 1, 0, -1):
+        node = node.get(predicate[position])
+        if node is None:
+            break
+        if '' in node and predicate[position].isupper():
+            keyword, cut = node[''], position
+    return predicate[:cut], keyword
+
+
+def uncapitalize(name: str) -> str:
+    return name[:1].lower() + name[1:]
+
+
+def resolve_property(name: str, properties: Collection[str] | None = None) -> str | None:
+    """
+    The property path a capitalized name stands for: LastName is lastName and, when the entity has an address
+    property, AddressZipCode is address.zipCode (an underscore forces the split). None when properties are known and
+    none of them matches.
+    """
+    if '_' in name:
+        head, _, tail = name.partition('_')
+        return f"{uncapitalize(head)}.{uncapitalize(tail.replace('_', '.'))}" \
+            if properties is None or uncapitalize(head) in properties else None
+    if properties is None or uncapitalize(name) in properties:
+        return uncapitalize(name)
+    humps = [match.start() for match in camel_hump_pattern.finditer(name)]
+    for position in reversed(humps):
+        if (head := uncapitalize(name[:position])) in properties:
+            return f"{head}.{uncapitalize(name[position:])}"
+    return None
+
+
+@dataclass(frozen=True)
+class Predicate:
+    property: str  # as written in the method name, capitalized
+    keyword: str = 'Equals'
+    ignore_case: bool = False
+
+
+@dataclass(frozen=True)
+class DerivedQuery:
+    name: str
+    type: DerivedQueryType
+    distinct: bool = False
+    limit: int | None = None
+    # OR of ANDs, e.g. findByAAndBOrC is ((A, B), (C,))
+    predicates: Tuple[Tuple[Predicate, ...], ...] = ()
+    order_by: Tuple[Tuple[str, str], ...] = ()  # (property, Asc|Desc)
+
+    @property
+    def operation(self) -> str:
+        return self.type.operation
+
+    @property
+    def properties(self) -> List[str]:
+        """every property the query reads, predicates first, in order and without repetitions"""
+        names = [predicate.property for conjunction in self.predicates for predicate in conjunction]
+        names += [name for name, _ in self.order_by]
+        return list(dict.fromkeys(names))
+
+    def property_paths(self, properties: Collection[str] | None = None) -> Dict[str, str | None]:
+        """the entity property path of every property, None for the ones the entity does not have"""
+        return {name: resolve_property(name, properties) for name in self.properties}
+
+
+@lru_cache(maxsize=4096)
+def parse_method_name(name: str) -> DerivedQuery | None:
+    """
+    Decode a Spring Data derived query method name (findDistinctTop3ByLastNameAndAgeGreaterThanOrderByAgeDesc), None
+    when the name does not follow the convention. Each step is a single pass over the name.
+    """
+    match = subject_pattern.match(name)
+    if not match:
+        return None
+    subject = match.group(2) or ''
+    limit_match = limit_pattern.search(subject)
+    query_type = SUBJECT_TYPES[match.group(1)]
+    body = name[match.end():]
+
+    order_by = ()
+    parts = order_by_pattern.split(body, maxsplit=1)
+    if len(parts) == 2:
+        body = parts[0]
+        orders = []
+        for order in order_pattern.split(parts[1]):
+            direction = 'Desc' if order.endswith('Desc') else 'Asc'
+            orders.append((order.removesuffix(direction), direction))
+        order_by = tuple(orders)
+
+    all_ignore_case = body.endswith(ALL_IGNORE_CASE)
+    if all_ignore_case:
+        body = body[:body.rfind('All')]
+    predicates = []
+    for disjunct in or_pattern.split(body) if body else ():
+        conjunction = []
+        for predicate in and_pattern.split(disjunct):
+            ignore_case = all_ignore_case or predicate.endswith(IGNORE_CASE)
+            if predicate.endswith(IGNORE_CASE):
+                predicate = predicate[:predicate.rfind('Ignor')]
+            property_name, keyword = split_keyword(predicate)
+            if not property_name:
+                return None
+            conjunction.append(Predicate(property_name, keyword, ignore_case))
+        predicates.append(tuple(conjunction))
+    return DerivedQuery(name=name, type=query_type, distinct='Distinct' in subject,
+                        limit=(int(limit_match.group(2) or 1) if limit_match else None),
+                        predicates=tuple(predicates), order_by=order_by)
+
+
+@dataclass
+class RepositoryQueries:
+    """the derived queries of each repository interface, decoded once per interface and kept by its qualified name"""
+    interfaces: Dict[str, Dict[str, DerivedQuery]] = field(default_factory=dict)
+
+    def methods(self, qualified_name: str, method_names: Collection[str]) -> Dict[str, DerivedQuery]:
+        if qualified_name not in self.interfaces:
+            self.interfaces[qualified_name] = {name: query for name in method_names
+                                               if (query := parse_method_name(name)) is not None}
+        return self.interfaces[qualified_name]
+
+    def invalidate(self, qualified_name: str) -> None:
+        self.interfaces.pop(qualified_name, None)
+
+
+if __name__ == '__main__':
+    import sys
+
+    for method_name in sys.argv[1:]:
+        print(f"{method_name}: {parse_method_name(method_name)}")
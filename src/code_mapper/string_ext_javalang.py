@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 from pathlib import Path
+from query_text import Part, QueryText
 import javalang
 
 
@@ -9,6 +10,7 @@ class StringBuilderInfo:
     variable_name: str
     content: str
     line_number: int
+    query: QueryText = field(default_factory=QueryText)
 
 
 @dataclass
@@ -16,6 +18,7 @@ class StringAssignmentInfo:
     variable_name: str
     content: str
     line_number: int
+    query: QueryText = field(default_factory=QueryText)
 
 
 @dataclass
@@ -56,6 +59,35 @@ def pretty_print_java_info(java_info: JavaFileInfo):
         print()
 
 
+def string_literals(node, line_number: int) -> List[Part]:
+    """the string literals of an expression; literals without a position take the line of the statement"""
+    if node is None:
+        return []
+    return [Part(literal.value, literal.position.line if literal.position else line_number)
+            for _, literal in node.filter(javalang.tree.Literal) if literal.value.startswith('"')]
+
+
+def builder_calls(invocation: javalang.tree.MethodInvocation) -> List[javalang.tree.MethodInvocation]:
+    """the invocation and the calls chained on the builder it returns: sb.append(a).append(b)"""
+    calls = [invocation]
+    for selector in invocation.selectors or []:
+        if not isinstance(selector, javalang.tree.MethodInvocation) or calls[-1].member not in ('append', 'insert'):
+            break
+        calls.append(selector)
+    return calls
+
+
+def latest_declaration(declared: List[StringBuilderInfo | StringAssignmentInfo], variable_name: str,
+                       position) -> StringBuilderInfo | StringAssignmentInfo | None:
+    """the last declaration of variable_name before position, javalang gives no block scopes to follow"""
+    found = None
+    for info in declared:
+        if info.variable_name == variable_name and (position is None or info.line_number <= position.line):
+            if found is None or info.line_number >= found.line_number:
+                found = info
+    return found
+
+
 def parse_java_file(code: str) -> JavaFileInfo:
     tree = javalang.parse.parse(code)
 
@@ -80,25 +112,41 @@ def parse_java_file(code: str) -> JavaFileInfo:
                         variable_name = declarator.name
                         string_content = ""
                         sb_info = StringBuilderInfo(variable_name, string_content, line_number)
+                        sb_info.query.extend(string_literals(declarator.initializer, line_number))
                         scope_string_builders.append(sb_info)
 
                 elif 'String' in statement.type.name:
                     for declarator in statement.declarators:
                         variable_name = declarator.name
                         if declarator.initializer:
-                            content = ""
-                            for _, part in declarator.initializer.filter(javalang.tree.Literal):
-                                content += part.value.replace('"', '')
-                            string_assignments.append(StringAssignmentInfo(variable_name, content, line_number))
-
-            for p, expr in method_decl.filter(javalang.tree.MethodInvocation):
-                line_number = expr._position.line
-
-                for sb_info in scope_string_builders:
-                    if expr.qualifier == sb_info.variable_name and expr.member == 'append':
-                        first_argument = expr.arguments[0]
-                        if isinstance(first_argument, javalang.tree.Literal):
-                            sb_info.content += first_argument.value.replace('"', '')
+                            sa_info = StringAssignmentInfo(variable_name, "", line_number)
+                            sa_info.query.extend(string_literals(declarator.initializer, line_number))
+                            string_assignments.append(sa_info)
+
+            # a single pass over the method body keeps the appends, inserts and += in source order
+            declared = scope_string_builders + string_assignments
+            for _, node in method_decl:
+                if isinstance(node, javalang.tree.MethodInvocation) and node.qualifier:
+                    info = latest_declaration(declared, node.qualifier, node.position)
+                    if info is None:
+                        continue
+                    for call in builder_calls(node):
+                        call_line = call.position.line if call.position else info.line_number
+                        if call.member == 'append' and call.arguments:
+                            info.query.extend(string_literals(call.arguments[0], call_line))
+                        elif call.member == 'insert' and len(call.arguments) == 2 and \
+                                isinstance(call.arguments[0], javalang.tree.Literal) and \
+                                call.arguments[0].value.isdigit():
+                            info.query.insert_literals(int(call.arguments[0].value),
+                                                       string_literals(call.arguments[1], call_line))
+                elif isinstance(node, javalang.tree.Assignment) and node.type == '+=' and \
+                        isinstance(node.expressionl, javalang.tree.MemberReference):
+                    info = latest_declaration(declared, node.expressionl.member, node.expressionl.position)
+                    if info is not None:
+                        info.query.extend(string_literals(node.value, info.line_number))
+
+            for info in declared:
+                info.content = info.query.text
 
             # Only include the method if it contains String or StringBuilder instances
             if scope_string_builders or string_assignments:
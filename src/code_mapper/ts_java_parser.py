@@ -0,0 +1,412 @@
+from tree_sitter import Node
+from ts_languages import get_parser
+from ts_query_registry import registry
+from java_code_parser_metadata import *
+from db_obj_list_modules import instrumentation
+from pathlib import Path
+from typing import List
+import time
+
+SOURCE_ENCODING = 'utf-8'
+FALLBACK_ENCODING = 'windows-1252'
+
+# nodes whose text must be kept verbatim, the equivalent of a single ANTLR token
+ATOMIC_NODES = {'string_literal', 'character_literal', 'text_block'}
+COMMENT_NODES = {'line_comment', 'block_comment', 'comment'}
+ANNOTATION_NODES = {'annotation', 'marker_annotation'}
+
+
+def node_text(node: Node) -> str:
+    return node.text.decode(SOURCE_ENCODING)
+
+
+def compact_text(node: Node | None) -> str:
+    """
+    The text of a node without whitespace and comments between its tokens, which is what ANTLR's getText() returns.
+    Keeping the same representation lets both backends feed the same downstream matchers.
+    """
+    if node is None:
+        return ''
+    if node.child_count == 0 or node.type in ATOMIC_NODES:
+        return '' if node.type in COMMENT_NODES else node_text(node)
+    return ''.join(compact_text(child) for child in node.children)
+
+
+def line_of(node: Node) -> int:
+    return node.start_point[0] + 1
+
+
+def string_literals(node: Node | None) -> List[Part]:
+    """the string literals under a node, with their line numbers, in source order"""
+    if node is None:
+        return []
+    return [Part(capture.text, capture.line_number) for capture in registry.captures('java_strings', node)]
+
+
+def is_name(node: Node) -> bool:
+    """a simple or qualified name (SQL, Queries.SQL), which may refer to a constant"""
+    if node.type == 'identifier':
+        return True
+    return node.type == 'field_access' and is_name(node.child_by_field_name('object'))
+
+
+def call_arguments(node: Node) -> List[Node]:
+    return node.child_by_field_name('arguments').named_children
+
+
+def parameter_names(node: Node) -> List[str]:
+    parameters = node.child_by_field_name('parameters')
+    return [compact_text(parameter.child_by_field_name('name') or
+                         first_child_of_type(parameter, 'variable_declarator').child_by_field_name('name'))
+            for parameter in parameters.named_children if parameter.type in ('formal_parameter', 'spread_parameter')]
+
+
+def string_parts(node: Node | None) -> List[Part]:
+    """the literals, names and calls concatenated by an expression, e.g. "SELECT " + Queries.FROM_PRODUTO"""
+    if node is None:
+        return []
+    if node.type == 'binary_expression' and node.child_by_field_name('operator').type == '+':
+        return string_parts(node.child_by_field_name('left')) + string_parts(node.child_by_field_name('right'))
+    if is_name(node):
+        return [Part(compact_text(node), line_of(node), reference=True)]
+    if node.type == 'parenthesized_expression':
+        return string_parts(node.named_children[0])
+    if node.type == 'method_invocation':
+        object_node = node.child_by_field_name('object')
+        if object_node is not None and object_node.type == 'method_invocation' and \
+                compact_text(node.child_by_field_name('name')) == 'toString':
+            return string_parts(object_node)  # getSql().toString() is the value of the builder getSql returns
+        receiver = f"{compact_text(object_node)}." if object_node else ''
+        return [Part(receiver + compact_text(node.child_by_field_name('name')), line_of(node), call=True,
+                     arguments=tuple(tuple(string_parts(argument)) for argument in call_arguments(node)))]
+    return string_literals(node)
+
+
+def first_child_of_type(node: Node, *types: str) -> Node | None:
+    for child in node.children:
+        if child.type in types:
+            return child
+    return None
+
+
+class TreeSitterJavaVisitor:
+    """
+    Walks a tree-sitter Java tree and fills the same metadata model as the ANTLR JavaParseTreeVisitor.
+    Methods are dispatched by node type (visit_<node type>); unknown nodes just visit their children.
+    """
+
+    def __init__(self):
+        self.current_package = None
+        self.imports = []
+        self.reference_types = []
+        self.type_stack = []
+        self.current_type = None
+        self.current_method = None
+        self.global_scope = Scope()  # the global scope of the file
+        self.current_scope = self.global_scope  # the current scope.
+
+    def visit(self, node: Node) -> None:
+        visitor = getattr(self, f'visit_{node.type}', None)
+        if visitor:
+            visitor(node)
+        else:
+            self.visit_children(node)
+
+    def visit_children(self, node: Node) -> None:
+        for child in node.named_children:
+            self.visit(child)
+
+    def visit_program(self, node: Node) -> None:
+        for capture in registry.captures('package_imports', node):
+            if capture.name == 'package':
+                self.current_package = capture.text
+            else:
+                self.imports.append(capture.text)
+        self.visit_children(node)
+
+    def visit_package_declaration(self, node: Node) -> None:
+        pass  # handled by the package/imports query in visit_program
+
+    def visit_import_declaration(self, node: Node) -> None:
+        pass  # handled by the package/imports query in visit_program
+
+    def get_annotation_info(self, node: Node) -> AnnotationInfo:
+        name = compact_text(node.child_by_field_name('name'))
+        parameters = {}
+        if arguments := node.child_by_field_name('arguments'):
+            for argument in arguments.named_children:
+                if argument.type in COMMENT_NODES:
+                    continue
+                if argument.type == 'element_value_pair':
+                    parameters[compact_text(argument.child_by_field_name('key'))] = \
+                        compact_text(argument.child_by_field_name('value'))
+                else:
+                    parameters[name] = compact_text(argument)
+        return AnnotationInfo(name=name, line_number=line_of(node), parameters=parameters)
+
+    def get_annotations(self, node: Node) -> List[AnnotationInfo]:
+        if modifiers := first_child_of_type(node, 'modifiers'):
+            return [self.get_annotation_info(child) for child in modifiers.children if child.type in ANNOTATION_NODES]
+        return []
+
+    def get_inheritance_info(self, type_node: Node) -> InheritanceInfo:
+        if type_node.type == 'generic_type':
+            name = compact_text(first_child_of_type(type_node, 'type_identifier', 'scoped_type_identifier'))
+            type_arguments = first_child_of_type(type_node, 'type_arguments')
+            generic_parameters = [compact_text(argument) for argument in type_arguments.named_children]
+            return InheritanceInfo(name, generic_parameters)
+        return InheritanceInfo(compact_text(type_node), [])
+
+    def get_reference_type_info(self, node: Node, type: ReferenceType) -> ReferenceTypeInfo:
+        extends = []
+        implements = []
+        if superclass := node.child_by_field_name('superclass'):
+            extends = [self.get_inheritance_info(type_node) for type_node in superclass.named_children]
+        if extends_interfaces := first_child_of_type(node, 'extends_interfaces'):
+            extends = [self.get_inheritance_info(type_node)
+                       for type_node in first_child_of_type(extends_interfaces, 'type_list').named_children]
+        if interfaces := node.child_by_field_name('interfaces'):
+            implements = [compact_text(type_node)
+                          for type_node in first_child_of_type(interfaces, 'type_list').named_children]
+
+        # ANTLR reports the line of the class/interface keyword, after the modifiers
+        keyword = first_child_of_type(node, 'class', 'interface', 'enum', 'record')
+        return ReferenceTypeInfo(
+            name=compact_text(node.child_by_field_name('name')),
+            line_number=line_of(keyword or node),
+            type=type,
+            annotations=self.get_annotations(node),
+            extends=extends,
+            implements=implements,
+            methods=[]
+        )
+
+    def process_type_declaration(self, node: Node, type: ReferenceType) -> None:
+        self.type_stack.append(self.current_type)
+        self.current_type = self.get_reference_type_info(node, type)
+        self.reference_types.append(self.current_type)
+        self.visit_children(node)
+        self.current_type = self.type_stack.pop()
+
+    def visit_class_declaration(self, node: Node) -> None:
+        self.process_type_declaration(node, ReferenceType.CLASS)
+
+    def visit_interface_declaration(self, node: Node) -> None:
+        self.process_type_declaration(node, ReferenceType.INTERFACE)
+
+    def visit_enum_declaration(self, node: Node) -> None:
+        # the fields and methods of an enum are its own, not those of an enclosing class (or of no type at all)
+        self.process_type_declaration(node, ReferenceType.ENUM)
+
+    def visit_record_declaration(self, node: Node) -> None:
+        self.process_type_declaration(node, ReferenceType.RECORD)
+
+    def visit_field_declaration(self, node: Node) -> None:
+        # one field per declarator of `String A = "..", B = "..";`
+        type_node = node.child_by_field_name('type')
+        annotations = self.get_annotations(node)
+        for declarator in node.children_by_field_name('declarator'):
+            value = declarator.child_by_field_name('value')
+            self.current_type.fields.append(FieldInfo(
+                name=compact_text(declarator.child_by_field_name('name')),
+                line_number=line_of(type_node),
+                type=compact_text(type_node),
+                value=compact_text(value) if value else None,
+                annotations=annotations
+            ))
+        self.visit_children(node)
+
+    def visit_constant_declaration(self, node: Node) -> None:
+        # interface constants, recorded as fields like the ones of classes
+        self.visit_field_declaration(node)
+
+    def process_method_declaration(self, node: Node, is_constructor: bool) -> None:
+        type_node = node.child_by_field_name('type')
+        name_node = node.child_by_field_name('name')
+        method_info = MethodInfo(
+            name=compact_text(name_node),
+            line_number=line_of(name_node if is_constructor else type_node),
+            return_type='' if is_constructor else compact_text(type_node),
+            annotations=self.get_annotations(node),
+            parameters=parameter_names(node)
+        )
+        body = node.child_by_field_name('body')
+        if body is None or self.current_type.type == ReferenceType.INTERFACE:
+            # interface methods keep the default (empty) scope, as in the ANTLR visitor
+            self.current_type.methods.append(method_info)
+            return
+
+        enclosing_method, self.current_method = self.current_method, method_info
+        self.visit_children(node)
+        self.current_method = enclosing_method
+        method_info.scope = self.current_scope.children[-1]
+        # prune empty scopes
+        if method_info.scope.is_empty():
+            method_info.scope = None
+        self.current_type.methods.append(method_info)
+
+    def visit_method_declaration(self, node: Node) -> None:
+        self.process_method_declaration(node, False)
+
+    def visit_constructor_declaration(self, node: Node) -> None:
+        self.process_method_declaration(node, True)
+
+    def visit_block(self, node: Node) -> None:
+        # Create a new scope with the current one as its parent
+        new_scope = Scope(parent=self.current_scope)
+        self.current_scope.children.append(new_scope)
+        self.current_scope = new_scope
+        self.visit_children(node)
+        self.current_scope = self.current_scope.parent
+
+    def visit_constructor_body(self, node: Node) -> None:
+        self.visit_block(node)
+
+    def visit_local_variable_declaration(self, node: Node) -> None:
+        type_text = compact_text(node.child_by_field_name('type'))
+        if ObjectType.type_of_interest(type_text):
+            obj_type = ObjectType(type_text)
+            for declarator in node.children_by_field_name('declarator'):
+                obj_name = compact_text(declarator.child_by_field_name('name'))
+                value = declarator.child_by_field_name('value')
+                expression = ExpressionInfo(
+                    name=obj_name,
+                    line_number=line_of(declarator),
+                    type=obj_type,
+                    expression_type=ExpressionType.OBJECT_CREATION,
+                    content=compact_text(value) if obj_type == ObjectType.STRING else '',
+                    query=QueryText()
+                )
+                expression.query.extend(string_parts(value))
+                self.current_scope.declare(expression)
+        self.visit_children(node)
+
+    def visit_assignment_expression(self, node: Node) -> None:
+        right = node.child_by_field_name('right')
+        if right.type == 'object_creation_expression':
+            # the code is reusing a variable to create a new object
+            obj_type_name = compact_text(right.child_by_field_name('type'))
+            if ObjectType.type_of_interest(obj_type_name):
+                obj_name = compact_text(node.child_by_field_name('left'))
+                expression = ExpressionInfo(
+                    name=obj_name,
+                    line_number=line_of(node),
+                    type=ObjectType(obj_type_name),
+                    expression_type=ExpressionType.OBJECT_CREATION,
+                    content='',
+                    query=QueryText()
+                )
+                expression.query.extend(string_parts(right))
+                self.current_scope.declare(expression)
+        elif node.child_by_field_name('operator').type == '+=':
+            # sql += "..." keeps building the text of a string of interest
+            expression = self.current_scope.lookup(compact_text(node.child_by_field_name('left')))
+            if expression and expression.query is not None:
+                expression.query.extend(string_parts(right))
+        self.visit_children(node)
+
+    def record_call(self, expression: ExpressionInfo, node: Node) -> None:
+        method_name = compact_text(node.child_by_field_name('name'))
+        arguments_node = node.child_by_field_name('arguments')
+        expression.method_calls.append(ExpressionInfo(
+            name=method_name,
+            line_number=line_of(node.child_by_field_name('name')),
+            type=expression.type,
+            expression_type=ExpressionType.METHOD_CALL,
+            content=compact_text(arguments_node)
+        ))
+        if expression.query is None:
+            return
+        arguments = arguments_node.named_children
+        match method_name:
+            case 'append' if arguments:
+                expression.query.extend(string_parts(arguments[0]))
+            case 'insert' if len(arguments) == 2 and compact_text(arguments[0]).isdigit():
+                expression.query.insert_literals(int(compact_text(arguments[0])), string_literals(arguments[1]))
+
+    @staticmethod
+    def chained_call(node: Node) -> Node | None:
+        """the call made on the value returned by node, as the second append of sb.append(a).append(b)"""
+        outer = node.parent
+        if outer is not None and outer.type == 'method_invocation' and outer.child_by_field_name('object') == node:
+            return outer
+        return None
+
+    def visit_return_statement(self, node: Node) -> None:
+        expressions = [child for child in node.named_children if child.type not in COMMENT_NODES]
+        if expressions and self.current_method:
+            self.current_method.returns.append(string_parts(expressions[0]))
+        self.visit_children(node)
+
+    def visit_method_invocation(self, node: Node) -> None:
+        method_name = compact_text(node.child_by_field_name('name'))
+        object_node = node.child_by_field_name('object')
+        # the receiver comes first, so that calls are recorded in the order the ANTLR visitor meets them
+        if object_node is not None:
+            self.visit(object_node)
+        # super.method() is not a method call for the ANTLR grammar, leaving it out keeps both backends equal
+        if self.current_method and (object_node is None or object_node.type != 'super'):
+            self.current_method.calls.append(CallInfo(
+                name=method_name,
+                receiver=compact_text(object_node) if object_node else None,
+                line_number=line_of(node.child_by_field_name('name')),
+                arguments=[string_parts(argument) for argument in call_arguments(node)]
+            ))
+        if is_method_of_interest(method_name) and object_node is not None:
+            # check if the object name is within the scope
+            expression = self.current_scope.lookup(compact_text(object_node))
+            call_node = node
+            while expression and call_node:
+                call_name = compact_text(call_node.child_by_field_name('name'))
+                if not is_method_of_interest(call_name):
+                    break
+                self.record_call(expression, call_node)
+                if call_name not in BUILDER_METHODS:
+                    break
+                # the builder methods return the builder, the outer calls of a chain act on the same object
+                call_node = self.chained_call(call_node)
+        for child in node.named_children:
+            # comparing a tree-sitter node with None is always False, hence the explicit check
+            if object_node is None or child != object_node:
+                self.visit(child)
+
+
+def read_source(file_path: Path) -> bytes:
+    """read a source file and re-encode it as utf-8, which is what the tree-sitter node offsets refer to"""
+    raw = file_path.read_bytes()
+    try:
+        raw.decode(SOURCE_ENCODING)
+        return raw
+    except UnicodeDecodeError:
+        return raw.decode(FALLBACK_ENCODING).encode(SOURCE_ENCODING)
+
+
+def parse_java_source(source: bytes, file_path: Path | None = None) -> JavaFileInfo:
+    with instrumentation.phase('treesitter_parse'):
+        tree = get_parser('java').parse(source)
+    visitor = TreeSitterJavaVisitor()
+    with instrumentation.phase('treesitter_visit'):
+        visitor.visit(tree.root_node)
+
+    return JavaFileInfo(
+        file_path=str(file_path.parent) if file_path else None,
+        file_name=file_path.name if file_path else None,
+        package_name=visitor.current_package,
+        imports=visitor.imports,
+        reference_types=visitor.reference_types
+    )
+
+
+def parse_java_file(file_path: Path) -> JavaFileInfo:
+    start = time.perf_counter()
+    with instrumentation.phase('decode'):
+        source = read_source(file_path)
+    java_file_info = parse_java_source(source, file_path)
+    if instrumentation.enabled:
+        instrumentation.record_file(file_path, 'java', len(source), time.perf_counter() - start)
+    return java_file_info
+
+
+if __name__ == '__main__':
+    path = Path(r'../../examples/FaturaDAO.java')
+    parse_java_file(path).print_human_readable()
@@ -0,0 +1,38 @@
+from functools import cache
+from pathlib import Path
+from tree_sitter import Language, Parser
+
+VENDOR_DIR = Path(__file__).resolve().parents[2] / 'vendor'
+LANGUAGE_LIBRARY = VENDOR_DIR / 'build' / 'my-languages.so'
+LANGUAGE_REPOSITORIES = {
+    'java': VENDOR_DIR / 'tree-sitter' / 'tree-sitter-java',
+    'javascript': VENDOR_DIR / 'tree-sitter' / 'tree-sitter-javascript',
+    'php': VENDOR_DIR / 'tree-sitter' / 'tree-sitter-php',
+}
+
+
+@cache
+def build_language_library(library_path: Path = LANGUAGE_LIBRARY) -> Path:
+    """
+    Compile the vendored grammars into a single shared library. The library is built only when it does not exist yet,
+    so the C compiler runs once per checkout instead of once per process.
+    """
+    if not library_path.exists():
+        library_path.parent.mkdir(parents=True, exist_ok=True)
+        Language.build_library(str(library_path), [str(repo) for repo in LANGUAGE_REPOSITORIES.values()])
+    return library_path
+
+
+@cache
+def get_language(name: str) -> Language:
+    if name not in LANGUAGE_REPOSITORIES:
+        raise ValueError(f"Unsupported tree-sitter language: {name}")
+    return Language(str(build_language_library()), name)
+
+
+def get_parser(name: str) -> Parser:
+    # parsers keep state between parse calls, so every caller gets its own instance
+    parser = Parser()
+    parser.set_language(get_language(name))
+    return parser
+
@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+from tree_sitter import Node, Query
+from ts_languages import get_language
+
+QUERIES_DIR = Path(__file__).resolve().parents[2] / 'treesitter_queries'
+QUERY_SUFFIX = '.tsq'
+SOURCE_ENCODING = 'utf-8'
+
+
+class Capture(NamedTuple):
+    name: str
+    node: Node
+
+    @property
+    def text(self) -> str:
+        return self.node.text.decode(SOURCE_ENCODING)
+
+    @property
+    def line_number(self) -> int:
+        return self.node.start_point[0] + 1
+
+
+class QueryRegistry:
+    """
+    Named tree-sitter queries loaded from the .tsq files of a directory. The files are read once, the first time any
+    query is requested, and each query is compiled lazily the first time it is used with a given language, so the
+    compile cost is paid once per process.
+    """
+
+    def __init__(self, queries_dir: Path = QUERIES_DIR) -> None:
+        self.queries_dir = queries_dir
+        self._sources: Dict[str, str] | None = None
+        self._compiled: Dict[Tuple[str, str], Query] = {}
+
+    @property
+    def sources(self) -> Dict[str, str]:
+        if self._sources is None:
+            self._sources = {path.stem: path.read_text(encoding=SOURCE_ENCODING)
+                             for path in sorted(self.queries_dir.glob(f'*{QUERY_SUFFIX}'))}
+        return self._sources
+
+    def names(self) -> List[str]:
+        return list(self.sources)
+
+    def get(self, query_name: str, language: str = 'java') -> Query:
+        key = (query_name, language)
+        if key not in self._compiled:
+            try:
+                source = self.sources[query_name]
+            except KeyError:
+                raise KeyError(f"No query named {query_name} in {self.queries_dir}")
+            self._compiled[key] = get_language(language).query(source)
+        return self._compiled[key]
+
+    def captures(self, query_name: str, node: Node, language: str = 'java', **query_range) -> List[Capture]:
+        """
+        All captures of the query in document order. query_range accepts the start_point/end_point and
+        start_byte/end_byte keywords of Query.captures to restrict the search to part of the tree.
+        Captures whose name starts with an underscore are only used by predicates and are left out.
+        """
+        return [Capture(name, capture_node)
+                for capture_node, name in self.get(query_name, language).captures(node, **query_range)
+                if not name.startswith('_')]
+
+    def captures_by_name(self, query_name: str, node: Node, language: str = 'java',
+                         **query_range) -> Dict[str, List[Capture]]:
+        grouped: Dict[str, List[Capture]] = {}
+        for capture in self.captures(query_name, node, language, **query_range):
+            grouped.setdefault(capture.name, []).append(capture)
+        return grouped
+
+    def matches(self, query_name: str, node: Node, language: str = 'java',
+                **query_range) -> List[Dict[str, Capture | List[Capture]]]:
+        """one dictionary of captures per match, keyed by capture name; quantified captures come as lists"""
+        results = []
+        for _, match in self.get(query_name, language).matches(node, **query_range):
+            results.append({name: [Capture(name, n) for n in nodes] if isinstance(nodes, list) else Capture(name, nodes)
+                            for name, nodes in match.items() if not name.startswith('_')})
+        return results
+
+
+registry = QueryRegistry()
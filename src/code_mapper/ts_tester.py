@@ -1,22 +1,11 @@
 from tree_sitter import Language, Parser
+from ts_languages import get_language
+from ts_query_registry import registry
 from pathlib import Path
 
-Language.build_library(
-    # Store the library in the `build` directory
-    str(Path('../../vendor/build/my-languages.so')),
-    # '../../vendor/build/my-languages.so',
-
-    # Include one or more languages
-    [
-        str(Path('../../vendor/tree-sitter/tree-sitter-java')),
-        str(Path('../../vendor/tree-sitter/tree-sitter-javascript')),
-        str(Path('../../vendor/tree-sitter/tree-sitter-php'))
-    ]
-)
-
-JV_LANGUAGE = Language(str(Path('../../vendor/build/my-languages.so')), 'java')
-JS_LANGUAGE = Language(str(Path('../../vendor/build/my-languages.so')), 'javascript')
-PH_LANGUAGE = Language(str(Path('../../vendor/build/my-languages.so')), 'php')
+JV_LANGUAGE = get_language('java')
+JS_LANGUAGE = get_language('javascript')
+PH_LANGUAGE = get_language('php')
 
 parser = Parser()
 parser.set_language(JV_LANGUAGE)
@@ -29,30 +18,7 @@ with open(jv_example_file) as file:
 
 tree = parser.parse(bytes(code, "utf8"))
 
-query_entity = """
-(program (package_declaration (scoped_identifier) @pkg))
-
-(class_declaration
-    (modifiers
-        (marker_annotation name: (identifier) @single_annotation
-        	(#eq? @single_annotation "Entity"))
-        (annotation
-          name: (identifier) @annotation-name (#eq? @annotation-name "Table")
-          arguments: (annotation_argument_list
-            (element_value_pair
-              key: (identifier) @key (#eq? @key "name")
-              value: (string_literal) @table_name
-            )
-          )
-        )*
-    )
-    name: (identifier) @class_name
-    body: (class_body) @cls_body
-)
-"""
-
-query = JV_LANGUAGE.query(query_entity)
-captures = query.captures(tree.root_node)
+captures = registry.get('entity_table').captures(tree.root_node)
 
 # get full qualified class name
 for c in captures:
@@ -0,0 +1,225 @@
+import time
+import dataclasses
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+from metadata import Origin, OriginType, SourceFile
+from db_code_map import CodeDbMapper, TokenInfo, find_java_strings
+from file_walker import MAX_FILE_SIZE, generated, too_large, walk
+from ts_languages import get_language, get_parser
+from ts_query_registry import registry
+from ts_java_parser import read_source
+
+STRINGS_QUERY = 'java_strings'
+JAVA_FILES = {'.java': 'java'}
+
+
+class Edit(NamedTuple):
+    """the keyword arguments of tree_sitter.Tree.edit"""
+    start_byte: int
+    old_end_byte: int
+    new_end_byte: int
+    start_point: Tuple[int, int]
+    old_end_point: Tuple[int, int]
+    new_end_point: Tuple[int, int]
+
+
+def point_at(content: bytes, offset: int) -> Tuple[int, int]:
+    row = content.count(b'\n', 0, offset)
+    return row, offset - (content.rfind(b'\n', 0, offset) + 1)
+
+
+def common_prefix_length(old: bytes, new: bytes) -> int:
+    # binary search over slice comparisons, which run in C instead of a python loop over every byte
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[low:middle] == new[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(old: bytes, new: bytes, limit: int) -> int:
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:len(old) - low] == new[len(new) - middle:len(new) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def compute_edit(old: bytes, new: bytes) -> Edit | None:
+    """
+    Describe the difference between two versions of a file as a single edit covering every changed byte.
+    Returns None when the contents are equal.
+    """
+    if old == new:
+        return None
+    start = common_prefix_length(old, new)
+    suffix = common_suffix_length(old, new, min(len(old), len(new)) - start)
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    return Edit(start_byte=start, old_end_byte=old_end, new_end_byte=new_end,
+                start_point=point_at(old, start), old_end_point=point_at(old, old_end),
+                new_end_point=point_at(new, new_end))
+
+
+def print_update(file_path: Path, removed: List[TokenInfo], added: List[TokenInfo], elapsed: float) -> None:
+    print(f"{file_path}: -{len(removed)} +{len(added)} rows in {elapsed * 1000:.1f} ms")
+    for token_info in removed:
+        print(f"  - {token_info.line_number}: {token_info.owner}.{token_info.object_name} {token_info.operation}")
+    for token_info in added:
+        print(f"  + {token_info.line_number}: {token_info.owner}.{token_info.object_name} {token_info.operation}")
+
+
+class JavaWatcher:
+    """
+    Keeps the content, tree and mapped rows of every java file of a repository in memory. When a file changes it is
+    reparsed incrementally from its previous tree, and only the lines touched by the edit are mapped again.
+    """
+
+    def __init__(self, root_directory: Path, mapper: CodeDbMapper) -> None:
+        self.root_directory = root_directory
+        self.mapper = mapper
+        self.origin = Origin(type=OriginType.JAVA, name=root_directory.name, description=str(root_directory),
+                             file_path_root=str(root_directory))
+        self.parser = get_parser('java')
+        self.files: Dict[Path, SourceFile] = {}
+        self.mtimes: Dict[Path, int] = {}
+        self.rows: Dict[Path, List[TokenInfo]] = {}
+        self.skipped: Set[Path] = set()  # the files too large or generated, left out as a full run leaves them
+
+    def java_files(self) -> Set[Path]:
+        """
+        The java files a full run maps, listed by the file walker. The size and header of a file are checked once,
+        when it is first listed, rather than at every listing.
+        """
+        listed = {}
+        for file_path, file_size, language in walk(self.root_directory, JAVA_FILES, max_size=None,
+                                                   skip_generated=False):
+            listed[file_path] = (file_size, language)
+        self.skipped.intersection_update(listed)  # a skipped file deleted and created again is checked again
+        current = set()
+        for file_path, (file_size, language) in listed.items():
+            if file_path not in self.files and file_path not in self.skipped and (
+                    too_large(str(file_path), file_size, MAX_FILE_SIZE, language) or
+                    generated(str(file_path), language)):
+                self.skipped.add(file_path)
+            if file_path not in self.skipped:
+                current.add(file_path)
+        return current
+
+    def file_info(self, file_path: Path) -> dict:
+        return {
+            'file_path': str(file_path.parent),
+            'file_name': file_path.name,
+            'repo_name': self.root_directory.name
+        }
+
+    def map_lines(self, file_path: Path, content: bytes, line_indexes) -> List[TokenInfo]:
+        lines = content.split(b'\n')
+        file_info = self.file_info(file_path)
+        results = []
+        for line_index in line_indexes:
+            line = CodeDbMapper.decode_with_fallback_encoding(lines[line_index])
+            results.extend(self.mapper.process_line(line, line_index + 1, file_info, find_java_strings))
+        return results
+
+    def string_lines(self, source_file: SourceFile, first_line: int, last_line: int) -> List[int]:
+        """indexes of the lines within [first_line, last_line] that hold part of a string literal"""
+        line_indexes = set()
+        for capture in registry.captures(STRINGS_QUERY, source_file.tree.root_node,
+                                         start_point=(first_line, 0), end_point=(last_line + 1, 0)):
+            start_row, end_row = capture.node.start_point[0], capture.node.end_point[0]
+            line_indexes.update(range(max(start_row, first_line), min(end_row, last_line) + 1))
+        return sorted(line_indexes)
+
+    def load(self, file_path: Path) -> List[TokenInfo]:
+        content = read_source(file_path)
+        source_file = SourceFile(origin=self.origin, file_name=file_path.name, file_path=str(file_path.parent),
+                                 content=content, language=get_language('java'), tree=self.parser.parse(content))
+        self.files[file_path] = source_file
+        self.mtimes[file_path] = file_path.stat().st_mtime_ns
+        last_line = content.count(b'\n')
+        self.rows[file_path] = self.map_lines(file_path, content, self.string_lines(source_file, 0, last_line))
+        return self.rows[file_path]
+
+    def update(self, file_path: Path) -> Tuple[List[TokenInfo], List[TokenInfo]]:
+        """reparse a changed file and return the (removed, added) rows"""
+        self.mtimes[file_path] = file_path.stat().st_mtime_ns
+        source_file = self.files[file_path]
+        content = read_source(file_path)
+        edit = compute_edit(source_file.content, content)
+        if edit is None:
+            return [], []
+
+        old_tree = source_file.tree
+        old_tree.edit(**edit._asdict())
+        new_tree = self.parser.parse(content, old_tree)
+        source_file = dataclasses.replace(source_file, content=content, tree=new_tree)
+        self.files[file_path] = source_file
+
+        # lines touched in the new file: the edit itself plus any range whose syntax changed because of it
+        first_line, last_line = edit.start_point[0], edit.new_end_point[0]
+        for changed_range in old_tree.changed_ranges(new_tree):
+            first_line = min(first_line, changed_range.start_point[0])
+            last_line = max(last_line, changed_range.end_point[0])
+        line_delta = edit.new_end_point[0] - edit.old_end_point[0]
+        old_last_line = last_line - line_delta
+
+        kept, removed = [], []
+        for token_info in self.rows[file_path]:
+            line_index = token_info.line_number - 1
+            if line_index < first_line:
+                kept.append(token_info)
+            elif line_index <= old_last_line:
+                removed.append(token_info)
+            else:
+                kept.append(dataclasses.replace(token_info, line_number=token_info.line_number + line_delta))
+
+        added = self.map_lines(file_path, content, self.string_lines(source_file, first_line, last_line))
+        self.rows[file_path] = sorted(kept + added, key=lambda token_info: token_info.line_number)
+        return removed, added
+
+    def remove(self, file_path: Path) -> List[TokenInfo]:
+        del self.files[file_path]
+        del self.mtimes[file_path]
+        return self.rows.pop(file_path)
+
+    def mapped(self) -> List[TokenInfo]:
+        return [token_info for file_path in sorted(self.rows) for token_info in self.rows[file_path]]
+
+    def poll(self, on_update: Callable = print_update, list_files: bool = True) -> None:
+        """check the known files for changes; list_files also picks up created and deleted files"""
+        if list_files:
+            current = self.java_files()
+            for file_path in sorted(current - self.files.keys()):
+                start = time.perf_counter()
+                on_update(file_path, [], self.load(file_path), time.perf_counter() - start)
+            for file_path in sorted(self.files.keys() - current):
+                on_update(file_path, self.remove(file_path), [], 0.0)
+
+        for file_path in list(self.files):
+            try:
+                mtime = file_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue  # picked up as removed by the next file listing
+            if mtime != self.mtimes[file_path]:
+                start = time.perf_counter()
+                removed, added = self.update(file_path)
+                on_update(file_path, removed, added, time.perf_counter() - start)
+
+    def watch(self, interval: float = 0.05, list_interval: float = 1.0, on_update: Callable = print_update) -> None:
+        for file_path in sorted(self.java_files()):
+            self.load(file_path)
+        print(f"Watching {len(self.files)} files, {sum(len(rows) for rows in self.rows.values())} rows mapped")
+
+        last_listing = time.monotonic()
+        while True:
+            time.sleep(interval)
+            list_files = time.monotonic() - last_listing >= list_interval
+            if list_files:
+                last_listing = time.monotonic()
+            self.poll(on_update, list_files)
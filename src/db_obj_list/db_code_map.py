@@ -1,14 +1,35 @@
 import re
 import sys
 import csv
+import time
 import argparse
+from copy import copy
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Set, List, Dict
-
+from collections import Counter
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from dataclasses import dataclass, replace
+from typing import Set, List, Dict, FrozenSet, Iterable, Iterator, TextIO, Tuple
+from instrumentation import Stats, instrumentation
+from sql_lexer import ObjectReference, object_references
+from db_dependencies import DependencyIndex, load_index
+from query_fingerprint import QueryCache, fingerprint, normalize, write_query_report
+from file_walker import BUILD_DIRECTORIES, EXCLUDES, MAX_FILE_SIZE, WalkedFile, generated_header, walk
+from git_source import BlobReader, list_tree, resolve_refs
+from pipeline import DEPTH_PER_WORKER, pipelined
+from string_scanner import find_quoted_strings, heredoc_body_lines
+
+# (offset, owner, type, name, operation) of the catalog objects the references of a sql text resolve to
+Resolution = Tuple[Tuple[int, str, str, str, str], ...]
 OBJECT_TYPES = {'TABLE', 'VIEW', 'SYNONYM', 'PROCEDURE', 'PACKAGE', 'TRIGGER', 'FUNCTION', 'MATERIALIZED_VIEW'}
-TOKEN_OF_INTEREST_READ = {'FROM', 'JOIN'} # if the token is found, it is a read
-TOKEN_OF_INTEREST_MODIFY = {'INSERT', 'UPDATE', 'DELETE', 'MERGE'} # if the token is found, it is a modify
+# the objects whose base objects are read or modified as the object itself is
+TRANSPARENT_TYPES = {'VIEW', 'SYNONYM', 'MATERIALIZED_VIEW', 'MATERIALIZED VIEW'}
+# the characters of a line kept on each side of a hit; a longer line is read back from its file when a report needs it
+LINE_CONTEXT = 160
+newline_pattern = re.compile(rb'\r\n?|\n')  # the line ends read_text translates
+# files read at the same time, which hides the latency of a network file system behind the mapping of the files before
+IO_THREADS = 8
 
 OWNERS = {'A_RAIABD', 'NFE', 'SISBF', 'MSAF_DFE',
           'USR_ITIMPRO', 'USR_MS_ESTOQ', 'USR_MS_DESCON', 'USR_MAG', 'USR_MS_PAGTO',
@@ -38,13 +59,50 @@ class TokenInfo:
     repo_name: str
     valid: str = ''
     operation: str = ''
+    via: str = ''  # OWNER.NAME of the object the code refers to, for an object reached through the dependencies of it
+    line_offset: int = -1  # of the line in the bytes of its file, -1 when only its number is known
+    column: int = -1  # of the hit in the line as written
+
+
+@dataclass
+class RepoTiming:
+    repo_name: str
+    root_directory: str
+    files: int
+    size: int  # bytes of the files mapped
+    hits: int
+    seconds: float
+
+
+def line_context(line: str, column: int, context: int | None) -> str:
+    """the part of a line around a hit, the whole line when it is no longer than the context on both sides"""
+    if context is None or len(line) <= 2 * context:
+        return line
+    start, end = max(column - context, 0), min(max(column, 0) + context, len(line))
+    return ('...' if start else '') + line[start:end] + ('...' if end < len(line) else '')
+
+
+@lru_cache(maxsize=1024)
+def read_line(file_path: str, line_offset: int, line_number: int) -> str:
+    """a line of a file as find_tokens read it, from its byte offset or else from its number"""
+    with open(file_path, 'rb') as source_file:
+        if line_offset >= 0:
+            source_file.seek(line_offset)
+            data = source_file.readline()
+        else:
+            data = next(islice(source_file, line_number - 1, None), b'')
+    match = newline_pattern.search(data)
+    return CodeDbMapper.decode_with_fallback_encoding(data[:match.start()] if match else data)
+
+
+def full_line(token_info: TokenInfo) -> str:
+    """the stripped source line of a hit, whose row only holds the context of the hit"""
+    return read_line(str(Path(token_info.file_path) / token_info.file_name), token_info.line_offset,
+                     token_info.line_number).strip()
 
 
 dq_string_pattern = re.compile(r'"(.*?)"')  # double quotes strings
 sq_string_pattern = re.compile(r"'(.*?)'")  # single quotes strings
-js_string_pattern = re.compile(r"('(?:\\.|[^\\'])*')|(\"(?:\\.|[^\\\"])*\")|(`(?:\\.|[^\\`])*`)")
-php_string_pattern = re.compile(r"('(?:\\.|[^\\'])*')|(\"(?:\\.|[^\\\"])*\")|(<<<[^\s]+[\s\S]*?^\2;?$)")
-token_pattern = re.compile(r'[,;:\s]\s*')
 
 
 def find_java_strings(text: str) -> List[str]:
@@ -56,21 +114,39 @@ def find_sql_strings(text: str) -> List[str]:
 
 
 def find_php_strings(text: str) -> List[str]:
-    matches = php_string_pattern.findall(text)
-    return [string for group in matches for string in group if string]
+    """the contents of the quoted strings, as find_java_strings returns them"""
+    return [string[1:-1] for string in find_quoted_strings(text, '\'"')]
 
 
 def find_js_strings(text: str) -> List[str]:
-    matches = js_string_pattern.findall(text)
-    return [string for group in matches for string in group if string]
+    return [string[1:-1] for string in find_quoted_strings(text, '\'"`')]
+
+
+def find_heredoc_strings(text: str) -> List[str]:
+    """a line of a php heredoc body is a string as a whole"""
+    return [text] if text else []
+
+
+# the strings of a line of each language the file walker yields
+STRING_FINDERS = {'java': find_java_strings, 'sql': find_sql_strings, 'php': find_php_strings, 'js': find_js_strings}
 
 
 class CodeDbMapper:
 
-    def __init__(self, owners: Set[str]) -> None:
+    def __init__(self, owners: Set[str], file_budget: float | None = None, query_cache_size: int = 4096,
+                 line_context: int | None = LINE_CONTEXT, io_threads: int = IO_THREADS, workers: int = 1,
+                 build_directories: Dict[str, FrozenSet[str]] = BUILD_DIRECTORIES) -> None:
         self.db_object_dict: Dict[str, Dict[str, Set[str]]] = {}
         self.owners: Set[str] = owners
         self.mapped: List[TokenInfo] = []
+        self.file_budget = file_budget  # seconds a file may take before the rest of it is skipped
+        self.over_budget: List[Tuple[str, int]] = []  # (file, line it stopped at)
+        self.dependencies: DependencyIndex | None = None
+        self.query_cache: QueryCache[Resolution] = QueryCache(query_cache_size)
+        self.line_context = line_context  # characters kept on each side of a hit, None for the whole line
+        self.io_threads = io_threads  # files of find_tokens read ahead at the same time
+        self.workers = workers  # processes mapping the files read, 1 to map them in this one
+        self.build_directories = build_directories  # skipped beside their build file, see file_walker
 
     def load_db_objects_csv(self, file_path: Path) -> None:
         with open(file_path, newline='', encoding='utf-8') as csvfile:
@@ -86,28 +162,203 @@ class CodeDbMapper:
                     self.db_object_dict[row['OWNER'].upper()][row['OBJECT_TYPE'].upper()] = set()
                 self.db_object_dict[row['OWNER'].upper()][row['OBJECT_TYPE'].upper()].add(row['OBJECT_NAME'].upper())
 
+    def load_dependencies(self, dependencies_path: Path, synonyms_path: Path | None = None) -> None:
+        """an ALL_DEPENDENCIES export (and an ALL_SYNONYMS one), whose edges expand the hits of the code"""
+        self.dependencies = load_index(dependencies_path, synonyms_path)
+
+    def expand_dependencies(self, token_infos: List[TokenInfo]) -> List[TokenInfo]:
+        """
+        The objects of the owners of interest that the hits reach inside the database, on the line of the hit: the
+        base tables of a view, the tables of a package, transitively, without parsing their source. Through a view or
+        a synonym the operation of the hit is kept, through code it is not known.
+        """
+        if self.dependencies is None:
+            return []
+        results = []
+        with instrumentation.phase('dependency_expansion'):
+            for token_info in token_infos:
+                operation = token_info.operation if token_info.object_type in TRANSPARENT_TYPES else ''
+                via = f"{token_info.owner}.{token_info.object_name}"
+                for owner, object_name, object_type in self.dependencies.closure(token_info.owner,
+                                                                                 token_info.object_name):
+                    object_type = object_type or self.catalog_type(owner, object_name)  # behind a synonym
+                    if owner in self.owners and object_type.replace(' ', '_') in OBJECT_TYPES:
+                        results.append(replace(token_info, owner=owner, object_name=object_name,
+                                               object_type=object_type, operation=operation, via=via))
+        return results
 
-    def find_tokens(self, root_directory: Path) -> None:
-        for file_path in root_directory.glob('**/*'):
-            file_info = {
-                'file_path': str(file_path.parent),
-                'file_name': file_path.name,
-                'repo_name': root_directory.name
-            }
-            match file_path.suffix.lower():
-                case '.java':
-                    find_string_function = find_java_strings
-                case '.sql':
-                    find_string_function = find_sql_strings
-                case '.php':
-                    find_string_function = find_php_strings
-                case '.js':
-                    find_string_function = find_js_strings
-                case _:
-                    continue
-            file_content = CodeDbMapper.read_file_with_fallback_encoding(file_path)
-            for line_number, line in enumerate(file_content.split('\n'), 1):
-                self.mapped.extend(self.process_line(line, line_number, file_info, find_string_function))
+    def catalog_type(self, owner: str, object_name: str) -> str:
+        for db_type, names in self.db_object_dict.get(owner, {}).items():
+            if object_name in names:
+                return db_type
+        return ''
+
+    def find_tokens(self, root_directory: Path, excludes: Iterable[str] = EXCLUDES,
+                    max_file_size: int | None = MAX_FILE_SIZE, skip_generated: bool = True,
+                    walked_files: Iterable[WalkedFile] | None = None) -> None:
+        """
+        Map the source files of a repository, skipping the directories and files its .gitignore files and the
+        excludes ignore, the files above max_file_size and, with skip_generated, the generated or minified ones.
+        walked_files are the files of a walk already made with the same options, mapped instead of walking again.
+        """
+        if walked_files is None:
+            walked_files = walk(root_directory, excludes=excludes, max_size=max_file_size,
+                                skip_generated=skip_generated, build_directories=self.build_directories)
+        with ThreadPoolExecutor(max_workers=self.io_threads) as reader_pool:
+            # the time waiting for a file includes the walk that listed it
+            read_files = instrumentation.timed(
+                pipelined(reader_pool, lambda walked_file: walked_file.path.read_bytes(),
+                          instrumentation.timed(walked_files, 'file_walk'), self.io_threads * DEPTH_PER_WORKER),
+                'file_read')
+            if self.workers > 1:
+                self.map_in_processes(read_files, root_directory.name)
+                return
+            for (file_path, file_size, language), file_bytes in read_files:
+                start = time.perf_counter()
+                file_info = {
+                    'file_path': str(file_path.parent),
+                    'file_name': file_path.name,
+                    'repo_name': root_directory.name
+                }
+                self.mapped.extend(self.map_content(file_bytes, language, file_info, str(file_path)))
+                if instrumentation.enabled:
+                    instrumentation.record_file(file_path, language, file_size, time.perf_counter() - start)
+
+    def map_in_processes(self, read_files: Iterable[Tuple[WalkedFile, bytes]], repo_name: str) -> None:
+        """
+        Map the files read by find_tokens in a pool of processes, each holding a copy of this mapper made when it
+        starts, while the next files are read. A process keeps its own query cache; the query counts and the files over
+        budget come back with the hits, as do the timings and counters of a profiled run, and the hits are added in the
+        order of the files.
+        """
+        tasks = ((file_bytes, language, {
+            'file_path': str(file_path.parent),
+            'file_name': file_path.name,
+            'repo_name': repo_name
+        }, str(file_path)) for (file_path, _, language), file_bytes in read_files)
+        with self.worker_pool() as pool:
+            for _, (hits, over_budget, (occurrences, samples), stats) in pipelined(pool, map_in_worker, tasks,
+                                                                                   self.workers * DEPTH_PER_WORKER):
+                self.mapped.extend(hits)
+                self.over_budget.extend(over_budget)
+                self.query_cache.merge_counts(occurrences, samples)
+                instrumentation.merge_stats(stats)
+
+    def map_repositories(self, repositories: List[Path], excludes: Iterable[str] = EXCLUDES,
+                         max_file_size: int | None = MAX_FILE_SIZE,
+                         skip_generated: bool = True) -> Iterator[Tuple[RepoTiming, List[TokenInfo]]]:
+        """
+        (timing, hits) of each repository as it is mapped, the largest first so that the last ones to start are the
+        quick ones. With workers > 1 each repository is mapped by one of a pool of processes, which start from a copy
+        of this mapper (its catalog loaded once), and they come in the order they finish. Each repository is walked
+        once, the files listed to size it being the ones mapped.
+        """
+        excludes = tuple(excludes)
+        walked: Dict[Path, List[WalkedFile]] = {}
+        sizes = {}
+        with instrumentation.phase('file_walk'):
+            for root_directory in repositories:
+                walked_files = walked[root_directory] = list(walk(
+                    root_directory, excludes=excludes, max_size=max_file_size, skip_generated=skip_generated,
+                    build_directories=self.build_directories))
+                sizes[root_directory] = (len(walked_files), sum(walked_file.size for walked_file in walked_files))
+        schedule = sorted(repositories, key=lambda root_directory: sizes[root_directory][1], reverse=True)
+
+        def timed_hits(root_directory: Path, hits: List[TokenInfo],
+                       seconds: float) -> Tuple[RepoTiming, List[TokenInfo]]:
+            hits = hits + self.expand_dependencies(hits)
+            files, size = sizes[root_directory]
+            return RepoTiming(root_directory.name, str(root_directory), files, size, len(hits), seconds), hits
+
+        if self.workers <= 1:
+            for root_directory in schedule:
+                start = time.perf_counter()
+                self.find_tokens(root_directory, excludes, max_file_size, skip_generated, walked.pop(root_directory))
+                hits, self.mapped = self.mapped, []
+                yield timed_hits(root_directory, hits, time.perf_counter() - start)
+            return
+        with self.worker_pool() as pool:
+            futures = {pool.submit(map_repository_in_worker, (root_directory, excludes, max_file_size, skip_generated,
+                                                              walked.pop(root_directory))): root_directory
+                       for root_directory in schedule}
+            for future in as_completed(futures):
+                hits, over_budget, (occurrences, samples), stats, seconds = future.result()
+                self.over_budget.extend(over_budget)
+                self.query_cache.merge_counts(occurrences, samples)
+                instrumentation.merge_stats(stats)
+                yield timed_hits(futures[future], hits, seconds)
+
+    def worker_pool(self) -> ProcessPoolExecutor:
+        """a pool of workers starting from a copy of this mapper, profiled when this process is"""
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=start_worker,
+                                   initargs=(self.worker_copy(), instrumentation.enabled, instrumentation.slowest_n))
+
+    def worker_copy(self) -> 'CodeDbMapper':
+        """this mapper without its hits and dependencies, as the processes of map_in_processes start from it"""
+        mapper = copy(self)
+        mapper.mapped, mapper.over_budget, mapper.dependencies, mapper.workers = [], [], None, 1
+        mapper.query_cache = QueryCache(self.query_cache.maxsize)
+        return mapper
+
+    def map_refs(self, repository: Path, refs: List[str], excludes: Iterable[str] = EXCLUDES,
+                 max_file_size: int | None = MAX_FILE_SIZE, skip_generated: bool = True) -> Dict[str, List[TokenInfo]]:
+        """
+        The hits of each ref of a local git repository (a range A..B standing for A and the commits after it), read
+        from the blobs of its tree without checking it out. A blob is mapped once whatever the refs and paths it is
+        found under, so that every ref after the first costs its changed blobs.
+        """
+        mapped_refs = {}
+        blob_hits: Dict[str, List[TokenInfo]] = {}
+        with BlobReader(repository) as blob_reader:
+            for ref in resolve_refs(repository, refs):
+                with instrumentation.phase('git_tree'):
+                    entries = list_tree(repository, ref, excludes=excludes, max_size=max_file_size,
+                                        build_directories=self.build_directories)
+                hits = []
+                for path, blob, size, language in entries:
+                    directory, _, file_name = path.rpartition('/')
+                    file_info = {'file_path': directory, 'file_name': file_name,
+                                 'repo_name': f"{repository.name}@{ref}"}
+                    if blob in blob_hits:
+                        hits.extend(replace(token_info, **file_info) for token_info in blob_hits[blob])
+                        if instrumentation.enabled:
+                            instrumentation.count('blobs_reused')
+                        continue
+                    start = time.perf_counter()
+                    with instrumentation.phase('git_read'):
+                        content = blob_reader.read(blob)
+                    generated = skip_generated and generated_header(content, language)
+                    blob_hits[blob] = [] if generated else self.map_content(content, language, file_info,
+                                                                             f"{ref}:{path}")
+                    hits.extend(blob_hits[blob])
+                    if instrumentation.enabled:
+                        instrumentation.record_file(f"{ref}:{path}", language, size, time.perf_counter() - start)
+                mapped_refs[ref] = hits + self.expand_dependencies(hits)
+        return mapped_refs
+
+    def map_content(self, file_bytes: bytes, language: str, file_info: dict, source: str) -> List[TokenInfo]:
+        """the hits of the content of a source file, source naming it in the messages of the file budget"""
+        find_string_function = STRING_FINDERS[language]
+        start = time.perf_counter()
+        with instrumentation.phase('decode'):
+            file_content = CodeDbMapper.decode_with_fallback_encoding(file_bytes)
+        body_lines = heredoc_body_lines(file_content) if find_string_function is find_php_strings else set()
+        deadline = start + self.file_budget if self.file_budget else None
+        results = []
+        line_offset = 0
+        for line_number, line in enumerate(file_content.split('\n'), 1):
+            if deadline and time.perf_counter() > deadline:
+                self.over_budget.append((source, line_number))
+                if instrumentation.enabled:
+                    instrumentation.count('files_over_budget')
+                print(f"{source}: over the {self.file_budget}s budget, skipped from line {line_number}",
+                      file=sys.stderr)
+                break
+            results.extend(self.process_line(line, line_number, file_info, find_heredoc_strings
+                                             if line_number in body_lines else find_string_function, line_offset))
+            if line_end := newline_pattern.search(file_bytes, line_offset):
+                line_offset = line_end.end()
+        return results
 
     @staticmethod
     def read_file_with_fallback_encoding(file_path: Path, first_encoding='utf-8',
@@ -117,66 +368,342 @@ class CodeDbMapper:
         except UnicodeDecodeError:
             return file_path.read_text(encoding=fallback_encoding)
 
-    def process_line(self, line: str, line_number: int, file_info: dict, find_string_function) -> List[TokenInfo]:
+    @staticmethod
+    def decode_with_fallback_encoding(data: bytes, first_encoding='utf-8', fallback_encoding='windows-1252') -> str:
+        """the text of the bytes of a file as read_file_with_fallback_encoding reads it, line ends translated"""
+        try:
+            text = data.decode(first_encoding)
+        except UnicodeDecodeError:
+            text = data.decode(fallback_encoding)
+        return text.replace('\r\n', '\n').replace('\r', '\n') if '\r' in text else text
+
+    def process_line(self, line: str, line_number: int, file_info: dict, find_string_function,
+                     line_offset: int = -1) -> List[TokenInfo]:
         results = []
         stripped_line = line.strip()
+        indent = len(line) - len(line.lstrip())
+
+        # the strings are extracted and lexed once, each reference then probing the catalog of every owner
+        with instrumentation.phase('string_extraction'):
+            strings = find_string_function(stripped_line)
+        if not strings:
+            return results
+        with instrumentation.phase('index_probe'):
+            position = 0
+            for string in strings:
+                start = max(stripped_line.find(string, position), position)
+                position = start + len(string)
+                # the column of a hit is in the row, so a string only shares the resolution of the same text
+                for offset, owner, db_type, object_name, operation in self.resolve(string, True):
+                    results.append(TokenInfo(
+                        owner=owner,
+                        object_name=object_name,
+                        object_type=db_type,
+                        line=line_context(stripped_line, start + offset, self.line_context),
+                        line_number=line_number,
+                        file_path=file_info['file_path'],
+                        file_name=file_info['file_name'],
+                        repo_name=file_info['repo_name'],
+                        operation=operation,
+                        line_offset=line_offset,
+                        column=indent + start + offset))
+        if instrumentation.enabled:
+            instrumentation.count('lines_with_strings')
+            instrumentation.count('strings', len(strings))
+            instrumentation.count('hits', len(results))
+        return results
 
-        for owner, type_name in self.db_object_dict.items():
-            if owner not in self.owners:
+    def resolve(self, text: str, offsets: bool = False) -> Resolution:
+        """
+        The catalog objects the references of a sql text resolve to, lexed and matched once per distinct query: the
+        copies of a query that only differ in spaces, case or bind variables share it. With offsets, a copy only
+        shares it when it is the same text, the offsets being the ones of the text it was resolved from.
+        """
+        normalized = normalize(text)
+        key = fingerprint(normalized)
+        resolution = self.query_cache.get(key, text if offsets else None)
+        if resolution is None:
+            resolution = tuple((reference.offset, *match, reference.operation)
+                               for reference in object_references(text) for match in self.catalog_matches(reference))
+            self.query_cache.put(key, text, resolution)
+        elif instrumentation.enabled:
+            instrumentation.count('query_cache_hits')
+        if resolution:
+            self.query_cache.count(key, normalized)
+        return resolution
+
+    def catalog_matches(self, reference: ObjectReference) -> Iterator[Tuple[str, str, str]]:
+        """
+        (owner, type, name) of the catalog objects a reference can be: owner.object only in that owner,
+        package.procedure as the package and alias.column as nothing
+        """
+        name, owner = reference.name, None
+        if reference.qualifier is not None:
+            if reference.qualifier in self.owners or reference.qualifier in OWNERS:
+                owner = reference.qualifier
+            elif reference.call:
+                name = reference.qualifier
+            else:
+                return
+        for db_owner, type_name in self.db_object_dict.items():
+            if db_owner not in self.owners or (owner and db_owner != owner):
                 continue
             for db_type, name_obj in type_name.items():
-                if db_type.upper() not in OBJECT_TYPES:
-                    continue
-                for matches in find_string_function(stripped_line):
-                    operation = ''
-                    for token in re.split(token_pattern, matches):
-                        if token.upper() in TOKEN_OF_INTEREST_READ:
-                            operation = 'R'
-                        if token.upper() in TOKEN_OF_INTEREST_MODIFY:
-                            operation = 'M'
-                        if token.upper() in name_obj:
-                            results.append(TokenInfo(
-                                owner=owner,
-                                object_name=token.upper(),
-                                object_type=db_type,
-                                line=stripped_line,
-                                line_number=line_number,
-                                file_path=file_info['file_path'],
-                                file_name=file_info['file_name'],
-                                repo_name=file_info['repo_name'],
-                                operation=operation))
+                if db_type.upper() in OBJECT_TYPES and name in name_obj:
+                    yield db_owner, db_type, name
+
+    def process_query_text(self, query, file_info: dict) -> List[TokenInfo]:
+        """
+        Map a query assembled from several literals (code_mapper's QueryText: its text and segment_at(offset)).
+        Names split across literals are found in the joined text, and every hit is reported on the source line of
+        the literal it starts in.
+        """
+        results = []
+        exact = len(query.segments) > 1 or self.line_context is not None and len(query.text) > 2 * self.line_context
+        for offset, owner, db_type, object_name, operation in self.resolve(query.text, exact):
+            segment = query.segment_at(offset)
+            text = segment.text.strip()
+            column = query.segment_offset(offset) - (len(segment.text) - len(segment.text.lstrip()))
+            results.append(TokenInfo(
+                owner=owner,
+                object_name=object_name,
+                object_type=db_type,
+                line=line_context(text, column, self.line_context),
+                line_number=segment.line_number,
+                file_path=file_info['file_path'],
+                file_name=file_info['file_name'],
+                repo_name=file_info['repo_name'],
+                operation=operation))
+        if instrumentation.enabled:
+            instrumentation.count('hits', len(results))
         return results
 
+    def process_object_reference(self, object_name: str, operation: str, line: str, line_number: int,
+                                 file_info: dict, owner: str | None = None) -> List[TokenInfo]:
+        """
+        Map an object the code refers to by name rather than through a query text, e.g. the table of a JPA entity
+        behind a repository call. Without an owner every owner of interest holding the name is reported.
+        """
+        results = []
+        object_name = object_name.upper()
+        for db_owner, type_name in self.db_object_dict.items():
+            if db_owner not in self.owners or (owner and db_owner != owner.upper()):
+                continue
+            for db_type, name_obj in type_name.items():
+                if db_type.upper() in OBJECT_TYPES and object_name in name_obj:
+                    results.append(TokenInfo(
+                        owner=db_owner,
+                        object_name=object_name,
+                        object_type=db_type,
+                        line=line,
+                        line_number=line_number,
+                        file_path=file_info['file_path'],
+                        file_name=file_info['file_name'],
+                        repo_name=file_info['repo_name'],
+                        operation=operation))
+        return results
 
-def write_csv_from_token_info(token_info_list: List[TokenInfo], file_path: str):
-    field_names = ['Owner', 'Object Name', 'Object Type', 'Line', 'Line Number', 'File Path', 'File Name', 'Repo Name',
-                   'Valid', 'Operation']
 
+worker_mapper: CodeDbMapper | None = None  # the mapper of a process of CodeDbMapper.map_in_processes
+
+
+def start_worker(mapper: CodeDbMapper, instrumented: bool, slowest_n: int) -> None:
+    """keep the mapper of a worker process and record its timings afresh when the parent's are recorded"""
+    global worker_mapper
+    worker_mapper = mapper
+    if instrumented:
+        instrumentation.enable(slowest_n)
+    else:
+        instrumentation.enabled = False
+
+
+def map_in_worker(task: Tuple[bytes, str, dict, str]) -> Tuple[List[TokenInfo], List[Tuple[str, int]],
+                                                               Tuple[Counter, Dict[str, str]], Stats]:
+    """(hits, files over budget, query counts, instrumentation) of a file mapped by the mapper of a worker process"""
+    start = time.perf_counter()
+    hits = worker_mapper.map_content(*task)
+    if instrumentation.enabled:
+        file_bytes, language, _, source = task
+        instrumentation.record_file(source, language, len(file_bytes), time.perf_counter() - start)
+    over_budget, worker_mapper.over_budget = worker_mapper.over_budget, []
+    return hits, over_budget, worker_mapper.query_cache.take_counts(), instrumentation.take_stats()
+
+
+def map_repository_in_worker(task: Tuple[Path, Tuple[str, ...], int | None, bool, List[WalkedFile]]) -> Tuple[
+        List[TokenInfo], List[Tuple[str, int]], Tuple[Counter, Dict[str, str]], Stats, float]:
+    """
+    (hits, files over budget, query counts, instrumentation, seconds) of a repository mapped by the mapper of a worker
+    process
+    """
+    start = time.perf_counter()
+    worker_mapper.find_tokens(*task)
+    hits, worker_mapper.mapped = worker_mapper.mapped, []
+    over_budget, worker_mapper.over_budget = worker_mapper.over_budget, []
+    return (hits, over_budget, worker_mapper.query_cache.take_counts(), instrumentation.take_stats(),
+            time.perf_counter() - start)
+
+
+HIT_FIELD_NAMES = ['Owner', 'Object Name', 'Object Type', 'Line', 'Line Number', 'File Path', 'File Name', 'Repo Name',
+                   'Valid', 'Operation', 'Via', 'Line Offset', 'Column']
+
+
+class PartitionWriter:
+    """
+    The rows of hit csv files also written into one csv per value of a column, under directory/<column>=<value>/ as
+    readers of partitioned datasets expect, in the order they are written; the partitions of a previous run are
+    replaced. A partition file is opened like the csv files it is fed from, so both share the same encoding.
+    """
+
+    def __init__(self, directory: Path, column: str = 'Owner') -> None:
+        self.directory = directory
+        self.column = column
+        self.partition_key = column.lower().replace(' ', '_')
+        for stale_file in directory.glob(f"{self.partition_key}=*/hits.csv"):
+            stale_file.unlink()
+        self.partitions: Dict[str, Tuple[TextIO, csv.DictWriter]] = {}
+
+    def writerow(self, row: Dict[str, object]) -> None:
+        value = str(row[self.column])
+        if value not in self.partitions:
+            partition = self.directory / f"{self.partition_key}={value}"
+            partition.mkdir(parents=True, exist_ok=True)
+            partition_file = open(partition / 'hits.csv', 'w', newline='', errors='replace')
+            self.partitions[value] = (partition_file, csv.DictWriter(partition_file, HIT_FIELD_NAMES))
+            self.partitions[value][1].writeheader()
+        self.partitions[value][1].writerow(row)
+
+    def close(self) -> None:
+        for partition_file, _ in self.partitions.values():
+            partition_file.close()
+
+    def __enter__(self) -> 'PartitionWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_csv_from_token_info(token_info_list: List[TokenInfo], file_path: str, full_lines: bool = False,
+                              partitions: PartitionWriter | None = None):
+    """
+    with full_lines, the Line of a row is its whole source line, read back from the file, instead of its context;
+    every row is also written to the partitions when given
+    """
     with open(file_path, 'w', newline='', errors='replace') as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=field_names)
+        writer = csv.DictWriter(csv_file, fieldnames=HIT_FIELD_NAMES)
         writer.writeheader()
         for token_info in token_info_list:
             # try:
-            writer.writerow({
+            row = {
                 'Owner': token_info.owner,
                 'Object Name': token_info.object_name,
                 'Object Type': token_info.object_type,
-                'Line': token_info.line,
+                'Line': full_line(token_info) if full_lines else token_info.line,
                 'Line Number': token_info.line_number,
                 'File Path': token_info.file_path,
                 'File Name': token_info.file_name,
                 'Repo Name': token_info.repo_name,
                 'Valid': '',
-                'Operation': token_info.operation
-            })
-
-
-def main(db_objects_csv: Path, owners: Set[str], root_directory: Path) -> None:
-    db_code_mapper = CodeDbMapper(owners=owners)
-    db_code_mapper.load_db_objects_csv(db_objects_csv)
-    db_code_mapper.find_tokens(root_directory)
+                'Operation': token_info.operation,
+                'Via': token_info.via,
+                'Line Offset': token_info.line_offset,
+                'Column': token_info.column
+            }
+            writer.writerow(row)
+            if partitions is not None:
+                partitions.writerow(row)
+
+
+def read_manifest(manifest_path: Path) -> List[Path]:
+    """the repositories of a manifest, one directory per line relative to the manifest, # starting a comment"""
+    repositories = []
+    with open(manifest_path, encoding='utf-8') as manifest_file:
+        for line in manifest_file:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                repositories.append(manifest_path.parent / line)
+    names = Counter(root_directory.name for root_directory in repositories)
+    if duplicates := sorted(name for name, count in names.items() if count > 1):
+        raise ValueError(f"{manifest_path}: repositories with the same directory name: {', '.join(duplicates)}")
+    return repositories
+
+
+def write_timings_csv(timings: List[RepoTiming], file_path: Path) -> None:
+    with open(file_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Repo Name', 'Root Directory', 'Files', 'Bytes', 'Hits', 'Seconds'])
+        writer.writerows((timing.repo_name, timing.root_directory, timing.files, timing.size, timing.hits,
+                          f"{timing.seconds:.3f}") for timing in timings)
+
+
+def reference_keys(token_infos: List[TokenInfo]) -> Set[Tuple[str, ...]]:
+    """the references of the hits, an object with its operation in a file, whatever the line"""
+    return {(token_info.owner, token_info.object_name, token_info.object_type, token_info.operation,
+             token_info.file_path, token_info.file_name) for token_info in token_infos}
+
+
+def write_ref_diff_csv(mapped_refs: Dict[str, List[TokenInfo]], file_path: Path) -> None:
+    """the references added (+) and removed (-) from each ref to the next one"""
+    field_names = ['Change', 'From Ref', 'To Ref', 'Owner', 'Object Name', 'Object Type', 'Operation', 'File Path',
+                   'File Name']
+    refs = list(mapped_refs)
+    with open(file_path, 'w', newline='', errors='replace') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(field_names)
+        for from_ref, to_ref in zip(refs, refs[1:]):
+            before, after = reference_keys(mapped_refs[from_ref]), reference_keys(mapped_refs[to_ref])
+            writer.writerows(('+', from_ref, to_ref, *key) for key in sorted(after - before))
+            writer.writerows(('-', from_ref, to_ref, *key) for key in sorted(before - after))
+
+
+def main(db_objects_csv: Path, owners: Set[str], root_directory: Path | None, file_budget: float | None = None,
+         dependencies: Path | None = None, synonyms: Path | None = None, query_cache_size: int = 4096,
+         query_report: Path | None = None, line_context: int | None = LINE_CONTEXT, full_lines: bool = False,
+         excludes: Iterable[str] = EXCLUDES, max_file_size: int | None = MAX_FILE_SIZE,
+         skip_generated: bool = True, git_refs: List[str] | None = None, io_threads: int = IO_THREADS,
+         workers: int = 1, manifest: Path | None = None,
+         build_directories: Dict[str, FrozenSet[str]] = BUILD_DIRECTORIES) -> None:
+    db_code_mapper = CodeDbMapper(owners=owners, file_budget=file_budget, query_cache_size=query_cache_size,
+                                  line_context=line_context, io_threads=io_threads, workers=workers,
+                                  build_directories=build_directories)
+    with instrumentation.phase('catalog_load'):
+        db_code_mapper.load_db_objects_csv(db_objects_csv)
+    if dependencies:
+        db_code_mapper.load_dependencies(dependencies, synonyms)
+    if manifest:
+        repositories = read_manifest(manifest)
+        timings = {}
+        with PartitionWriter(Path(f"../../output/{manifest.stem}")) as partitions:
+            for timing, hits in db_code_mapper.map_repositories(repositories, excludes, max_file_size, skip_generated):
+                print(f"{timing.repo_name}: {timing.files} files, {timing.hits} hits in {timing.seconds:.1f}s",
+                      file=sys.stderr)
+                with instrumentation.phase('csv_write'):
+                    write_csv_from_token_info(hits, Path(f"../../output/{timing.repo_name}.csv"), full_lines,
+                                              partitions)
+                timings[timing.repo_name] = timing
+        with instrumentation.phase('csv_write'):
+            write_timings_csv([timings[root_directory.name] for root_directory in repositories],
+                              Path(f"../../output/{manifest.stem}_timings.csv"))
+            if query_report:
+                write_query_report(db_code_mapper.query_cache, query_report)
+        return
+    if git_refs:
+        mapped_refs = db_code_mapper.map_refs(root_directory, git_refs, excludes, max_file_size, skip_generated)
+        with instrumentation.phase('csv_write'):
+            for ref, hits in mapped_refs.items():
+                write_csv_from_token_info(hits, Path(f"../../output/{root_directory.name}@{ref.replace('/', '_')}.csv"))
+            if len(mapped_refs) > 1:
+                write_ref_diff_csv(mapped_refs, Path(f"../../output/{root_directory.name}_diff.csv"))
+            if query_report:
+                write_query_report(db_code_mapper.query_cache, query_report)
+        return
+    db_code_mapper.find_tokens(root_directory, excludes, max_file_size, skip_generated)
+    db_code_mapper.mapped.extend(db_code_mapper.expand_dependencies(db_code_mapper.mapped))
     output_file_name = root_directory.name + '.csv'
-    write_csv_from_token_info(db_code_mapper.mapped, Path('../../output/' + output_file_name))
+    with instrumentation.phase('csv_write'):
+        write_csv_from_token_info(db_code_mapper.mapped, Path('../../output/' + output_file_name), full_lines)
+        if query_report:
+            write_query_report(db_code_mapper.query_cache, query_report)
 
 
 if __name__ == '__main__':
@@ -190,6 +717,41 @@ if __name__ == '__main__':
     parser.add_argument('--db_objects_csv', type=str, help='Path to the csv file containing the database objects')
     parser.add_argument('--owners', type=str, help='Owners to be considered, separated by comma')
     parser.add_argument('--root_directory', type=str, help='Root directory to be searched for code')
+    parser.add_argument('--file_budget', type=float, help='Seconds a file may take before the rest of it is skipped')
+    parser.add_argument('--dependencies', type=str,
+                        help='ALL_DEPENDENCIES export (csv or parquet) whose edges expand the hits transitively')
+    parser.add_argument('--synonyms', type=str, help='ALL_SYNONYMS export (csv or parquet) resolved by --dependencies')
+    parser.add_argument('--query_cache', type=int, default=4096,
+                        help='Distinct queries whose resolved objects are kept for their copies, defaults to 4096')
+    parser.add_argument('--query_report', type=str,
+                        help='Write a csv of the distinct queries that hit the catalog, with their occurrences')
+    parser.add_argument('--line_context', type=int, default=LINE_CONTEXT,
+                        help=f"Characters of a long line kept on each side of a hit, defaults to {LINE_CONTEXT}")
+    parser.add_argument('--full_lines', action='store_true',
+                        help='Write the whole source line of every hit, read back from the files')
+    parser.add_argument('--exclude', type=str, default='',
+                        help='Gitignore patterns skipped on top of the .gitignore files and the default excludes '
+                             '(.git/, node_modules/, *.min.js..., target/ beside a pom.xml, build/ beside a '
+                             'build.gradle...), separated by comma')
+    parser.add_argument('--no_default_excludes', action='store_true',
+                        help='Only skip what the .gitignore files and --exclude ignore')
+    parser.add_argument('--max_file_size', type=int, default=MAX_FILE_SIZE,
+                        help=f"Bytes above which a file is skipped, defaults to {MAX_FILE_SIZE}")
+    parser.add_argument('--include_generated', action='store_true',
+                        help='Also map the files marked as generated and the minified javascript')
+    parser.add_argument('--git_refs', type=str, nargs='+',
+                        help='Refs, commits or ranges (A..B) of the git repository --root_directory, mapped from their '
+                             'blobs into one csv per ref plus the references added and removed between them')
+    parser.add_argument('--io_threads', type=int, default=IO_THREADS,
+                        help=f"Files read at once while the ones before them are mapped, defaults to {IO_THREADS}")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes mapping the files read, defaults to 1 (mapped in the reading process)')
+    parser.add_argument('--manifest', type=str,
+                        help='File listing repository directories, one per line, mapped in one run with the catalog '
+                             'loaded once: a csv per repository, their hits partitioned by owner under '
+                             '<manifest name>/ and the time each took in <manifest name>_timings.csv')
+    parser.add_argument('--profile_report', type=str, help='Write a json report of the time spent per phase')
+    parser.add_argument('--pstats', type=str, help='Also run cProfile and dump its stats to this file')
     # Parse the arguments
     try:
         args = parser.parse_args()
@@ -197,8 +759,25 @@ if __name__ == '__main__':
         parser.print_help()
         sys.exit(1)
 
-    root_dir_path = Path(args.root_directory)
+    if not args.root_directory and not args.manifest:
+        parser.error('--root_directory or --manifest is required')
+    if args.manifest and args.git_refs:
+        parser.error('--git_refs maps the refs of the one repository of --root_directory')
+    if args.git_refs and args.full_lines:
+        parser.error('--full_lines reads the lines from the files on disk, not from the blobs of --git_refs')
+    root_dir_path = args.root_directory and Path(args.root_directory)
     db_objects_csv_path = Path(args.db_objects_csv)
     owners_set = set(args.owners.split(','))
-    main(db_objects_csv_path, owners_set, root_dir_path)
+    default_excludes = () if args.no_default_excludes else EXCLUDES
+    if args.profile_report or args.pstats:
+        instrumentation.enable(profile=bool(args.pstats))
+    main(db_objects_csv_path, owners_set, root_dir_path, args.file_budget,
+         args.dependencies and Path(args.dependencies), args.synonyms and Path(args.synonyms), args.query_cache,
+         args.query_report and Path(args.query_report), args.line_context, args.full_lines,
+         default_excludes + tuple(pattern for pattern in args.exclude.split(',') if pattern),
+         args.max_file_size, not args.include_generated, args.git_refs, args.io_threads, args.workers,
+         args.manifest and Path(args.manifest), {} if args.no_default_excludes else BUILD_DIRECTORIES)
+    if instrumentation.enabled:
+        instrumentation.write_report(args.profile_report and Path(args.profile_report),
+                                     args.pstats and Path(args.pstats))
 
@@ -0,0 +1,231 @@
+import csv
+import sys
+import time
+import argparse
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple
+from instrumentation import instrumentation
+
+Node = Tuple[str, str]  # (owner, name): a package and its body, a type and its body are one node
+Reached = Tuple[str, str, str]  # (owner, name, type) of an object a node depends on
+# the synonyms a chain is followed through before it is taken for a loop
+MAX_SYNONYM_CHAIN = 16
+
+
+@dataclass(frozen=True)
+class Dependency:
+    owner: str
+    name: str
+    type: str
+    referenced_owner: str
+    referenced_name: str
+    referenced_type: str
+    referenced_link: str = ''  # the database link of a remote object, which is never followed
+
+
+@dataclass(frozen=True)
+class Synonym:
+    owner: str  # PUBLIC for a public synonym
+    name: str
+    table_owner: str
+    table_name: str
+    db_link: str = ''
+
+
+def read_rows(file_path: Path) -> Iterator[Dict[str, str]]:
+    """the rows of a csv or parquet export, with upper case column names and '' for the nulls"""
+    if file_path.suffix.lower() == '.parquet':
+        import pyarrow.parquet  # only needed for parquet exports
+
+        for batch in pyarrow.parquet.ParquetFile(file_path).iter_batches():
+            for row in batch.to_pylist():
+                yield {column.upper(): '' if value is None else str(value) for column, value in row.items()}
+        return
+    with open(file_path, newline='', encoding='utf-8') as csv_file:
+        for row in csv.DictReader(csv_file):
+            yield {column.upper(): value or '' for column, value in row.items()}
+
+
+def read_dependencies(file_path: Path) -> Iterator[Dependency]:
+    """the rows of an ALL_DEPENDENCIES (or DBA_DEPENDENCIES) export"""
+    for row in read_rows(file_path):
+        yield Dependency(owner=row['OWNER'].upper(), name=row['NAME'].upper(), type=row['TYPE'].upper(),
+                         referenced_owner=row['REFERENCED_OWNER'].upper(),
+                         referenced_name=row['REFERENCED_NAME'].upper(),
+                         referenced_type=row['REFERENCED_TYPE'].upper(),
+                         referenced_link=row.get('REFERENCED_LINK_NAME', '').upper())
+
+
+def read_synonyms(file_path: Path) -> Iterator[Synonym]:
+    """the rows of an ALL_SYNONYMS export"""
+    for row in read_rows(file_path):
+        yield Synonym(owner=row['OWNER'].upper(), name=row['SYNONYM_NAME'].upper(),
+                      table_owner=row['TABLE_OWNER'].upper(), table_name=row['TABLE_NAME'].upper(),
+                      db_link=row.get('DB_LINK', '').upper())
+
+
+class DependencyIndex:
+    """
+    The dependencies the database itself records (a view on its tables, a package body on the tables and packages it
+    uses, a trigger on its table) as an adjacency index, with the synonyms resolved to the objects they stand for.
+    The transitive closure of an object is computed once and reused by the closures that reach it.
+    """
+
+    def __init__(self) -> None:
+        self.references: Dict[Node, Set[Reached]] = {}
+        self.types: Dict[Node, str] = {}  # the type of the objects seen, the body of a package read as the package
+        self.synonyms: Dict[Node, Node] = {}
+        self.dependencies: List[Dependency] = []
+        self.closures: Dict[Node, FrozenSet[Reached]] = {}
+
+    def add_dependency(self, dependency: Dependency) -> None:
+        self.dependencies.append(dependency)
+        if dependency.referenced_link:
+            return
+        node = (dependency.owner, dependency.name)
+        referenced = (dependency.referenced_owner, dependency.referenced_name)
+        self.types.setdefault(node, dependency.type.removesuffix(' BODY'))
+        self.types.setdefault(referenced, dependency.referenced_type.removesuffix(' BODY'))
+        if referenced != node:  # a package body depends on its own specification
+            self.references.setdefault(node, set()).add((*referenced, dependency.referenced_type))
+        self.closures.clear()
+
+    def add_synonym(self, synonym: Synonym) -> None:
+        if not synonym.db_link:
+            self.synonyms[(synonym.owner, synonym.name)] = (synonym.table_owner, synonym.table_name)
+            self.closures.clear()
+
+    def load(self, dependencies: Iterable[Dependency], synonyms: Iterable[Synonym] = ()) -> None:
+        for dependency in dependencies:
+            self.add_dependency(dependency)
+        for synonym in synonyms:
+            self.add_synonym(synonym)
+
+    def resolve(self, node: Node) -> Node:
+        """the object a synonym stands for, following chains of synonyms; any other object is itself"""
+        for _ in range(MAX_SYNONYM_CHAIN):
+            if node not in self.synonyms:
+                return node
+            node = self.synonyms[node]
+        return node
+
+    def closure(self, owner: str, name: str) -> FrozenSet[Reached]:
+        """
+        every object an object depends on, directly or through views, code and synonyms, itself excluded; for a
+        synonym, the object it stands for and the dependencies of that object
+        """
+        node = (owner.upper(), name.upper())
+        target = self.resolve(node)
+        if target == node:
+            return self.object_closure(target)
+        return self.object_closure(target) | {(*target, self.types.get(target, ''))}
+
+    def object_closure(self, start: Node) -> FrozenSet[Reached]:
+        if start in self.closures:
+            return self.closures[start]
+        reached: Set[Reached] = set()
+        visited, pending = {start}, [start]
+        while pending:
+            node = pending.pop()
+            for referenced_owner, referenced_name, referenced_type in self.references.get(node, ()):
+                target = self.resolve((referenced_owner, referenced_name))
+                if target == start:
+                    continue
+                if target != (referenced_owner, referenced_name):
+                    referenced_type = self.types.get(target, '')
+                reached.add((*target, referenced_type))
+                if target in visited:
+                    continue
+                visited.add(target)
+                if target in self.closures:  # a closure is complete, whatever was visited when it was computed
+                    reached.update(item for item in self.closures[target] if item[:2] != start)
+                    continue
+                pending.append(target)
+        self.closures[start] = frozenset(reached)
+        return self.closures[start]
+
+
+def load_index(dependencies_path: Path, synonyms_path: Path | None = None) -> DependencyIndex:
+    index = DependencyIndex()
+    with instrumentation.phase('dependencies_load'):
+        index.load(read_dependencies(dependencies_path), read_synonyms(synonyms_path) if synonyms_path else ())
+    return index
+
+
+# the columns of the rows of map_rows, and their names in the upper case schema of TB_MAP that differ
+MAP_COLUMNS = ('code', 'from_code', 'to_code', 'map_type', 'line_number', 'file_path', 'file_name')
+MAP_COLUMN_ALIASES = {'from': 'from_code', 'to': 'to_code'}
+
+
+def map_rows(index: DependencyIndex, source_name: str) -> Iterator[dict]:
+    """the TB_MAP rows of the dependencies and synonyms, from_code and to_code being OWNER.NAME"""
+    for dependency in index.dependencies:
+        from_code = f"{dependency.owner}.{dependency.name}"
+        to_code = (f"{dependency.referenced_owner}.{dependency.referenced_name}"
+                   + (f"@{dependency.referenced_link}" if dependency.referenced_link else ''))
+        yield {'code': f"{from_code}->{to_code}", 'from_code': from_code, 'to_code': to_code,
+               'map_type': 'db_dependency', 'line_number': 0, 'file_path': '', 'file_name': source_name}
+    for (owner, name), (table_owner, table_name) in index.synonyms.items():
+        yield {'code': f"{owner}.{name}->{table_owner}.{table_name}", 'from_code': f"{owner}.{name}",
+               'to_code': f"{table_owner}.{table_name}", 'map_type': 'db_synonym', 'line_number': 0,
+               'file_path': '', 'file_name': source_name}
+
+
+def load_map_table(index: DependencyIndex, database_uri: str, source_name: str, batch_size: int = 5000) -> int:
+    """
+    Bulk upserts the dependencies into TB_MAP, in batches of executemany inserts; the columns of the rows the table
+    does not have are left out, so that both schemas of TB_MAP are loaded, and the other columns of a row already
+    there are kept. Returns the rows written.
+    """
+    from sqlalchemy import MetaData, Table, create_engine
+    from sqlalchemy.dialects.sqlite import insert
+
+    engine = create_engine(database_uri)
+    table = Table('TB_MAP', MetaData(), autoload_with=engine)
+    columns = {column.name.lower(): column.name for column in table.columns}
+    columns.update({row_column: columns[alias] for alias, row_column in MAP_COLUMN_ALIASES.items() if alias in columns})
+    columns = {row_column: columns[row_column] for row_column in MAP_COLUMNS if row_column in columns}
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={column: statement.excluded[column] for column in columns.values()
+              if not table.columns[column].primary_key})
+    written, batch = 0, []
+    with engine.begin() as connection:
+        for row in map_rows(index, source_name):
+            batch.append({table_column: row[column] for column, table_column in columns.items()})
+            if len(batch) == batch_size:
+                with instrumentation.phase('db_upsert'):
+                    connection.execute(statement, batch)
+                written, batch = written + len(batch), []
+        if batch:
+            with instrumentation.phase('db_upsert'):
+                connection.execute(statement, batch)
+            written += len(batch)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Database dependencies\n\nLoads an ALL_DEPENDENCIES export (csv or parquet), and optionally an "
+                    "ALL_SYNONYMS one,\ninto TB_MAP and prints the transitive dependencies of objects.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--dependencies', type=Path, required=True, help='ALL_DEPENDENCIES export, csv or parquet')
+    parser.add_argument('--synonyms', type=Path, help='ALL_SYNONYMS export, csv or parquet')
+    parser.add_argument('--database_uri', type=str, help='Database whose TB_MAP the dependencies are upserted into')
+    parser.add_argument('--closure', type=str, nargs='*', default=[],
+                        help='OWNER.NAME of objects whose transitive dependencies are printed')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    dependency_index = load_index(args.dependencies, args.synonyms)
+    print(f"{len(dependency_index.dependencies)} dependencies, {len(dependency_index.synonyms)} synonyms loaded in "
+          f"{time.perf_counter() - start_time:.2f}s", file=sys.stderr)
+    for qualified_name in args.closure:
+        object_owner, _, object_name = qualified_name.upper().rpartition('.')
+        for reached_owner, reached_name, reached_type in sorted(dependency_index.closure(object_owner, object_name)):
+            print(f"{qualified_name}: {reached_owner}.{reached_name} {reached_type}")
+    if args.database_uri:
+        row_count = load_map_table(dependency_index, args.database_uri, args.dependencies.name)
+        print(f"{row_count} rows upserted into TB_MAP")
@@ -4,6 +4,7 @@ from pathlib import Path
 from dataclasses import dataclass
 from metadata import *
 from db_object_read import *
+from string_scanner import find_quoted_strings, heredoc_body_lines
 from typing import Set, List, Iterator
 
 OBJECT_TYPES = {'TABLE', 'VIEW', 'PROCEDURE', 'PACKAGE', 'TRIGGER', 'FUNCTION', 'MATERIALIZED_VIEW'}
@@ -39,8 +40,6 @@ class TokenInfo:
 
 dq_string_pattern = re.compile(r'"(.*?)"')  # double quotes strings
 sq_string_pattern = re.compile(r"'(.*?)'")  # single quotes strings
-js_string_pattern = re.compile(r"('(?:\\.|[^\\'])*')|(\"(?:\\.|[^\\\"])*\")|(`(?:\\.|[^\\`])*`)")
-php_string_pattern = re.compile(r"('(?:\\.|[^\\'])*')|(\"(?:\\.|[^\\\"])*\")|(<<<[^\s]+[\s\S]*?^\2;?$)")
 token_pattern = re.compile(r'[,;:\s]\s*')
 
 
@@ -53,13 +52,15 @@ def find_sql_strings(text: str) -> List[str]:
 
 
 def find_php_strings(text: str) -> List[str]:
-    matches = php_string_pattern.findall(text)
-    return [string for group in matches for string in group if string]
+    return find_quoted_strings(text, '\'"')
 
 
 def find_js_strings(text: str) -> List[str]:
-    matches = js_string_pattern.findall(text)
-    return [string for group in matches for string in group if string]
+    return find_quoted_strings(text, '\'"`')
+
+
+def find_heredoc_strings(text: str) -> List[str]:
+    return [text] if text else []
 
 
 def read_file_with_fallback_encoding(file_path: Path, first_encoding='utf-8', fallback_encoding='windows-1252') -> str:
@@ -117,8 +118,10 @@ def find_tokens(root_directory: Path, db_object_dict: Dict[str, Dict[str, Dict[s
             case _:
                 continue
         file_content = read_file_with_fallback_encoding(file_path)
+        body_lines = heredoc_body_lines(file_content) if find_function is find_php_strings else set()
         for line_number, line in enumerate(file_content.split('\n'), 1):
-            results.extend(process_line(line, line_number, db_object_dict, file_info, find_function))
+            results.extend(process_line(line, line_number, db_object_dict, file_info,
+                                        find_heredoc_strings if line_number in body_lines else find_function))
     return results
 
 
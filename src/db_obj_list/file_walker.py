@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+LANGUAGES = {'.java': 'java', '.sql': 'sql', '.php': 'php', '.js': 'js'}
+# gitignore patterns applied to every repository on top of its own .gitignore files: version control, dependencies,
+# tool state and bundled javascript
+EXCLUDES = ('.git/', '.hg/', '.svn/', 'node_modules/', 'bower_components/', '.gradle/', '.idea/', '*.min.js',
+            '*-min.js', '*.bundle.js')
+# the build output and dependency directories, skipped only beside one of the build files that writes them, so that a
+# package named vendor or build (com/acme/build/) is still mapped
+BUILD_DIRECTORIES = {
+    'target': frozenset({'pom.xml', 'build.sbt'}),
+    'build': frozenset({'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts', 'build.xml',
+                        'package.json', 'setup.py', 'pyproject.toml', 'CMakeLists.txt'}),
+    'dist': frozenset({'package.json', 'setup.py', 'pyproject.toml'}),
+    'vendor': frozenset({'composer.json', 'go.mod', 'Gemfile'}),
+}
+# the size above which a source file is skipped; sql scripts never are, a schema dump being what is mapped
+MAX_FILE_SIZE = 10 * 1024 * 1024
+# what a generator writes in the comments a file starts with (not in the body, where an IDE writes "Auto-generated
+# method stub"), and the bytes of a file looked at
+GENERATED_MARKERS = re.compile(rb'@generated|do not edit|generated (?:by|from)\b|(?:file|code) (?:is|was) (?:auto-?)?'
+                               rb'generated|auto-?generated (?:file|code|class)', re.IGNORECASE)
+COMMENT_STARTS = (b'//', b'/*', b'*', b'#', b'--', b'<?php')
+HEADER_SIZE = 2048
+# a javascript file whose first lines are this long on average is minified
+MINIFIED_LINE_LENGTH = 500
+
+
+class WalkedFile(NamedTuple):
+    path: Path
+    size: int
+    language: str
+
+
+class IgnoreRule(NamedTuple):
+    pattern: re.Pattern
+    negated: bool
+    directory_only: bool
+
+
+def glob_regex(glob: str) -> str:
+    """the regex of a gitignore glob: * and ? stop at a slash, ** crosses them"""
+    regex, index = [], 0
+    while index < len(glob):
+        char = glob[index]
+        if glob.startswith('**/', index):
+            regex.append('(?:.*/)?')
+            index += 3
+            continue
+        if glob.startswith('**', index):
+            regex.append('.*')
+            index += 2
+            continue
+        if char == '*':
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[' and (end := glob.find(']', index + 2)) > 0:
+            body = glob[index + 1:end]
+            regex.append('[' + ('^' + body[1:] if body[0] in '!^' else body).replace('\\', '\\\\') + ']')
+            index = end
+        elif char == '\\' and index + 1 < len(glob):
+            index += 1
+            regex.append(re.escape(glob[index]))
+        else:
+            regex.append(re.escape(char))
+        index += 1
+    return ''.join(regex)
+
+
+def parse_ignore(lines: Iterable[str]) -> List[IgnoreRule]:
+    """the rules of the lines of a .gitignore, matched against paths relative to its directory"""
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n\r')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        line = line[1:] if negated else line.removeprefix('\\')
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        # a pattern with a slash before its end is relative to the .gitignore, any other matches at any depth
+        anchored = '/' in line
+        regex = glob_regex(line.lstrip('/'))
+        rules.append(IgnoreRule(re.compile(regex if anchored else '(?:.*/)?' + regex), negated, directory_only))
+    return rules
+
+
+def read_ignore(directory: str) -> List[IgnoreRule]:
+    try:
+        with open(os.path.join(directory, '.gitignore'), encoding='utf-8', errors='replace') as ignore_file:
+            return parse_ignore(ignore_file)
+    except OSError:
+        return []
+
+
+def ignored(relative_path: str, is_directory: bool, rule_sets: List[Tuple[str, List[IgnoreRule]]]) -> bool:
+    """whether the last rule matching a path ignores it, the rules of deeper .gitignore files coming last"""
+    result = False
+    for base, rules in rule_sets:
+        path = relative_path[len(base):]
+        for rule in rules:
+            if rule.negated == result and (is_directory or not rule.directory_only) and rule.pattern.fullmatch(path):
+                result = not rule.negated
+    return result
+
+
+def leading_comments(header: bytes) -> bytes:
+    """the comment lines a file starts with, up to its first line of code"""
+    lines = []
+    for line in header.split(b'\n'):
+        stripped = line.strip()
+        if stripped and not stripped.startswith(COMMENT_STARTS):
+            break
+        lines.append(stripped)
+    return b'\n'.join(lines)
+
+
+def generated_header(header: bytes, language: str) -> bool:
+    """whether the first HEADER_SIZE bytes of a file hold the marker of a code generator or, for javascript, are
+    minified; sql scripts are never taken for generated, dumps and exports being what is mapped"""
+    if language == 'sql':
+        return False
+    if GENERATED_MARKERS.search(leading_comments(header[:HEADER_SIZE])):
+        return True
+    return language == 'js' and len(header) >= HEADER_SIZE and \
+        header.count(b'\n', 0, HEADER_SIZE) < HEADER_SIZE // MINIFIED_LINE_LENGTH
+
+
+def generated(path: str, language: str) -> bool:
+    try:
+        with open(path, 'rb') as source_file:
+            return generated_header(source_file.read(HEADER_SIZE), language)
+    except OSError:
+        return False
+
+
+def build_output(name: str, sibling_names: Set[str], build_directories: Dict[str, FrozenSet[str]]) -> bool:
+    """whether a directory is the build output of the build file of a directory holding the sibling names"""
+    return name in build_directories and not build_directories[name].isdisjoint(sibling_names)
+
+
+def too_large(path: str, size: int, max_size: int | None, language: str) -> bool:
+    """whether a file is skipped for its size, which is then reported"""
+    if max_size is None or size <= max_size or language == 'sql':
+        return False
+    print(f"{path}: {size} bytes, skipped above {max_size}", file=sys.stderr)
+    return True
+
+
+def walk(root_directory: Path, languages: Dict[str, str] = LANGUAGES, excludes: Iterable[str] = EXCLUDES,
+         max_size: int | None = MAX_FILE_SIZE, gitignore: bool = True, skip_generated: bool = True,
+         build_directories: Dict[str, FrozenSet[str]] = BUILD_DIRECTORIES) -> Iterator[WalkedFile]:
+    """
+    The source files under a directory in sorted order, listed with os.scandir: the directories the .gitignore files
+    or the excludes (gitignore patterns relative to the root) ignore, and the build directories next to their build
+    file, are pruned without being listed, and only the files of the languages are stat'ed. Files above max_size (sql
+    scripts excepted) and, with skip_generated, generated or minified ones are left out. Symbolic links to
+    directories are not followed.
+    """
+    root = str(root_directory)
+    rule_sets = [('', parse_ignore(excludes))] + ([('', read_ignore(root))] if gitignore else [])
+    yield from walk_directory(root, '', rule_sets, languages, max_size, gitignore, skip_generated, build_directories)
+
+
+def walk_directory(directory: str, prefix: str, rule_sets: List[Tuple[str, List[IgnoreRule]]],
+                   languages: Dict[str, str], max_size: int | None, gitignore: bool, skip_generated: bool,
+                   build_directories: Dict[str, FrozenSet[str]]) -> Iterator[WalkedFile]:
+    try:
+        with os.scandir(directory) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+    except OSError:
+        return
+    names = {entry.name for entry in entries}
+    for entry in entries:
+        relative_path = prefix + entry.name
+        try:
+            is_directory = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+        if is_directory:
+            if build_output(entry.name, names, build_directories) or ignored(relative_path, True, rule_sets):
+                continue
+            child_rules = read_ignore(entry.path) if gitignore else []
+            yield from walk_directory(entry.path, relative_path + '/',
+                                      rule_sets + [(relative_path + '/', child_rules)] if child_rules else rule_sets,
+                                      languages, max_size, gitignore, skip_generated, build_directories)
+            continue
+        language = languages.get(os.path.splitext(entry.name)[1].lower())
+        if language is None or ignored(relative_path, False, rule_sets):
+            continue
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        if too_large(entry.path, size, max_size, language):
+            continue
+        if skip_generated and language != 'sql' and generated(entry.path, language):  # not even opened
+            continue
+        yield WalkedFile(Path(entry.path), size, language)
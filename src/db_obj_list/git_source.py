@@ -0,0 +1,126 @@
+import subprocess
+from pathlib import Path, PurePosixPath
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Set, Tuple
+from file_walker import BUILD_DIRECTORIES, EXCLUDES, LANGUAGES, MAX_FILE_SIZE, IgnoreRule, build_output, ignored, \
+    parse_ignore, too_large
+
+SYMLINK_MODE = b'120000'
+
+
+class TreeEntry(NamedTuple):
+    path: str  # in the tree, with / separators
+    blob: str
+    size: int
+    language: str
+
+
+def git(repository: Path, *arguments: str) -> bytes:
+    return subprocess.run(['git', '-C', str(repository), *arguments], check=True, capture_output=True).stdout
+
+
+def resolve_refs(repository: Path, refs: Iterable[str]) -> List[str]:
+    """
+    The refs to map, in order: a ref or commit as given, a range A..B as A followed by the commits after it up to B,
+    oldest first along the first parents, by their abbreviated hashes
+    """
+    resolved = []
+    for ref in refs:
+        if '..' not in ref:
+            resolved.append(ref)
+            continue
+        start, _, end = ref.partition('..')
+        resolved.append(start or 'HEAD')
+        commits = git(repository, 'rev-list', '--reverse', '--first-parent', f"{start or 'HEAD'}..{end or 'HEAD'}")
+        resolved.extend(commit[:12] for commit in commits.decode().split())
+    return resolved
+
+
+def list_tree(repository: Path, ref: str, languages: Dict[str, str] = LANGUAGES, excludes: Iterable[str] = EXCLUDES,
+              max_size: int | None = MAX_FILE_SIZE, gitignore: bool = True,
+              build_directories: Dict[str, FrozenSet[str]] = BUILD_DIRECTORIES) -> List[TreeEntry]:
+    """
+    The source files of a ref, from its tree alone (nothing is checked out), with the .gitignore files of the tree,
+    the excludes and the build directories of the file walker applied to their directories and names, so that a ref
+    maps the files a walk of its checkout does; a tree is sorted, so are its entries
+    """
+    blobs = []
+    file_names: Dict[str, Set[str]] = {}  # the files of each directory, for the build files beside a directory
+    ignore_blobs: Dict[str, str] = {}  # the .gitignore of each directory that has one
+    for record in git(repository, 'ls-tree', '-r', '-l', '-z', '--full-tree', ref).split(b'\0'):
+        info, _, path_bytes = record.partition(b'\t')
+        if not path_bytes:
+            continue
+        mode, kind, blob, size = info.split()
+        if kind != b'blob' or mode == SYMLINK_MODE:
+            continue
+        path = path_bytes.decode('utf-8', errors='replace')
+        directory, _, name = path.rpartition('/')
+        file_names.setdefault(directory, set()).add(name)
+        if name == '.gitignore' and gitignore:
+            ignore_blobs[directory] = blob.decode()
+        blobs.append((path, blob.decode(), int(size)))
+    ignore_rules: Dict[str, List[IgnoreRule]] = {}
+    if ignore_blobs:
+        with BlobReader(repository) as blob_reader:
+            for directory, blob in ignore_blobs.items():
+                content = blob_reader.read(blob).decode('utf-8', errors='replace')
+                ignore_rules[directory] = parse_ignore(content.splitlines())
+    directory_rules: Dict[str, List[Tuple[str, List[IgnoreRule]]]] = {
+        '': [('', parse_ignore(excludes)), ('', ignore_rules.get('', []))]}
+
+    def rule_sets(directory: str) -> List[Tuple[str, List[IgnoreRule]]]:
+        """the rules of the excludes and of the .gitignore files of a directory and of its parents"""
+        if directory not in directory_rules:
+            child_rules = ignore_rules.get(directory)
+            directory_rules[directory] = rule_sets(directory.rpartition('/')[0]) + \
+                ([(directory + '/', child_rules)] if child_rules else [])
+        return directory_rules[directory]
+
+    ignored_directories: Dict[str, bool] = {'': False}
+
+    def directory_ignored(directory: str) -> bool:
+        if directory not in ignored_directories:
+            parent, _, name = directory.rpartition('/')
+            ignored_directories[directory] = directory_ignored(parent) or \
+                build_output(name, file_names.get(parent, set()), build_directories) or \
+                ignored(directory, True, rule_sets(parent))
+        return ignored_directories[directory]
+
+    entries = []
+    for path, blob, size in blobs:
+        language = languages.get(PurePosixPath(path).suffix.lower())
+        if language is None or too_large(f"{ref}:{path}", size, max_size, language):
+            continue
+        directory = path.rpartition('/')[0]
+        if directory_ignored(directory) or ignored(path, False, rule_sets(directory)):
+            continue
+        entries.append(TreeEntry(path, blob, size, language))
+    return entries
+
+
+class BlobReader:
+    """The content of blobs, read through one git cat-file --batch process kept open for a whole run"""
+
+    def __init__(self, repository: Path) -> None:
+        self.process = subprocess.Popen(['git', '-C', str(repository), 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, blob: str) -> bytes:
+        self.process.stdin.write(blob.encode() + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:  # <blob> missing
+            raise KeyError(blob)
+        content = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)  # the newline after the content
+        return content
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self) -> 'BlobReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
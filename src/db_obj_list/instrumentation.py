@@ -0,0 +1,175 @@
+import json
+import time
+import heapq
+import cProfile
+from pathlib import Path
+from contextlib import nullcontext
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+SLOWEST_FILES = 20
+
+# a single reusable no-op context manager, so a disabled phase costs one attribute lookup and a call
+_NULL_PHASE = nullcontext()
+
+
+@dataclass
+class PhaseStats:
+    seconds: float = 0.0
+    calls: int = 0
+
+
+@dataclass
+class LanguageStats:
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+class Stats(NamedTuple):
+    """what a worker process recorded, sent to its parent to be merged"""
+    phases: Dict[str, PhaseStats]
+    counters: Dict[str, int]
+    languages: Dict[str, LanguageStats]
+    slowest: List[Tuple[float, str, str, int]]
+
+
+class _PhaseTimer:
+    __slots__ = ('stats', 'start')
+
+    def __init__(self, stats: PhaseStats) -> None:
+        self.stats = stats
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stats.seconds += time.perf_counter() - self.start
+        self.stats.calls += 1
+
+
+class Instrumentation:
+    """
+    Opt-in timers and counters for the mapping pipeline. While disabled, phase() returns a shared no-op context
+    manager and timed() returns the iterable untouched; hot loops should guard count() with `if enabled`.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.slowest_n = SLOWEST_FILES
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.languages: Dict[str, LanguageStats] = {}
+        self.slowest: List[Tuple[float, str, str, int]] = []
+        self.profiler: cProfile.Profile | None = None
+
+    def enable(self, slowest_n: int = SLOWEST_FILES, profile: bool = False) -> None:
+        if self.profiler:  # a worker forked from a profiled process
+            self.profiler.disable()
+        self.reset()
+        self.enabled = True
+        self.slowest_n = slowest_n
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_PHASE
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        return _PhaseTimer(stats)
+
+    def timed(self, iterable: Iterable, name: str) -> Iterable:
+        """charge the time spent producing each item of a lazy iterable (e.g. a directory walk) to a phase"""
+        if not self.enabled:
+            return iterable
+        return self._timed(iter(iterable), name)
+
+    def _timed(self, iterator: Iterator, name: str) -> Iterator:
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_file(self, file_path: str, language: str, size: int, seconds: float) -> None:
+        if not self.enabled:
+            return
+        stats = self.languages.get(language)
+        if stats is None:
+            stats = self.languages[language] = LanguageStats()
+        stats.files += 1
+        stats.bytes += size
+        stats.seconds += seconds
+        self.keep_slowest((seconds, str(file_path), language, size))
+
+    def keep_slowest(self, entry: Tuple[float, str, str, int]) -> None:
+        if len(self.slowest) < self.slowest_n:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def take_stats(self) -> Stats:
+        """the phases, counters and files recorded since the last call, for a worker process to send to its parent"""
+        stats = Stats(self.phases, self.counters, self.languages, self.slowest)
+        self.phases, self.counters, self.languages, self.slowest = {}, {}, {}, []
+        return stats
+
+    def merge_stats(self, stats: Stats) -> None:
+        """add what a worker recorded; the seconds of the phases add up across the processes, as cpu time does"""
+        if not self.enabled:
+            return
+        for name, phase in stats.phases.items():
+            total = self.phases.setdefault(name, PhaseStats())
+            total.seconds += phase.seconds
+            total.calls += phase.calls
+        for name, amount in stats.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        for language, language_stats in stats.languages.items():
+            total = self.languages.setdefault(language, LanguageStats())
+            total.files += language_stats.files
+            total.bytes += language_stats.bytes
+            total.seconds += language_stats.seconds
+        for entry in stats.slowest:
+            self.keep_slowest(entry)
+
+    def report(self) -> dict:
+        wall_time = time.perf_counter() - self.started
+        hits = self.counters.get('hits', 0)
+        return {
+            'wall_time': wall_time,
+            'phases': {name: asdict(stats) for name, stats in
+                       sorted(self.phases.items(), key=lambda item: item[1].seconds, reverse=True)},
+            'counters': dict(sorted(self.counters.items())),
+            'languages': {name: asdict(stats) for name, stats in sorted(self.languages.items())},
+            'hits_per_second': hits / wall_time if wall_time else 0.0,
+            'slowest_files': [{'file': file_path, 'language': language, 'bytes': size, 'seconds': seconds}
+                              for seconds, file_path, language, size in sorted(self.slowest, reverse=True)],
+        }
+
+    def write_report(self, report_path: Path | None = None, pstats_path: Path | None = None) -> dict:
+        """stop the profiler, write the json report and the pstats dump (when paths are given) and return the report"""
+        if self.profiler:
+            self.profiler.disable()
+            if pstats_path:
+                self.profiler.dump_stats(str(pstats_path))
+        report = self.report()
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+        return report
+
+
+instrumentation = Instrumentation()
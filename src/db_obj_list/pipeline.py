@@ -0,0 +1,25 @@
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Deque, Iterable, Iterator, Tuple
+
+# the calls of a stage submitted ahead of the one whose result is awaited, per worker of the stage
+DEPTH_PER_WORKER = 4
+
+
+def pipelined(executor: Executor, function: Callable[[Any], Any], items: Iterable,
+              depth: int) -> Iterator[Tuple[Any, Any]]:
+    """
+    (item, function(item)) of the items in their order, the calls running in the executor with at most depth of them
+    submitted ahead of the one awaited. The items are pulled as calls are submitted, so that stages chained through
+    their iterators overlap (the files of a thread pool being read while a process pool maps the ones before them)
+    with a bounded number of items in memory.
+    """
+    pending: Deque[Tuple[Any, Any]] = deque()
+    for item in items:
+        pending.append((item, executor.submit(function, item)))
+        if len(pending) >= depth:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
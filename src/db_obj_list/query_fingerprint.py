@@ -0,0 +1,92 @@
+import re
+import csv
+import hashlib
+from pathlib import Path
+from collections import Counter, OrderedDict
+from typing import Dict, Generic, Iterator, Tuple, TypeVar
+
+# bind variables and placeholders, which differ between copies of a query that are otherwise the same: :name, :1, ?,
+# ?1, and the #{..} and ${..} of MyBatis, an unclosed one running to the end of the text as in the sql lexer
+bind_pattern = re.compile(r':[\w$#]+|\?\d*|[#$]\{[^}]*(?:\}|\Z)')
+# the characters of the normalized text a report shows
+SAMPLE_LENGTH = 200
+
+Value = TypeVar('Value')
+
+
+def normalize(sql: str) -> str:
+    """
+    The text of a query as its copies share it: runs of spaces as one space, bind variables as ?, upper case unless
+    a quoted identifier makes the case significant. The names and statements a text refers to are the ones of its
+    normalized text; a -- comment keeps the line it ends on.
+    """
+    if '--' in sql:
+        text = '\n'.join(' '.join(line.split()) for line in sql.splitlines() if line and not line.isspace())
+    else:
+        text = ' '.join(sql.split())
+    text = bind_pattern.sub('?', text)
+    return text if '"' in text else text.upper()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    """the key of a normalized text, shorter than the text it stands for"""
+    return hashlib.blake2b(normalized_sql.encode(), digest_size=16).hexdigest()
+
+
+class QueryCache(Generic[Value]):
+    """
+    The objects each distinct query resolves to, kept for the maxsize queries used last, with the number of times
+    every query that resolved to something was seen. An entry keeps the text it was resolved from, for the values
+    that hold offsets in it.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, Tuple[str, Value]] = OrderedDict()
+        self.occurrences: Counter = Counter()
+        self.samples: Dict[str, str] = {}  # the start of the normalized text of the counted queries
+        self.hits = self.misses = 0
+
+    def get(self, key: str, text: str | None = None) -> Value | None:
+        """the value of a fingerprint, made the most recently used; with a text, only if it was resolved from it"""
+        entry = self.entries.get(key)
+        if entry is None or (text is not None and entry[0] != text):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, text: str, value: Value) -> None:
+        self.entries[key] = (text, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def count(self, key: str, normalized_sql: str) -> None:
+        if key not in self.occurrences:
+            self.samples[key] = normalized_sql[:SAMPLE_LENGTH]
+        self.occurrences[key] += 1
+
+    def take_counts(self) -> Tuple[Counter, Dict[str, str]]:
+        """the occurrences and samples counted since the last call, for a worker process to send to its parent"""
+        counts = self.occurrences, self.samples
+        self.occurrences, self.samples = Counter(), {}
+        return counts
+
+    def merge_counts(self, occurrences: Counter, samples: Dict[str, str]) -> None:
+        for key, sample in samples.items():
+            self.samples.setdefault(key, sample)
+        self.occurrences.update(occurrences)
+
+    def distinct(self) -> Iterator[Tuple[str, int, str]]:
+        """(fingerprint, occurrences, normalized text) of the counted queries, the most repeated first"""
+        for key, occurrences in self.occurrences.most_common():
+            yield key, occurrences, self.samples[key]
+
+
+def write_query_report(query_cache: QueryCache, file_path: Path) -> None:
+    with open(file_path, 'w', newline='', errors='replace') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Fingerprint', 'Occurrences', 'Query'])
+        writer.writerows(query_cache.distinct())
@@ -0,0 +1,204 @@
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+# the spaces and comments before a token, then one alternation tried once per position: every branch starts with a
+# distinct character class and none of them can backtrack over what it consumed, so a text is lexed in a single linear
+# pass (unterminated strings and comments run to the end of the text, where the empty last branch matches, instead of
+# failing and being rescanned from the next position). Strings come first so that n'..' and the q'[..]' quoting of
+# Oracle, whose body may hold quotes, are not lexed as a name followed by a string
+token_pattern = re.compile(r"""
+    (?:\s+|--[^\n]*|/\*[\s\S]*?(?:\*/|\Z))*
+    (?:
+        (?P<string>[nN]?(?:'(?:[^']|'')*(?:'|\Z)
+                          |[qQ]'(?:\[[\s\S]*?(?:\]'|\Z)|\{[\s\S]*?(?:\}'|\Z)|\([\s\S]*?(?:\)'|\Z)|<[\s\S]*?(?:>'|\Z)
+                                  |(?P<delimiter>\S)[\s\S]*?(?:(?P=delimiter)'|\Z))))
+      | (?P<name>(?:"[^"]*"|[A-Za-z_][\w$#]*)(?:\.(?:"[^"]*"|[A-Za-z_][\w$#]*))*(?:@[\w$#.]+)?)
+      | (?P<parameter>:[\w$#]+|\?\d*|[#$]\{[^}]*(?:\}|\Z))
+      | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+      | (?P<symbol>.)
+      | \Z
+    )
+""", re.VERBOSE)
+
+MODIFY_KEYWORDS = {'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'TRUNCATE'}
+STATEMENT_KEYWORDS = MODIFY_KEYWORDS | {'SELECT', 'WITH'}
+# the words that end a clause where a target name could otherwise follow; never reported as references
+KEYWORDS = STATEMENT_KEYWORDS | {
+    'FROM', 'JOIN', 'INTO', 'USING', 'SET', 'WHERE', 'VALUES', 'ON', 'AS', 'AND', 'OR', 'NOT', 'IN', 'EXISTS',
+    'TABLE', 'ONLY', 'ALL', 'FIRST', 'WHEN', 'THEN', 'ELSE', 'END', 'CASE', 'MATCHED', 'FOR', 'OF', 'NOWAIT',
+    'SKIP', 'LOCKED', 'WAIT', 'GROUP', 'ORDER', 'BY', 'HAVING', 'UNION', 'INTERSECT', 'MINUS', 'EXCEPT',
+    'DISTINCT', 'INNER', 'OUTER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'NATURAL', 'LATERAL', 'RETURNING', 'LOG',
+    'ERRORS', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'ANY', 'SOME', 'PRIOR', 'CONNECT', 'START', 'BEGIN', 'DECLARE',
+    'CALL', 'EXEC', 'EXECUTE', 'PARTITION', 'FETCH', 'OFFSET', 'ROWS', 'ROW', 'NEXT', 'LIMIT'}
+
+
+@dataclass(frozen=True)
+class ObjectReference:
+    name: str  # upper case unless quoted, where the case is kept as Oracle does
+    qualifier: str | None  # the owner of owner.object, the package of package.procedure or the alias of alias.column
+    offset: int
+    operation: str  # 'M' for the target of a DML statement, 'R' for the rest of a statement, '' outside of any
+    call: bool = False  # followed by an argument list, a function or a procedure
+
+
+def identifier(part: str) -> str:
+    return part[1:-1] if part.startswith('"') else part.upper()
+
+
+def split_name(text: str) -> List[str]:
+    """the parts of owner.object@dblink, quoted ones included, without the database link"""
+    if '"' not in text and '@' not in text:
+        return text.upper().split('.')
+    parts, position = [], 0
+    while position < len(text) and text[position] != '@':
+        if text[position] == '"':
+            end = text.index('"', position + 1) + 1
+        else:
+            end = position
+            while end < len(text) and text[end] not in '.@':
+                end += 1
+        parts.append(identifier(text[position:end]))
+        position = end + 1 if end < len(text) and text[end] == '.' else end
+    return parts
+
+
+@dataclass
+class _Statement:
+    """the state of a statement or of a parenthesis inside it"""
+    keyword: str = ''  # the keyword that started the statement, SELECT inside the parentheses of a statement
+    target: bool = False  # the next name is the object a DML statement writes to
+    # the names are read from: after FROM, JOIN or USING in a fragment without a statement keyword, as the lines of a
+    # query built across lines of code are, up to the next keyword
+    source: bool = False
+
+    @property
+    def operation(self) -> str:
+        return 'R' if self.keyword else ''
+
+
+def tokens(text: str) -> Iterator[Tuple[str, str, int]]:
+    """(kind, text, offset) of the tokens of a sql text; spaces and comments are skipped by the pattern itself"""
+    for match in token_pattern.finditer(text):
+        kind = match.lastgroup
+        if kind is not None:
+            yield kind, match.group(kind), match.start(kind)
+
+
+def object_references(text: str) -> Iterator[ObjectReference]:
+    """
+    Every name of a sql text with the operation of the statement it belongs to, in one streaming pass: the target
+    of INSERT [ALL] INTO, UPDATE, DELETE [FROM], MERGE INTO and TRUNCATE TABLE is a modification, while everything
+    else (the sources of INSERT ... SELECT and MERGE ... USING, subqueries, joins) is a read. Statements separated by
+    semicolons, and the ones of a block from what precedes its BEGIN or DECLARE, are attributed on their own. In a
+    fragment without a statement keyword (" FROM TB_NF N " on a line of its own) the names after FROM, JOIN and
+    USING are reads and the one after INTO a modification.
+    """
+    stack = [_Statement()]
+    previous_keyword = ''
+    pending = None  # (name, qualifier, offset, operation), reported once the next token tells whether it is called
+    for match in token_pattern.finditer(text):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        token = match.group(kind)
+        if pending is not None:
+            yield ObjectReference(*pending, call=token == '(')
+            pending = None
+        statement = stack[-1]
+        keyword = token.upper() if kind == 'name' else ''
+        if keyword in KEYWORDS:
+            if keyword in ('BEGIN', 'DECLARE') and len(stack) == 1:
+                # the statements of a block are attributed on their own, not to the header of its trigger
+                # (BEFORE INSERT ON TB_NF ... BEGIN DELETE FROM TB_CACHE ...)
+                stack[0] = _Statement()
+            elif keyword in STATEMENT_KEYWORDS:
+                # a statement keyword inside another statement (INSERT ... SELECT, MERGE ... THEN UPDATE SET,
+                # SELECT ... FOR UPDATE) does not change it, except for the main query after WITH
+                if statement.keyword in ('', 'WITH'):
+                    statement.keyword = keyword
+                    statement.target = keyword in ('UPDATE', 'DELETE')
+                else:
+                    statement.target = False
+            elif keyword == 'INTO':
+                statement.target = statement.keyword in ('INSERT', 'MERGE', '')
+            elif keyword == 'FROM':
+                statement.target = statement.keyword == 'DELETE' and previous_keyword == 'DELETE'
+            elif keyword == 'TABLE':
+                statement.target = statement.keyword == 'TRUNCATE'
+            else:
+                statement.target = False
+            statement.source = not statement.keyword and keyword in ('FROM', 'JOIN', 'USING')
+            previous_keyword = keyword
+            continue
+        previous_keyword = ''
+        if kind == 'name':
+            parts = split_name(token)
+            operation = 'M' if statement.target else 'R' if statement.source else statement.operation
+            if len(parts) == 1:
+                pending = (parts[0], None, match.start(kind), operation)
+            elif parts:
+                pending = (parts[1], parts[0], match.start(kind), operation)
+        elif token == '(':
+            stack.append(_Statement(keyword='SELECT' if statement.keyword else ''))
+        elif token == ')':
+            if len(stack) > 1:
+                stack.pop()
+        elif token == ';' and len(stack) == 1:
+            stack[0] = _Statement()
+        statement.target = False
+    if pending is not None:
+        yield ObjectReference(*pending)
+
+
+def operations(text: str) -> List[Tuple[str, str]]:
+    """(qualified name, operation) of the references of a text, for the command line and the corpus"""
+    return [(f"{reference.qualifier}.{reference.name}" if reference.qualifier else reference.name,
+             reference.operation) for reference in object_references(text)]
+
+
+def read_corpus(text: str) -> Iterator[Tuple[int, str, List[Tuple[str, str]]]]:
+    """
+    (line number, sql, expected references) of a corpus: each case is a `-- expect: NAME=OP ...` line followed by
+    its sql, OP being R, M or - for a name outside of any statement
+    """
+    case_line, expected, sql = 0, None, []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if line.startswith('-- expect:'):
+            if expected is not None:
+                yield case_line, '\n'.join(sql), expected
+            case_line, sql = line_number, []
+            expected = [tuple(pair.split('=', 1)) for pair in line.removeprefix('-- expect:').split()]
+        elif expected is not None:
+            sql.append(line)
+    if expected is not None:
+        yield case_line, '\n'.join(sql), expected
+
+
+def check_corpus(text: str) -> List[str]:
+    """the failures of a corpus; only the names a case expects are compared, in order and with repetitions"""
+    failures = []
+    for line_number, sql, expected in read_corpus(text):
+        names = {name for name, _ in expected}
+        found = [(name, operation or '-') for name, operation in operations(sql) if name in names]
+        if found != [(name, operation) for name, operation in expected]:
+            failures.append(f"line {line_number}: expected {expected}, found {found}")
+    return failures
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Attribute the object references of sql texts to their operation")
+    parser.add_argument('--corpus', type=Path, help='Check the expectations of a regression corpus')
+    parser.add_argument('sql', nargs='*', help='Sql texts to print the references of')
+    args = parser.parse_args()
+
+    for sql_text in args.sql:
+        print(operations(sql_text))
+    if args.corpus:
+        corpus_failures = check_corpus(args.corpus.read_text(encoding='utf-8'))
+        print('\n'.join(corpus_failures) or 'corpus ok')
+        sys.exit(1 if corpus_failures else 0)
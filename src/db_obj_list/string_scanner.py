@@ -0,0 +1,54 @@
+import re
+from functools import lru_cache
+from typing import List, Set
+
+# the body of a quoted string after its opening quote, up to its closing quote or the end of the text. The quantifier
+# is possessive, so a string that is never closed costs one scan to the end and nothing is scanned twice
+QUOTED_BODIES = {quote: re.compile(rf'(?:[^{quote}\\\n]|\\.)*+({quote})?') for quote in '\'"`'}
+# a heredoc or nowdoc opening, <<<ID, <<<"ID" or <<<'ID', ending its line
+heredoc_opening_pattern = re.compile(r'<<<[ \t]*(["\']?)([A-Za-z_]\w*)\1[ \t]*\r?$', re.MULTILINE)
+
+
+@lru_cache(maxsize=None)
+def opening_pattern(quotes: str) -> re.Pattern:
+    return re.compile('[' + re.escape(quotes) + ']')
+
+
+def find_quoted_strings(text: str, quotes: str) -> List[str]:
+    """
+    The quoted strings of a line, quotes included, in linear time. A quote never closed means every later quote of
+    the same kind is escaped (an unescaped one would have closed it), so that kind is not looked for again, where
+    a regex alternation would retry the scan from each of them.
+    """
+    strings, position = [], 0
+    opening = opening_pattern(quotes)
+    while match := opening.search(text, position):
+        quote = match.group()
+        body = QUOTED_BODIES[quote].match(text, match.end())
+        if body.group(1) is not None:
+            strings.append(text[match.start():body.end()])
+            position = body.end()
+        else:
+            quotes = quotes.replace(quote, '')
+            if not quotes:
+                break
+            opening = opening_pattern(quotes)
+            position = match.end()
+    return strings
+
+
+def heredoc_body_lines(text: str) -> Set[int]:
+    """
+    The line numbers (1-based) inside the heredoc and nowdoc bodies of a php text, found in one pass: each body is
+    searched for its closing identifier once, from its opening on, and an unclosed one runs to the end of the text.
+    """
+    lines, position, line_number = set(), 0, 1
+    while opening := heredoc_opening_pattern.search(text, position):
+        line_number += text.count('\n', position, opening.end())
+        closing = re.compile(rf'^[ \t]*{opening.group(2)}\b', re.MULTILINE).search(text, opening.end())
+        end = closing.start() if closing else len(text)
+        body_lines = text.count('\n', opening.end(), end)
+        lines.update(range(line_number + 1, line_number + body_lines + (0 if closing else 1)))
+        line_number += body_lines
+        position = end
+    return lines
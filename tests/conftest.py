@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for module_dir in (ROOT_DIR / 'src' / 'db_obj_list', ROOT_DIR / 'src' / 'code_mapper'):
+    if str(module_dir) not in sys.path:
+        sys.path.insert(0, str(module_dir))
@@ -0,0 +1,71 @@
+import pytest
+
+from plsql_mapper import builtin, classify_edges, scan_edges, split_script
+
+PACKAGE_BODY = """CREATE OR REPLACE PACKAGE BODY NFE.PKG_NF AS
+  PROCEDURE ATUALIZA(P_ID IN NUMBER) IS
+    v_txt VARCHAR2(100);
+    v_qt  NUMBER(10, 2);
+    CURSOR c_itens IS SELECT I.ID, I.QT FROM TB_NF_ITEM I WHERE I.ID_NF = P_ID;
+  BEGIN
+    SELECT NVL(MAX(X), 0), TO_CHAR(SYSDATE, 'YYYY') INTO v_qt, v_txt FROM TB_NF T WHERE T.ID = P_ID;
+    FOR R IN c_itens LOOP
+      UPDATE TB_NF_ITEM SET QT = R.QT WHERE ID = R.ID;
+    END LOOP;
+    INSERT INTO TB_NF_LOG (ID, DS) SELECT ID, v_txt FROM TB_NF WHERE ID = :P_ID;
+    DELETE FROM TB_NF_TMP
+     WHERE CD_FILIAL IN (SELECT F.CD_FILIAL FROM TB_FILIAL F JOIN TB_REGIAO G ON G.ID = F.ID_REGIAO);
+    PKG_LOG.GRAVA(v_txt, SUBSTR(v_txt, 1, 10));
+    CALCULA_TOTAL(P_ID);
+  END ATUALIZA;
+END PKG_NF;
+/
+CREATE OR REPLACE TRIGGER TRG_PEDIDO
+BEFORE INSERT ON TB_PEDIDO FOR EACH ROW
+BEGIN
+  DELETE FROM TB_CACHE WHERE ID = :NEW.ID;
+END;
+/
+INSERT INTO TB_TMP SELECT NVL(ID, 0) FROM TB_NF;
+"""
+
+
+def edges(extract) -> list:
+    return [(edge.source, edge.qualifier, edge.target, edge.operation, edge.line_number)
+            for statement in split_script(PACKAGE_BODY) for edge in extract(statement)]
+
+
+def test_scan_edges_keep_only_tables_and_calls():
+    # no calls to the types of the declarations (VARCHAR2, NUMBER) or to built-in functions (NVL, TO_CHAR, SUBSTR),
+    # and no reads of the columns, aliases and bind variables of the select lists and predicates
+    assert edges(scan_edges) == [
+        ('NFE.PKG_NF', None, 'TB_NF_ITEM', 'R', 5),
+        ('NFE.PKG_NF', None, 'TB_NF', 'R', 7),
+        ('NFE.PKG_NF', None, 'TB_NF_ITEM', 'M', 9),
+        ('NFE.PKG_NF', None, 'TB_NF_LOG', 'M', 11),
+        ('NFE.PKG_NF', None, 'TB_NF', 'R', 11),
+        ('NFE.PKG_NF', None, 'TB_NF_TMP', 'M', 12),
+        ('NFE.PKG_NF', None, 'TB_FILIAL', 'R', 13),
+        ('NFE.PKG_NF', None, 'TB_REGIAO', 'R', 13),
+        ('NFE.PKG_NF', 'PKG_LOG', 'GRAVA', 'C', 14),
+        ('NFE.PKG_NF', None, 'CALCULA_TOTAL', 'C', 15),
+        ('TRG_PEDIDO', None, 'TB_PEDIDO', 'R', 20),
+        ('TRG_PEDIDO', None, 'TB_CACHE', 'M', 22),
+        ('', None, 'TB_TMP', 'M', 25),
+        ('', None, 'TB_NF', 'R', 25),
+    ]
+
+
+def test_classify_edges_skip_builtin_functions():
+    statement = list(split_script(PACKAGE_BODY))[-1]
+    assert [(edge.target, edge.operation) for edge in classify_edges(statement)] == [('TB_TMP', 'M'), ('TB_NF', 'R')]
+
+
+def test_parsed_edges_skip_builtin_functions():
+    # runs once antlr/PlSqlParser.py has been generated: the parse tree path, taken when a statement parses before
+    # its deadline, must not call the built-ins the token scanner leaves out
+    plsql_parser = pytest.importorskip('plsql_parser')
+    for statement in split_script(PACKAGE_BODY):
+        edges = plsql_parser.parse_edges(statement, float('inf'))
+        assert edges is not None
+        assert [edge for edge in edges if edge.operation == 'C' and builtin(edge.target, edge.qualifier)] == []